@@ -0,0 +1,271 @@
+"""
+Calendar-aware alignment of price series.
+
+Dropping every date on which any holding (or the benchmark) has no bar
+throws away large fractions of the data once exchanges are mixed: an .NS
+stock and ^GSPC share only the days both markets were open. This module
+builds the union trading calendar of all series once and decides cell by
+cell what to do with the gaps, with boolean masks over the whole
+(dates x series) matrix:
+
+    strict     keep only dates on which every series has a bar (the old
+               behaviour)
+    ffill      carry the last price into a gap of at most max_gap bars;
+               dates with a longer gap (or before a series' first bar) are
+               dropped
+    exchange   every series belongs to a market calendar (inferred from the
+               ticker suffix, e.g. .NS -> IN, no suffix -> US). A date on
+               which nothing on that calendar traded is a holiday there and
+               the price is carried; a missing bar on a day its market was
+               open is carried for at most max_gap open days
+
+A carried price means a 0% return on that date and the full move on the
+next bar, so compounded returns are unchanged. Market calendars are
+inferred from the data: a day counts as open if any series of that market
+has a bar, so a series alone on its calendar is never considered missing
+a bar.
+
+The report lists exactly which cells were filled (and from which date)
+and which observations were lost with a dropped date.
+"""
+
+import numpy as np
+import pandas as pd
+
+ALIGNMENT_POLICIES = ('strict', 'ffill', 'exchange')
+DEFAULT_ALIGNMENT = 'exchange'
+DEFAULT_MAX_GAP = 5
+
+# Ticker suffix -> market calendar (exchanges sharing holidays share one)
+CALENDAR_SUFFIXES = {
+    '.NS': 'IN', '.BO': 'IN', '.L': 'GB', '.T': 'JP', '.HK': 'HK', '.SS': 'CN', '.SZ': 'CN',
+    '.DE': 'DE', '.F': 'DE', '.PA': 'FR', '.AS': 'NL', '.TO': 'CA', '.AX': 'AU', '.SI': 'SG', '.KS': 'KR',
+}
+
+# Index tickers -> market calendar; other indices get a calendar of their own
+INDEX_CALENDARS = {
+    '^NSEI': 'IN', '^NSEBANK': 'IN', '^CNXIT': 'IN', '^NSMIDCP': 'IN', '^BSESN': 'IN',
+    '^GSPC': 'US', '^DJI': 'US', '^IXIC': 'US', '^RUT': 'US', '^NDX': 'US',
+    '^FTSE': 'GB', '^N225': 'JP', '^HSI': 'HK', '^GDAXI': 'DE', '^FCHI': 'FR',
+}
+
+_BENCHMARK = '__benchmark__'
+
+
+def market_calendar(ticker):
+    """Market calendar a ticker trades on ('IN', 'US', ...)."""
+    if ticker in INDEX_CALENDARS:
+        return INDEX_CALENDARS[ticker]
+    if ticker.startswith('^'):
+        return ticker
+    for suffix, calendar in CALENDAR_SUFFIXES.items():
+        if ticker.upper().endswith(suffix):
+            return calendar
+    return 'US'
+
+
+def _clean(series, daily):
+    if isinstance(series, pd.DataFrame):
+        series = series.squeeze(axis=1)
+    series = series.dropna()
+    if daily:
+        # Bars of different exchanges meet on the calendar date, whatever their timezone
+        index = series.index
+        if getattr(index, 'tz', None) is not None:
+            index = index.tz_localize(None)
+        series = series.set_axis(index.normalize())
+    return series[~series.index.duplicated(keep='last')]
+
+
+def _calendar_codes(labels, calendars=None):
+    """Market calendar of every series and its integer code."""
+    overrides = calendars or {}
+    calendar_of = [overrides.get(label, market_calendar(label)) for label in labels]
+    codes, _ = pd.factorize(pd.Index(calendar_of))
+    return calendar_of, codes
+
+
+def _fill_plan(values, codes, policy, max_gap, carry=None):
+    """
+    Which missing cells can be filled, and with which price.
+
+    Everything is causal: a cell depends only on its own and earlier rows,
+    so a long history can be planned chunk by chunk with the state of the
+    rows before the chunk passed in as `carry`.
+
+    Args:
+        values: Prices (rows x series), NaN where a series has no bar
+        codes: Market calendar code of every series (see _calendar_codes)
+        policy: 'strict', 'ffill' or 'exchange'
+        max_gap: Longest fillable run of missing bars / missed open days
+        carry: State after the earlier rows (None at the start)
+
+    Returns:
+        Tuple (fillable, carried, last, carry): fillable cells, the price
+        each cell would carry, the row of each cell's last observation in
+        these rows (-1 if it is earlier or there is none) and the state
+        after these rows
+    """
+    observed = ~np.isnan(values)
+    n_rows, n_series = values.shape
+    if carry is None:
+        carry = {'gap': np.zeros(n_series, dtype=np.int64), 'has_last': np.zeros(n_series, dtype=bool),
+                 'price': np.full(n_series, np.nan)}
+
+    rows = np.arange(n_rows)[:, None]
+    last = np.maximum.accumulate(np.where(observed, rows, -1), axis=0)
+    local = last >= 0
+    has_last = local | carry['has_last']
+
+    if policy == 'exchange':
+        # A market is open on a date if any of its series has a bar there
+        open_by_market = np.zeros((n_rows, codes.max() + 1 if len(codes) else 0), dtype=bool)
+        for code in np.unique(codes):
+            open_by_market[:, code] = observed[:, codes == code].any(axis=1)
+        is_open = open_by_market[:, codes]
+        steps = np.cumsum(is_open, axis=0)
+    else:
+        is_open = np.ones_like(observed)
+        steps = np.broadcast_to(rows + 1, observed.shape)
+
+    # Missing bars (ffill) or missing bars on open days (exchange) since the last observation
+    gap = np.where(local, steps - np.take_along_axis(steps, np.maximum(last, 0), axis=0),
+                   carry['gap'] + steps)
+
+    if policy == 'strict':
+        fillable = np.zeros_like(observed)
+    elif policy == 'ffill':
+        fillable = ~observed & has_last & (gap <= max_gap)
+    else:
+        fillable = ~observed & has_last & (~is_open | (gap <= max_gap))
+
+    carried = np.where(local, np.take_along_axis(values, np.maximum(last, 0), axis=0), carry['price'])
+    if n_rows:
+        carry = {'gap': gap[-1], 'has_last': has_last[-1], 'price': carried[-1]}
+    return fillable, carried, last, carry
+
+
+def align_prices(prices, benchmark=None, benchmark_ticker=None, policy=DEFAULT_ALIGNMENT,
+                 max_gap=DEFAULT_MAX_GAP, calendars=None, daily=True):
+    """
+    Align price series on one calendar under an alignment policy.
+
+    Args:
+        prices: Dictionary ticker -> Series of close prices
+        benchmark: Series of benchmark closes (optional); aligned under the
+            same rules, so every kept date has a benchmark price
+        benchmark_ticker: Benchmark name, for its calendar and the report
+        policy: 'strict', 'ffill' or 'exchange'
+        max_gap: Longest run of missing bars that is filled ('ffill'), or
+            of missing bars on open days ('exchange')
+        calendars: Optional dictionary ticker -> calendar overriding
+            market_calendar
+        daily: Align on calendar dates (drops timezones); False for
+            intraday bars, which are aligned on their timestamps
+
+    Returns:
+        Dictionary with:
+            'prices' - aligned closes (dates x tickers)
+            'benchmark' - aligned benchmark closes (None without benchmark)
+            'filled' - boolean DataFrame (kept dates x series), True where a
+                price was carried forward
+            'cells' - one row per filled or lost cell: date, series,
+                action ('filled' or 'dropped') and source_date (the date
+                the carried price is from)
+            'dropped_dates' - calendar dates that were not kept
+            'summary' - per series: calendar, observed, filled, dropped
+            'calendar_size', 'policy', 'max_gap'
+    """
+    if policy not in ALIGNMENT_POLICIES:
+        raise ValueError(f"Unknown alignment policy '{policy}'. Use one of {ALIGNMENT_POLICIES}")
+
+    series = {ticker: _clean(close, daily) for ticker, close in prices.items()}
+    if benchmark is not None:
+        series[_BENCHMARK] = _clean(benchmark, daily)
+    names = list(series)
+    labels = [(benchmark_ticker or 'Benchmark') if name == _BENCHMARK else name for name in names]
+
+    frame = pd.concat(series, axis=1, sort=True) if series else pd.DataFrame()
+    frame = frame.reindex(columns=names)
+    values = frame.to_numpy(dtype=float)
+    observed = ~np.isnan(values)
+
+    calendar_of, codes = _calendar_codes(labels, calendars)
+    fillable, carried, last, _ = _fill_plan(values, codes, policy, max_gap)
+
+    available = observed | fillable
+    keep = available.all(axis=1)
+    filled = fillable & keep[:, None]
+    lost = observed & ~keep[:, None]
+
+    aligned = np.where(filled, carried, values)[keep]
+    index = frame.index[keep]
+
+    result = pd.DataFrame(aligned, index=index, columns=names)
+    filled_frame = pd.DataFrame(filled[keep], index=index, columns=labels)
+
+    # Cell-level report, in calendar order
+    fill_rows, fill_cols = np.nonzero(filled)
+    lost_rows, lost_cols = np.nonzero(lost)
+    cell_rows = np.concatenate([fill_rows, lost_rows])
+    source = np.concatenate([last[fill_rows, fill_cols], np.full(len(lost_rows), -1)])
+    cells = pd.DataFrame({
+        'date': frame.index[cell_rows],
+        'series': np.asarray(labels, dtype=object)[np.concatenate([fill_cols, lost_cols])],
+        'action': ['filled'] * len(fill_rows) + ['dropped'] * len(lost_rows),
+        'source_date': frame.index[np.maximum(source, 0)].where(source >= 0),
+    }).sort_values(['date', 'series'], kind='stable', ignore_index=True)
+
+    summary = pd.DataFrame({
+        'calendar': calendar_of,
+        'observed': observed.sum(axis=0),
+        'filled': filled.sum(axis=0),
+        'dropped': lost.sum(axis=0),
+    }, index=pd.Index(labels, name='series'))
+
+    return {
+        'prices': result.drop(columns=[_BENCHMARK], errors='ignore'),
+        'benchmark': result[_BENCHMARK].rename(benchmark_ticker) if benchmark is not None else None,
+        'filled': filled_frame,
+        'cells': cells,
+        'dropped_dates': frame.index[~keep],
+        'summary': summary,
+        'calendar_size': len(frame),
+        'policy': policy,
+        'max_gap': max_gap,
+    }
+
+
+def iter_aligned_chunks(price_chunks, columns, policy=DEFAULT_ALIGNMENT, max_gap=DEFAULT_MAX_GAP, calendars=None):
+    """
+    align_prices over a date-ordered stream of wide price chunks.
+
+    Each series' last price and the gap since it are carried from chunk to
+    chunk, so the kept dates and carried prices are exactly those
+    align_prices gives on the whole history. Chunks must already share one
+    date index (e.g. a wide CSV price store); dates on which none of
+    `columns` has a price are not part of the calendar.
+
+    Args:
+        price_chunks: Iterable of wide price DataFrames, in date order
+        columns: Series to align (column names, also used for calendars)
+        policy, max_gap, calendars: As for align_prices
+
+    Yields:
+        DataFrame of aligned prices (kept dates x columns) per chunk
+    """
+    if policy not in ALIGNMENT_POLICIES:
+        raise ValueError(f"Unknown alignment policy '{policy}'. Use one of {ALIGNMENT_POLICIES}")
+
+    columns = list(columns)
+    _, codes = _calendar_codes(columns, calendars)
+    carry = None
+
+    for chunk in price_chunks:
+        frame = chunk[columns].dropna(how='all')
+        values = frame.to_numpy(dtype=float)
+        fillable, carried, _, carry = _fill_plan(values, codes, policy, max_gap, carry)
+
+        keep = (~np.isnan(values) | fillable).all(axis=1)
+        aligned = np.where(fillable, carried, values)[keep]
+        yield pd.DataFrame(aligned, index=frame.index[keep], columns=columns)
@@ -0,0 +1,358 @@
+"""
+Export of analysis results.
+
+build_export_payload produces the nested scalar summary the dashboard offers
+as JSON. AnalysisDatasetWriter writes the full time series behind it -
+returns, cumulative returns, excess returns, rolling CAGR, underwater curve
+and per-stock contributions - together with the flattened scalar metrics in
+columnar form (Parquet, or Arrow IPC/Feather), one portfolio at a time, so a
+batch run over thousands of portfolios lands in a single dataset without
+holding them all in memory.
+
+Dataset layout under the target directory:
+
+    timeseries/      one row per (portfolio_id, date)
+    contributions/   one row per (portfolio_id, date, ticker)
+    metrics/         one row per portfolio_id
+    scenarios/       one row per (portfolio_id, scenario), when stress-test
+                     results are passed as extra tables
+
+With partition_by_portfolio=True each table is hive-partitioned
+(timeseries/portfolio_id=<id>/part-0.parquet) so readers can prune
+portfolios; otherwise each table is a single file with one row group per
+portfolio. Because ids become directory names, ids containing a path
+separator (or '.'/'..') are rejected.
+
+pyarrow is optional and only imported when a dataset is written.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+TABLES = ('timeseries', 'contributions', 'metrics')
+
+_EXTENSIONS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Columnar export needs pyarrow. Install it with: pip install pyarrow"
+        ) from e
+    return pyarrow
+
+
+def _check_portfolio_id(portfolio_id):
+    """portfolio_id as a string, refusing ids that would escape a partition directory."""
+    portfolio_id = str(portfolio_id)
+    if portfolio_id in ('', '.', '..') or '/' in portfolio_id or '\\' in portfolio_id:
+        raise ValueError(f"Invalid portfolio_id {portfolio_id!r}: ids cannot be empty, '.', '..' "
+                         f"or contain path separators")
+    return portfolio_id
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+def build_export_payload(portfolio):
+    """
+    Nested scalar summary of an analyzed portfolio (the dashboard JSON export).
+
+    Benchmark-relative sections hold None when no benchmark is available.
+    """
+    metrics = portfolio.metrics
+    market = portfolio.market_metrics or {}
+    risk = portfolio.risk_comparison or {}
+    structure = portfolio.structure
+    behaviour = portfolio.behaviour
+    drawdown_report = portfolio.drawdown_report
+    tail_table = portfolio.tail_risk
+
+    return {
+        "portfolio_composition": {
+            "tickers": list(portfolio.tickers),
+            "weights": [float(w) for w in portfolio.weights]
+        },
+        "performance_metrics": {
+            "annual_return": float(metrics['annual_return']),
+            "volatility": float(metrics['volatility']),
+            "sharpe_ratio": float(metrics['sharpe_ratio']),
+            "sortino_ratio": float(metrics['sortino_ratio']),
+            "max_drawdown": float(metrics['max_drawdown'])
+        },
+        "market_comparison": {
+            "beta": _float(market.get('beta')),
+            "information_ratio": _float(market.get('information_ratio')),
+            "tracking_error": _float(market.get('tracking_error')),
+            "excess_return": _float(market.get('annualized_excess_return'))
+        },
+        "risk_quality": {
+            "portfolio_volatility": _float(risk.get('portfolio_volatility')),
+            "market_volatility": _float(risk.get('market_volatility')),
+            "portfolio_sharpe": _float(risk.get('portfolio_sharpe')),
+            "market_sharpe": _float(risk.get('market_sharpe')),
+            "portfolio_downside": _float(risk.get('portfolio_downside')),
+            "market_downside": _float(risk.get('market_downside'))
+        },
+        "drawdowns": {
+            "ulcer_index": float(drawdown_report['ulcer_index']['Portfolio']),
+            "pain_index": float(drawdown_report['pain_index']['Portfolio']),
+            "episode_count": int((drawdown_report['episodes']['portfolio'] == 'Portfolio').sum())
+        },
+        "tail_risk": {
+            f"{measure}_{method}_{confidence:.0%}_{horizon}d": float(value)
+            for (measure, method, confidence, horizon), value in tail_table['Portfolio'].items()
+        },
+        "portfolio_structure": {
+            "max_concentration": float(structure['concentration']),
+            "effective_n_stocks": float(structure['effective_n']),
+            "top_contributor": structure['top_contributor'],
+            "top_dragger": structure['top_dragger']
+        },
+        "behaviour": {
+            "win_rate": float(behaviour['win_rate']),
+            "avg_gain": float(behaviour['gain_loss']['avg_gain']),
+            "avg_loss": float(behaviour['gain_loss']['avg_loss']),
+            "gain_loss_ratio": float(behaviour['gain_loss']['gain_loss_ratio'])
+        }
+    }
+
+
+def analysis_timeseries(portfolio, portfolio_id):
+    """One row per date: returns, cumulative returns, excess, rolling CAGR, drawdown."""
+    returns = portfolio.portfolio_returns
+    benchmark = portfolio.benchmark_returns
+    benchmark_cum = portfolio.benchmark_cumulative_returns
+    rolling_cagr = portfolio.rolling_cagr
+    underwater = portfolio.drawdown_report['underwater']['Portfolio']
+
+    nan = np.full(len(returns), np.nan)
+    frame = pd.DataFrame({
+        'portfolio_id': str(portfolio_id),
+        'date': returns.index.to_numpy(),
+        'portfolio_return': returns.to_numpy(dtype=float),
+        'benchmark_return': benchmark.to_numpy(dtype=float) if benchmark is not None else nan,
+        'cumulative_return': portfolio.cumulative_returns.to_numpy(dtype=float),
+        'benchmark_cumulative_return': benchmark_cum.to_numpy(dtype=float) if benchmark_cum is not None else nan,
+        'excess_return': (returns - benchmark).to_numpy(dtype=float) if benchmark is not None else nan,
+        'rolling_cagr': rolling_cagr.to_numpy(dtype=float) if rolling_cagr is not None else nan,
+        'underwater': underwater.to_numpy(dtype=float)
+    })
+    return frame
+
+
+def analysis_contributions(portfolio, portfolio_id):
+    """One row per (date, ticker): stock return, weight and weighted contribution."""
+    stock_returns = portfolio.stock_returns_df
+    weights = pd.Series(portfolio.weights, index=portfolio.tickers, dtype=float)
+    n_dates, n_tickers = stock_returns.shape
+
+    values = stock_returns.to_numpy(dtype=float)
+    weight_row = weights.reindex(stock_returns.columns).to_numpy()
+
+    return pd.DataFrame({
+        'portfolio_id': str(portfolio_id),
+        'date': np.repeat(stock_returns.index.to_numpy(), n_tickers),
+        'ticker': np.tile(np.asarray(stock_returns.columns, dtype=object), n_dates),
+        'weight': np.tile(weight_row, n_dates),
+        'stock_return': values.ravel(),
+        'contribution': (values * weight_row).ravel()
+    })
+
+
+def analysis_metrics(portfolio, portfolio_id):
+    """Single-row frame of the flattened export payload."""
+    payload = build_export_payload(portfolio)
+    row = {'portfolio_id': str(portfolio_id), 'benchmark': portfolio.benchmark_ticker}
+    for section, values in payload.items():
+        if section == 'portfolio_composition':
+            continue
+        for key, value in values.items():
+            if isinstance(value, str):
+                row[f"{section}.{key}"] = value
+            else:
+                row[f"{section}.{key}"] = np.nan if value is None else float(value)
+    row['n_stocks'] = float(len(portfolio.tickers))
+    return pd.DataFrame([row])
+
+
+class AnalysisDatasetWriter:
+    """
+    Incrementally write analyzed portfolios to a columnar dataset.
+
+    Args:
+        path: Target directory
+        format: 'parquet' or 'arrow' (Arrow IPC / Feather v2)
+        compression: Codec name or None. Parquet accepts 'zstd', 'snappy',
+            'gzip', 'lz4', 'brotli'; Arrow IPC accepts 'zstd' and 'lz4'
+        partition_by_portfolio: Hive-partition every table by portfolio_id
+
+    Usage:
+        with AnalysisDatasetWriter('out/') as writer:
+            for portfolio_id, portfolio in analyzed:
+                writer.write(portfolio_id, portfolio)
+    """
+
+    def __init__(self, path, format='parquet', compression='zstd', partition_by_portfolio=False):
+        if format not in _EXTENSIONS:
+            raise ValueError(f"Unknown export format '{format}'. Use 'parquet' or 'arrow'")
+
+        self.path = path
+        self.format = format
+        self.compression = compression
+        self.partition_by_portfolio = partition_by_portfolio
+        self._writers = {}
+        self._schemas = {}
+        self.portfolios_written = 0
+
+        self._pa = _require_pyarrow()
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, portfolio_id, portfolio, extra_tables=None):
+        """
+        Append one analyzed portfolio to every table.
+
+        Args:
+            portfolio_id: Identifier stored in the portfolio_id column (no
+                path separators)
+            portfolio: Portfolio with data loaded
+            extra_tables: Optional dict of table name -> DataFrame to append
+                alongside the standard tables (e.g. scenario results)
+        """
+        portfolio_id = _check_portfolio_id(portfolio_id)
+        frames = {
+            'timeseries': analysis_timeseries(portfolio, portfolio_id),
+            'contributions': analysis_contributions(portfolio, portfolio_id),
+            'metrics': analysis_metrics(portfolio, portfolio_id)
+        }
+        for name, frame in (extra_tables or {}).items():
+            frame = frame.copy()
+            frame.insert(0, 'portfolio_id', str(portfolio_id))
+            frames[name] = frame
+
+        for name, frame in frames.items():
+            self._write_table(name, frame, portfolio_id)
+
+        self.portfolios_written += 1
+
+    def _to_arrow(self, name, frame):
+        table = self._pa.Table.from_pandas(frame, preserve_index=False)
+        if name not in self._schemas:
+            # Normalise string columns so every file (and partition key) agrees
+            pa = self._pa
+            self._schemas[name] = pa.schema([
+                field.with_type(pa.string()) if pa.types.is_large_string(field.type) else field
+                for field in table.schema
+            ])
+        return table.cast(self._schemas[name])
+
+    def _write_table(self, name, frame, portfolio_id):
+        table = self._to_arrow(name, frame)
+        extension = _EXTENSIONS[self.format]
+
+        if self.partition_by_portfolio:
+            directory = os.path.join(self.path, name, f"portfolio_id={portfolio_id}")
+            os.makedirs(directory, exist_ok=True)
+            # Partition value lives in the directory name, as hive readers expect
+            table = table.drop_columns(['portfolio_id'])
+            self._write_file(os.path.join(directory, f"part-0{extension}"), table)
+            return
+
+        writer = self._writers.get(name)
+        if writer is None:
+            directory = os.path.join(self.path, name)
+            os.makedirs(directory, exist_ok=True)
+            writer = self._open_writer(os.path.join(directory, f"part-0{extension}"), table.schema)
+            self._writers[name] = writer
+        writer.write_table(table)
+
+    def _open_writer(self, filepath, schema):
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+            return pq.ParquetWriter(filepath, schema, compression=self.compression or 'none')
+
+        import pyarrow.ipc as ipc
+        options = ipc.IpcWriteOptions(compression=self.compression)
+        return ipc.new_file(filepath, schema, options=options)
+
+    def _write_file(self, filepath, table):
+        writer = self._open_writer(filepath, table.schema)
+        try:
+            writer.write_table(table)
+        finally:
+            writer.close()
+
+    def close(self):
+        for writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def write_analysis_dataset(portfolios, path, format='parquet', compression='zstd',
+                           partition_by_portfolio=False, extra_tables=None):
+    """
+    Write many analyzed portfolios to one columnar dataset.
+
+    Args:
+        portfolios: Dict of portfolio_id -> Portfolio, or an iterable of
+            (portfolio_id, Portfolio) pairs (a generator works, so a batch
+            job can stream results without keeping them all alive)
+        path: Target directory
+        format: 'parquet' or 'arrow'
+        compression: Codec name or None
+        partition_by_portfolio: Hive-partition every table by portfolio_id
+        extra_tables: Optional extra tables per portfolio (e.g. stress-test
+            results): a dict portfolio_id -> {table name: DataFrame}, or a
+            callable(portfolio_id, portfolio) returning such a dict, so a
+            streamed batch can compute them as it goes
+
+    Returns:
+        Number of portfolios written
+    """
+    items = portfolios.items() if isinstance(portfolios, dict) else portfolios
+
+    with AnalysisDatasetWriter(path, format, compression, partition_by_portfolio) as writer:
+        for portfolio_id, portfolio in items:
+            if callable(extra_tables):
+                tables = extra_tables(portfolio_id, portfolio)
+            else:
+                tables = (extra_tables or {}).get(portfolio_id)
+            writer.write(portfolio_id, portfolio, tables)
+
+    return writer.portfolios_written
+
+
+def read_analysis_table(path, table='timeseries', portfolio_ids=None):
+    """
+    Load one table of an exported dataset, optionally for a subset of portfolios.
+
+    Uses pyarrow.dataset so partitioned datasets are pruned by directory and
+    single-file datasets are filtered by predicate push-down.
+    """
+    pa = _require_pyarrow()
+    import pyarrow.dataset as ds
+
+    directory = os.path.join(path, table)
+    is_arrow = any(
+        f.endswith(_EXTENSIONS['arrow']) for _, _, files in os.walk(directory) for f in files
+    )
+    partitioning = ds.partitioning(pa.schema([('portfolio_id', pa.string())]), flavor='hive')
+    dataset = ds.dataset(directory, format='ipc' if is_arrow else 'parquet',
+                         partitioning=partitioning)
+
+    filter_expr = None
+    if portfolio_ids is not None:
+        filter_expr = ds.field('portfolio_id').isin([str(p) for p in portfolio_ids])
+
+    return dataset.to_table(filter=filter_expr).to_pandas()
@@ -0,0 +1,332 @@
+"""
+Sector / group-level return attribution.
+
+total_contribution_by_stock answers "which stocks made the money". This
+module answers the same question per sector, industry or theme, using a
+local classification file, and splits the active return against the
+benchmark into Brinson effects using benchmark constituent weights loaded
+from disk:
+
+    allocation    (wp - wb) * (rb - Rb)   over/underweighting a group
+    selection     wb * (rp - rb)          picking better names within it
+    interaction   (wp - wb) * (rp - rb)
+
+where wp/wb are the portfolio/benchmark weights of a group, rp/rb their
+returns within it, and Rb the total benchmark return (Brinson-Fachler).
+
+Groups are reduced with one indicator matrix: the returns matrix times the
+weighted indicator gives every group's contribution for every period in a
+single product. Single-period effects are linked across periods with
+Carino's logarithmic smoothing, so they add up exactly to the compounded
+active return.
+
+File formats:
+
+    classification    Ticker,Sector[,Industry,Theme,...]
+    benchmark weights Ticker,Weight   (any scale, normalized on load)
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CLASSIFICATION_PATH = 'sectors.csv'
+DEFAULT_BENCHMARK_WEIGHTS_PATH = 'benchmark_weights.csv'
+UNCLASSIFIED = 'Unclassified'
+ATTRIBUTION_EFFECTS = ['allocation', 'selection', 'interaction']
+
+# Periods single-period effects are computed over before linking
+LINK_FREQUENCIES = {'week': 'W-FRI', 'month': 'ME', 'quarter': 'QE', 'year': 'YE'}
+
+
+def load_classification(source):
+    """
+    Read a ticker -> sector/industry/theme mapping.
+
+    Args:
+        source: CSV path or file-like object with a 'Ticker' column and one
+            column per grouping level
+
+    Returns:
+        DataFrame indexed by ticker, one column per level
+    """
+    df = pd.read_csv(source)
+    if 'Ticker' not in df.columns or len(df.columns) < 2:
+        raise ValueError("Classification file needs a Ticker column and at least one grouping column")
+    df['Ticker'] = df['Ticker'].astype(str).str.strip()
+    return df.drop_duplicates('Ticker', keep='last').set_index('Ticker')
+
+
+def load_benchmark_weights(source):
+    """
+    Read benchmark constituent weights.
+
+    Args:
+        source: CSV path or file-like object with 'Ticker' and 'Weight'
+            (or 'Amount') columns
+
+    Returns:
+        Series ticker -> weight, normalized to sum to 1
+    """
+    df = pd.read_csv(source)
+    column = 'Weight' if 'Weight' in df.columns else 'Amount'
+    if 'Ticker' not in df.columns or column not in df.columns:
+        raise ValueError("Benchmark weights file needs Ticker and Weight columns")
+
+    weights = df.groupby(df['Ticker'].astype(str).str.strip())[column].sum()
+    weights = weights[weights > 0]
+    if weights.empty:
+        raise ValueError("Benchmark weights file has no positive weights")
+    return weights / weights.sum()
+
+
+def group_labels(tickers, classification, level='Sector'):
+    """Group of every ticker at `level` ('Unclassified' when unmapped)."""
+    if level not in classification.columns:
+        raise ValueError(f"Unknown level '{level}'. Classification has: {list(classification.columns)}")
+    labels = classification[level].reindex(list(tickers))
+    return labels.fillna(UNCLASSIFIED).astype(str).rename(level)
+
+
+def compound_periods(returns, frequency=None):
+    """
+    Returns compounded into longer periods.
+
+    Args:
+        returns: DataFrame or Series of per-bar returns
+        frequency: None (keep bars) or a key of LINK_FREQUENCIES
+
+    Returns:
+        Returns per period, indexed by period end
+    """
+    if frequency is None:
+        return returns
+    if frequency not in LINK_FREQUENCIES:
+        raise ValueError(f"Unknown frequency '{frequency}'. Use one of {list(LINK_FREQUENCIES)}")
+    grouped = (1 + returns).resample(LINK_FREQUENCIES[frequency])
+    return (grouped.prod() - 1)[grouped.size() > 0]
+
+
+def _indicator(labels):
+    """One-hot (tickers x groups) matrix and the group names."""
+    codes, groups = pd.factorize(labels, sort=True)
+    indicator = np.zeros((len(labels), len(groups)))
+    indicator[np.arange(len(labels)), codes] = 1.0
+    return indicator, list(groups)
+
+
+def group_contribution(stock_returns, weights, labels):
+    """
+    Per-period return contribution of every group.
+
+    Args:
+        stock_returns: DataFrame (periods x tickers)
+        weights: Series ticker -> portfolio weight
+        labels: Series ticker -> group
+
+    Returns:
+        DataFrame (periods x groups); rows sum to the portfolio return
+    """
+    tickers = list(stock_returns.columns)
+    indicator, groups = _indicator(labels.reindex(tickers).fillna(UNCLASSIFIED))
+    w = weights.reindex(tickers, fill_value=0.0).to_numpy(dtype=float)
+    contribution = stock_returns.to_numpy(dtype=float) @ (w[:, None] * indicator)
+    return pd.DataFrame(contribution, index=stock_returns.index, columns=groups)
+
+
+def brinson_attribution(stock_returns, portfolio_weights, benchmark_weights, labels):
+    """
+    Single-period Brinson-Fachler effects for every period and group.
+
+    A group the portfolio does not hold gets its benchmark return as the
+    portfolio return (no selection effect); a group missing from the
+    benchmark gets the portfolio's return as the benchmark return, so its
+    whole active contribution is allocation.
+
+    Args:
+        stock_returns: DataFrame (periods x tickers) covering every held
+            stock and every benchmark constituent
+        portfolio_weights: Series ticker -> portfolio weight
+        benchmark_weights: Series ticker -> benchmark weight
+        labels: Series ticker -> group
+
+    Returns:
+        Dictionary with 'allocation', 'selection', 'interaction',
+        'portfolio_group_returns', 'benchmark_group_returns' (DataFrames,
+        periods x groups), 'portfolio_group_weights',
+        'benchmark_group_weights' (Series per group) and
+        'portfolio_return', 'benchmark_return' (Series per period)
+    """
+    tickers = list(stock_returns.columns)
+    indicator, groups = _indicator(labels.reindex(tickers).fillna(UNCLASSIFIED))
+    r = stock_returns.to_numpy(dtype=float)
+    wp = portfolio_weights.reindex(tickers, fill_value=0.0).to_numpy(dtype=float)
+    wb = benchmark_weights.reindex(tickers, fill_value=0.0).to_numpy(dtype=float)
+
+    # Group weights and contributions: one reduction each
+    group_wp = wp @ indicator
+    group_wb = wb @ indicator
+    contribution_p = r @ (wp[:, None] * indicator)
+    contribution_b = r @ (wb[:, None] * indicator)
+    total_p = contribution_p.sum(axis=1)
+    total_b = contribution_b.sum(axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rp = contribution_p / group_wp
+        rb = contribution_b / group_wb
+    held, in_benchmark = group_wp > 0, group_wb > 0
+    rp = np.where(held, rp, rb)
+    rb = np.where(in_benchmark, rb, rp)
+    rp = np.where(held | in_benchmark, rp, 0.0)
+    rb = np.where(held | in_benchmark, rb, 0.0)
+
+    active_weight = group_wp - group_wb
+
+    def frame(values):
+        return pd.DataFrame(values, index=stock_returns.index, columns=groups)
+
+    return {
+        'allocation': frame(active_weight * (rb - total_b[:, None])),
+        'selection': frame(group_wb * (rp - rb)),
+        'interaction': frame(active_weight * (rp - rb)),
+        'portfolio_group_returns': frame(rp),
+        'benchmark_group_returns': frame(rb),
+        'portfolio_group_weights': pd.Series(group_wp, index=groups),
+        'benchmark_group_weights': pd.Series(group_wb, index=groups),
+        'portfolio_return': pd.Series(total_p, index=stock_returns.index),
+        'benchmark_return': pd.Series(total_b, index=stock_returns.index),
+    }
+
+
+def _log_ratio(portfolio_return, benchmark_return):
+    """(ln(1+Rp) - ln(1+Rb)) / (Rp - Rb), with its limit 1/(1+R) when equal."""
+    rp = np.asarray(portfolio_return, dtype=float)
+    rb = np.asarray(benchmark_return, dtype=float)
+    difference = rp - rb
+    equal = np.abs(difference) < 1e-12
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = (np.log1p(rp) - np.log1p(rb)) / np.where(equal, 1.0, difference)
+    return np.where(equal, 1 / (1 + rp), ratio)
+
+
+def link_effects(effects, portfolio_return, benchmark_return):
+    """
+    Link single-period effects across periods (Carino smoothing).
+
+    Each period's effects are scaled by k_t / K, where k is the log ratio
+    of that period's returns and K the log ratio of the compounded
+    returns, so the linked effects sum to the compounded active return.
+
+    Args:
+        effects: DataFrame (periods x groups) of one effect
+        portfolio_return: Series of per-period portfolio returns
+        benchmark_return: Series of per-period benchmark returns
+
+    Returns:
+        Series of linked effects per group
+    """
+    total_p = np.prod(1 + portfolio_return.to_numpy(dtype=float)) - 1
+    total_b = np.prod(1 + benchmark_return.to_numpy(dtype=float)) - 1
+    scale = _log_ratio(portfolio_return, benchmark_return) / _log_ratio(total_p, total_b)
+    return pd.Series(scale @ effects.to_numpy(dtype=float), index=effects.columns)
+
+
+def attribute(stock_returns, portfolio_weights, classification, benchmark_weights=None, level='Sector',
+              frequency=None):
+    """
+    Group contribution and (with benchmark weights) linked Brinson attribution.
+
+    Args:
+        stock_returns: DataFrame of per-bar returns (dates x tickers) for
+            the held stocks and any benchmark constituents
+        portfolio_weights: Series ticker -> portfolio weight
+        classification: DataFrame from load_classification
+        benchmark_weights: Series from load_benchmark_weights (optional)
+        level: Classification column to group by
+        frequency: Period for the single-period effects before linking:
+            None (every bar) or a key of LINK_FREQUENCIES. Within a longer
+            period, holdings are treated as fixed at their weights
+
+    Returns:
+        Dictionary with:
+            'groups'   - DataFrame per group: weights, compounded returns,
+                         contribution (summed per-bar, as
+                         total_contribution_by_stock) and, with a
+                         benchmark, linked allocation/selection/interaction
+                         and their sum 'active'
+            'periods'  - DataFrame per period: portfolio/benchmark return
+                         and (with a benchmark) the single-period effects
+                         summed over groups
+            'portfolio_return', 'benchmark_return', 'active_return'
+                       - compounded over the whole span (benchmark ones
+                         None without a benchmark)
+            'missing'  - benchmark constituents without returns (their
+                         weight is spread over the others)
+            'level'
+    """
+    portfolio_weights = portfolio_weights.groupby(level=0).sum()
+    missing = []
+    if benchmark_weights is not None:
+        missing = [t for t in benchmark_weights.index if t not in stock_returns.columns]
+        benchmark_weights = benchmark_weights.drop(missing)
+        if benchmark_weights.empty:
+            raise ValueError("No returns for any benchmark constituent")
+        benchmark_weights = benchmark_weights / benchmark_weights.sum()
+
+    held = [t for t in stock_returns.columns
+            if t in portfolio_weights.index or (benchmark_weights is not None and t in benchmark_weights.index)]
+    bar_returns = stock_returns[held].fillna(0.0)
+    labels = group_labels(held, classification, level)
+
+    contribution = group_contribution(bar_returns, portfolio_weights, labels)
+    periods_returns = compound_periods(bar_returns, frequency)
+
+    if benchmark_weights is None:
+        period_contribution = group_contribution(periods_returns, portfolio_weights, labels)
+        group_weights = portfolio_weights.reindex(held).groupby(labels).sum()
+        group_returns = period_contribution / group_weights
+        groups = pd.DataFrame({
+            'portfolio_weight': group_weights,
+            'portfolio_return': (1 + group_returns).prod() - 1,
+            'contribution': contribution.sum(),
+        })
+        period_total = period_contribution.sum(axis=1)
+        return {
+            'groups': groups.sort_values('contribution', ascending=False),
+            'periods': pd.DataFrame({'portfolio_return': period_total}),
+            'portfolio_return': float(np.prod(1 + period_total) - 1),
+            'benchmark_return': None,
+            'active_return': None,
+            'missing': missing,
+            'level': level,
+        }
+
+    brinson = brinson_attribution(periods_returns, portfolio_weights, benchmark_weights, labels)
+    rp, rb = brinson['portfolio_return'], brinson['benchmark_return']
+
+    groups = pd.DataFrame({
+        'portfolio_weight': brinson['portfolio_group_weights'],
+        'benchmark_weight': brinson['benchmark_group_weights'],
+        'portfolio_return': (1 + brinson['portfolio_group_returns']).prod() - 1,
+        'benchmark_return': (1 + brinson['benchmark_group_returns']).prod() - 1,
+        'contribution': contribution.sum().reindex(brinson['portfolio_group_weights'].index, fill_value=0.0),
+    })
+    for effect in ATTRIBUTION_EFFECTS:
+        groups[effect] = link_effects(brinson[effect], rp, rb)
+    groups['active'] = groups[ATTRIBUTION_EFFECTS].sum(axis=1)
+
+    periods = pd.DataFrame({'portfolio_return': rp, 'benchmark_return': rb})
+    for effect in ATTRIBUTION_EFFECTS:
+        periods[effect] = brinson[effect].sum(axis=1)
+    periods['active'] = rp - rb
+
+    total_p = float(np.prod(1 + rp) - 1)
+    total_b = float(np.prod(1 + rb) - 1)
+    return {
+        'groups': groups.sort_values('active', ascending=False),
+        'periods': periods,
+        'portfolio_return': total_p,
+        'benchmark_return': total_b,
+        'active_return': total_p - total_b,
+        'missing': missing,
+        'level': level,
+    }
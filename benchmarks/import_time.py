@@ -0,0 +1,105 @@
+"""
+Cold-start import benchmark for the compute modules.
+
+Each measurement runs in a fresh interpreter so nothing is cached in
+sys.modules. numpy/pandas are imported first and timed separately: they are
+the floor every caller already pays, and what we care about is the cost the
+analytics layer adds on top of them. The script also fails loudly if any of
+the heavy I/O, charting or JIT dependencies get pulled in by a plain
+import.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMPUTE_MODULES = [
+    'returns_calc',
+    'risk_metrics',
+    'market_metrics',
+    'portfolio_metrics',
+    'tail_risk',
+    'kernels',
+    'drawdown',
+    'portfolio',
+]
+
+HEAVY_MODULES = ['yfinance', 'matplotlib', 'streamlit', 'plotly', 'numba']
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import numpy, pandas
+base = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+end = time.perf_counter()
+loaded = [m for m in {heavy!r} if m in sys.modules]
+print(f"{{(base - start) * 1000:.3f}} {{(end - base) * 1000:.3f}} {{','.join(loaded)}}")
+"""
+
+
+def measure(modules, repeat=5):
+    """
+    Time importing `modules` in `repeat` fresh interpreters.
+
+    Returns:
+        Dictionary with median baseline (numpy+pandas) and incremental
+        import times in milliseconds, plus any heavy modules that loaded
+    """
+    code = _PROBE.format(modules=modules, heavy=HEAVY_MODULES)
+    baselines, incremental, leaked = [], [], set()
+
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, '-c', code],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.split()
+        baselines.append(float(out[0]))
+        incremental.append(float(out[1]))
+        if len(out) > 2:
+            leaked.update(out[2].split(','))
+
+    return {
+        'baseline_ms': statistics.median(baselines),
+        'import_ms': statistics.median(incremental),
+        'heavy_modules_loaded': sorted(leaked)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'Module':<20} {'numpy+pandas':>14} {'module':>10}")
+    print("-" * 60)
+
+    failures = []
+    for module in COMPUTE_MODULES:
+        result = measure([module], args.repeat)
+        print(f"{module:<20} {result['baseline_ms']:>11.1f} ms {result['import_ms']:>7.1f} ms")
+        if result['heavy_modules_loaded']:
+            failures.append((module, result['heavy_modules_loaded']))
+
+    total = measure(COMPUTE_MODULES, args.repeat)
+    print("-" * 60)
+    print(f"{'all compute modules':<20} {total['baseline_ms']:>11.1f} ms {total['import_ms']:>7.1f} ms")
+
+    if failures:
+        for module, heavy in failures:
+            print(f"✗ {module} imports heavy dependencies: {', '.join(heavy)}")
+        sys.exit(1)
+
+    print("✓ No I/O or charting dependencies loaded at import time")
+
+
+if __name__ == "__main__":
+    main()
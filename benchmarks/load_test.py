@@ -0,0 +1,138 @@
+"""
+Load test for the micro-batching analysis service.
+
+Starts service.AnalysisService in-process on a free port, backed by a stub
+price provider (deterministic synthetic prices, optional simulated network
+latency), and fires concurrent /analyze requests at it over keep-alive
+connections. Reports throughput, p50/p99 latency, rejections and the mean
+batch size the service achieved.
+
+Usage:
+    python benchmarks/load_test.py [--requests 2000] [--concurrency 64]
+                                   [--workers 4] [--batch-window-ms 10]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from service import AnalysisService  # noqa: E402
+
+
+def make_stub_loader(bars=252, latency=0.0):
+    """
+    Price provider returning the same synthetic history for a ticker every time.
+
+    Stands in for yfinance/PriceStore so the benchmark measures the service,
+    not the network.
+    """
+    index = pd.bdate_range(end='2024-12-31', periods=bars + 1)
+
+    def loader(ticker, start_date=None, end_date=None, period='1y', interval='1d'):
+        if latency:
+            time.sleep(latency)
+        rng = np.random.default_rng(zlib.crc32(ticker.encode('utf-8')))
+        close = 100 * np.cumprod(1 + rng.normal(0.0004, 0.015, len(index)))
+        return pd.DataFrame({'Close': close}, index=index)
+
+    return loader
+
+
+def random_portfolio(rng, universe, max_holdings=10):
+    k = int(rng.integers(2, max_holdings + 1))
+    tickers = list(rng.choice(universe, size=k, replace=False))
+    return {'tickers': tickers, 'amounts': [float(a) for a in rng.integers(1, 100, size=k) * 1000]}
+
+
+async def _client(port, bodies, latencies, statuses):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        for body in bodies:
+            data = json.dumps(body).encode('utf-8')
+            start = time.perf_counter()
+            writer.write(
+                b"POST /analyze HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') + data
+            )
+            await writer.drain()
+
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run(args):
+    service = AnalysisService(
+        loader=make_stub_loader(args.bars, args.provider_latency_ms / 1000),
+        batch_window=args.batch_window_ms / 1000,
+        max_batch=args.max_batch,
+        max_pending=args.max_pending,
+        max_workers=args.workers
+    )
+    port = await service.start(port=0)
+
+    rng = np.random.default_rng(7)
+    universe = [f"STOCK{i:03d}.NS" for i in range(args.universe)]
+    bodies = [random_portfolio(rng, universe) for _ in range(args.requests)]
+    per_client = [bodies[i::args.concurrency] for i in range(args.concurrency)]
+
+    latencies, statuses = [], {}
+    start = time.perf_counter()
+    await asyncio.gather(*(_client(port, chunk, latencies, statuses) for chunk in per_client))
+    elapsed = time.perf_counter() - start
+    await service.stop()
+
+    ms = sorted(x * 1000 for x in latencies)
+    stats = service.stats
+    print("=" * 60)
+    print("ANALYSIS SERVICE LOAD TEST")
+    print("=" * 60)
+    print(f"  Requests:          {len(ms):>10}   (concurrency {args.concurrency})")
+    print(f"  Workers:           {args.workers:>10}   (batch window {args.batch_window_ms:g} ms)")
+    print(f"  Throughput:        {len(ms) / elapsed:>10.1f} req/s")
+    print(f"  Latency p50:       {statistics.median(ms):>10.1f} ms")
+    print(f"  Latency p99:       {ms[int(0.99 * (len(ms) - 1))]:>10.1f} ms")
+    print(f"  Mean batch size:   {stats['batched_requests'] / max(stats['batches'], 1):>10.1f}")
+    print(f"  Rejected (503):    {stats['rejected']:>10}")
+    print(f"  Status codes:      {dict(sorted(statuses.items()))}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch-window-ms', type=float, default=10)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-pending', type=int, default=1000)
+    parser.add_argument('--universe', type=int, default=50, help="Distinct tickers requests draw from")
+    parser.add_argument('--bars', type=int, default=252)
+    parser.add_argument('--provider-latency-ms', type=float, default=0.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
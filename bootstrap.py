@@ -0,0 +1,174 @@
+"""
+Bootstrap confidence intervals for the headline and market metrics.
+
+A one-year Sharpe ratio is an estimate from ~250 noisy observations, not
+a precise number. This module resamples the aligned portfolio and
+benchmark returns and reports percentile intervals for every get_metrics
+figure plus information ratio and beta.
+
+Returns are autocorrelated in volatility, so rows are resampled in blocks
+rather than one at a time:
+
+    stationary   blocks of geometric length with the given mean
+                 (Politis & Romano), the default
+    block        circular blocks of fixed length
+    iid          single rows (ignores serial dependence)
+
+Portfolio and benchmark are resampled with the same rows, which keeps
+their co-movement intact for beta and the information ratio. Resamples
+are generated as index matrices (resamples x bars) and every statistic is
+evaluated on the whole matrix at once, so 10,000 resamples cost about a
+second instead of 10,000 rounds of pandas calls.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+BOOTSTRAP_METHODS = ('stationary', 'block', 'iid')
+BOOTSTRAP_METRICS = ['annual_return', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown',
+                     'information_ratio', 'beta']
+
+
+def default_block_length(n_obs):
+    """Mean block length of n^(1/3) bars (about 6 for a year of daily data)."""
+    return max(1, int(round(n_obs ** (1 / 3))))
+
+
+def bootstrap_indices(n_obs, n_resamples, method='stationary', block_length=None, rng=None):
+    """
+    Row indices of bootstrap resamples.
+
+    Args:
+        n_obs: Number of observations in the original series
+        n_resamples: Number of resamples (rows of the result)
+        method: 'stationary', 'block' or 'iid'
+        block_length: Mean (stationary) or fixed (block) block length in
+            bars (default: default_block_length)
+        rng: numpy Generator or seed
+
+    Returns:
+        Integer array (n_resamples x n_obs); row i indexes the i-th resample
+    """
+    rng = np.random.default_rng(rng)
+    length = block_length or default_block_length(n_obs)
+    positions = np.arange(n_obs)
+
+    if method == 'stationary':
+        # A new block starts at each bar with probability 1/length; within a
+        # block, indices advance by one from a random start (wrapping around)
+        new_block = rng.random((n_resamples, n_obs)) < 1.0 / length
+        new_block[:, 0] = True
+        block_start = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+        starts = rng.integers(0, n_obs, size=(n_resamples, n_obs))
+        first = np.take_along_axis(starts, block_start, axis=1)
+        return (first + positions - block_start) % n_obs
+
+    if method == 'block':
+        n_blocks = -(-n_obs // length)
+        starts = rng.integers(0, n_obs, size=(n_resamples, n_blocks))
+        return (starts[:, positions // length] + positions % length) % n_obs
+
+    if method == 'iid':
+        return rng.integers(0, n_obs, size=(n_resamples, n_obs))
+
+    raise ValueError(f"Unknown bootstrap method '{method}'. Use one of {BOOTSTRAP_METHODS}")
+
+
+def _batch_metrics(r, b, risk_free_rate, trading_days):
+    """
+    Metrics for every row of a (resamples x bars) returns matrix.
+
+    The resamples are the columns of comparison.column_metrics, so each
+    bootstrap value is the Portfolio metric of that resample by construction.
+    """
+    from comparison import column_metrics
+
+    return column_metrics(r.T, None if b is None else b.T, None, risk_free_rate, trading_days)
+
+
+def _paired(portfolio_returns, benchmark_returns):
+    if benchmark_returns is None:
+        return portfolio_returns.dropna().to_numpy(dtype=float), None
+    frame = pd.concat([portfolio_returns, benchmark_returns], axis=1, join='inner').dropna()
+    return frame.iloc[:, 0].to_numpy(dtype=float), frame.iloc[:, 1].to_numpy(dtype=float)
+
+
+def bootstrap_distribution(portfolio_returns, benchmark_returns=None, risk_free_rate=0.065,
+                           trading_days=252, n_resamples=10000, method='stationary', block_length=None,
+                           seed=None, chunk_size=2000):
+    """
+    Bootstrap distribution of every metric.
+
+    Args:
+        portfolio_returns: Series of portfolio returns
+        benchmark_returns: Series of benchmark returns (optional; IR and
+            beta are NaN without it)
+        risk_free_rate: Annual risk-free rate
+        trading_days: Bars per year
+        n_resamples: Number of resamples
+        method: 'stationary', 'block' or 'iid'
+        block_length: Mean/fixed block length in bars (default n^(1/3))
+        seed: Seed for reproducible resamples
+        chunk_size: Resamples evaluated per batch (bounds memory use)
+
+    Returns:
+        DataFrame (resamples x BOOTSTRAP_METRICS)
+    """
+    r, b = _paired(portfolio_returns, benchmark_returns)
+    if len(r) < 2:
+        raise ValueError("Need at least two returns to bootstrap")
+
+    rng = np.random.default_rng(seed)
+    chunks = {metric: [] for metric in BOOTSTRAP_METRICS}
+    for start in range(0, n_resamples, chunk_size):
+        indices = bootstrap_indices(len(r), min(chunk_size, n_resamples - start), method, block_length, rng)
+        values = _batch_metrics(r[indices], None if b is None else b[indices], risk_free_rate, trading_days)
+        for metric in BOOTSTRAP_METRICS:
+            chunks[metric].append(values[metric])
+
+    return pd.DataFrame({metric: np.concatenate(parts) for metric, parts in chunks.items()})
+
+
+def bootstrap_confidence_intervals(portfolio_returns, benchmark_returns=None, risk_free_rate=0.065,
+                                   trading_days=252, n_resamples=10000, method='stationary',
+                                   block_length=None, confidence=0.95, seed=None):
+    """
+    Percentile confidence intervals for the headline and market metrics.
+
+    Args:
+        portfolio_returns: Series of portfolio returns
+        benchmark_returns: Series of benchmark returns (optional)
+        risk_free_rate: Annual risk-free rate
+        trading_days: Bars per year
+        n_resamples: Number of resamples
+        method: 'stationary', 'block' or 'iid'
+        block_length: Mean/fixed block length in bars (default n^(1/3))
+        confidence: Interval coverage (e.g. 0.95)
+        seed: Seed for reproducible resamples
+
+    Returns:
+        DataFrame indexed by metric with 'estimate' (the full-sample
+        value), 'lower', 'upper' and 'std_error' columns
+    """
+    samples = bootstrap_distribution(portfolio_returns, benchmark_returns, risk_free_rate, trading_days,
+                                     n_resamples, method, block_length, seed)
+
+    r, b = _paired(portfolio_returns, benchmark_returns)
+    estimate = _batch_metrics(r[None, :], None if b is None else b[None, :], risk_free_rate, trading_days)
+
+    values = samples.replace([np.inf, -np.inf], np.nan).to_numpy()
+    alpha = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        # IR and beta are all-NaN without a benchmark
+        warnings.simplefilter('ignore', RuntimeWarning)
+        lower, upper = np.nanquantile(values, [alpha, 1 - alpha], axis=0)
+        std_error = np.nanstd(values, axis=0, ddof=1)
+
+    return pd.DataFrame({
+        'estimate': [float(estimate[metric][0]) for metric in BOOTSTRAP_METRICS],
+        'lower': lower,
+        'upper': upper,
+        'std_error': std_error,
+    }, index=pd.Index(BOOTSTRAP_METRICS, name='metric'))
@@ -0,0 +1,116 @@
+"""
+Calendar-period returns (monthly, quarterly, yearly).
+
+Answers "how did this allocation do in each month and year" for the
+portfolio, the benchmark and every holding at once. Returns are turned
+into log returns, summed per calendar month in one groupby over the whole
+(dates x series) matrix, and compounded back with expm1. Quarters and
+years are sums of the monthly log returns, so the daily data is reduced
+only once however many frequencies are asked for.
+
+Missing values (a stock listed mid-period) are skipped; a period in which
+a series has no returns at all is NaN rather than 0%. The first and last
+periods cover only the part of them inside the analysed window.
+
+Excess returns are the period return minus the benchmark's return over
+the same period (not the compounded daily excess).
+"""
+
+import numpy as np
+import pandas as pd
+
+# Calendar frequency -> pandas period code
+CALENDAR_FREQUENCIES = {'month': 'M', 'quarter': 'Q', 'year': 'Y'}
+
+_PERIOD_LABELS = {
+    'month': ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'],
+    'quarter': ['Q1', 'Q2', 'Q3', 'Q4'],
+}
+
+
+def _month_index(index):
+    # Periods carry no timezone; drop it first so pandas does not warn
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    return index.to_period('M')
+
+
+def calendar_returns(returns, frequencies=('month', 'quarter', 'year')):
+    """
+    Compounded return of every column over each calendar period.
+
+    Args:
+        returns: DataFrame of simple returns (dates x series), or a Series
+        frequencies: Any of 'month', 'quarter', 'year'
+
+    Returns:
+        Dictionary frequency -> DataFrame (periods x series) indexed by
+        pandas Period
+    """
+    unknown = set(frequencies) - set(CALENDAR_FREQUENCIES)
+    if unknown:
+        raise ValueError(f"Unknown calendar frequency {sorted(unknown)}. "
+                         f"Use one of {list(CALENDAR_FREQUENCIES)}")
+
+    frame = returns.to_frame() if isinstance(returns, pd.Series) else returns
+    log_returns = np.log1p(frame.astype(float))
+    monthly = log_returns.groupby(_month_index(frame.index)).sum(min_count=1)
+
+    periods = {}
+    for frequency in frequencies:
+        sums = monthly
+        if frequency != 'month':
+            sums = monthly.groupby(monthly.index.asfreq(CALENDAR_FREQUENCIES[frequency])).sum(min_count=1)
+        periods[frequency] = np.expm1(sums)
+    return periods
+
+
+def excess_returns(periods, benchmark='Market'):
+    """
+    Period returns minus the benchmark's return over the same period.
+
+    Args:
+        periods: Dictionary from calendar_returns
+        benchmark: Benchmark column
+
+    Returns:
+        Dictionary frequency -> DataFrame without the benchmark column
+        (empty dictionary when there is no benchmark column)
+    """
+    return {
+        frequency: table.drop(columns=benchmark).sub(table[benchmark], axis=0)
+        for frequency, table in periods.items()
+        if benchmark in table
+    }
+
+
+def calendar_table(periods, column, frequency='month'):
+    """
+    Year x month (or quarter) grid of one series, for tables and heatmaps.
+
+    Args:
+        periods: Dictionary from calendar_returns (or excess_returns); it
+            must hold `frequency` and 'year'
+        column: Series to lay out
+        frequency: 'month' or 'quarter'
+
+    Returns:
+        DataFrame indexed by year with one column per month/quarter and a
+        'Year' column with the full-year figure
+    """
+    if frequency not in _PERIOD_LABELS:
+        raise ValueError(f"Calendar grids are by 'month' or 'quarter', not '{frequency}'")
+
+    series = periods[frequency][column]
+    labels = _PERIOD_LABELS[frequency]
+    position = series.index.month if frequency == 'month' else series.index.quarter
+
+    grid = pd.DataFrame({'year': series.index.year, 'period': position, 'value': series.to_numpy()})
+    table = grid.pivot(index='year', columns='period', values='value')
+    table = table.reindex(columns=range(1, len(labels) + 1))
+    table.columns = labels
+
+    yearly = periods['year'][column]
+    table['Year'] = pd.Series(yearly.to_numpy(), index=yearly.index.year).reindex(table.index)
+    table.index.name = None
+    return table
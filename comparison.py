@@ -0,0 +1,227 @@
+"""
+Side-by-side comparison of several portfolios sharing one data load.
+
+Current, proposed and model portfolios usually hold many of the same
+stocks. Rather than downloading and aligning each one separately, the union
+of their tickers is loaded and aligned once into a single returns matrix R
+(dates x tickers). The portfolios become the columns of a weight matrix W
+(tickers x portfolios, zero where a stock is not held), so every
+portfolio's return series comes from one product R @ W, and the metrics for
+all of them are computed column-wise in one pass (column_metrics, which the
+screener and the bootstrap share).
+
+All portfolios are evaluated on the same aligned dates, so the comparison
+is like for like. An extra portfolio is one more column of W: no new
+download unless it brings new tickers.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from portfolio import Portfolio
+
+COMPARISON_METRICS = [
+    'annual_return', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown',
+    'annualized_excess_return', 'tracking_error', 'information_ratio', 'beta'
+]
+
+
+def definitions_from_csv(sources, names=None):
+    """
+    Read several portfolio CSVs (Ticker, Amount) into definitions.
+
+    Args:
+        sources: File paths or file-like objects
+        names: Portfolio names (default: file name without extension)
+
+    Returns:
+        Dictionary name -> (tickers, weights)
+    """
+    definitions = {}
+    for i, source in enumerate(sources):
+        if names is not None:
+            name = names[i]
+        else:
+            name = os.path.splitext(os.path.basename(getattr(source, 'name', str(source))))[0]
+        portfolio = Portfolio.from_csv(source)
+        definitions[name] = (list(portfolio.tickers), list(portfolio.weights))
+    return definitions
+
+
+def union_tickers(definitions):
+    """Every ticker held by any portfolio, in first-seen order."""
+    return list(dict.fromkeys(t for tickers, _ in definitions.values() for t in tickers))
+
+
+def weight_matrix(definitions, tickers=None):
+    """
+    Weights of every portfolio over a common ticker list.
+
+    Returns:
+        DataFrame (tickers x portfolios), zero where a stock is not held
+    """
+    tickers = tickers if tickers is not None else union_tickers(definitions)
+    matrix = pd.DataFrame(0.0, index=pd.Index(tickers), columns=list(definitions))
+    for name, (held, weights) in definitions.items():
+        # Duplicate tickers within one portfolio are summed
+        matrix[name] = pd.Series(weights, index=held).groupby(level=0).sum().reindex(tickers, fill_value=0.0)
+    return matrix
+
+
+def shared_portfolio(definitions, benchmark_ticker='^NSEI'):
+    """
+    Portfolio over the union of tickers, used only to load and align data.
+
+    Its own (equal) weights are a placeholder; call download_data() or set
+    stock_data/benchmark_data on it, then pass it to compare_portfolios.
+    """
+    tickers = union_tickers(definitions)
+    portfolio = Portfolio(tickers, [1 / len(tickers)] * len(tickers))
+    portfolio.benchmark_ticker = benchmark_ticker
+    return portfolio
+
+
+def portfolio_returns_matrix(stock_returns_df, weights):
+    """Return series of every portfolio at once, R @ W (dates x portfolios)."""
+    weights = weights.reindex(stock_returns_df.columns, fill_value=0.0)
+    values = stock_returns_df.to_numpy(dtype=float) @ weights.to_numpy(dtype=float)
+    return pd.DataFrame(values, index=stock_returns_df.index, columns=weights.columns)
+
+
+def column_metrics(r, b=None, valid=None, risk_free_rate=0.065, trading_days=252):
+    """
+    COMPARISON_METRICS for every column of a returns array.
+
+    The one column-wise implementation of get_metrics and the Portfolio
+    market metrics: portfolio comparisons, the universe screener and the
+    bootstrap (resamples as columns) all evaluate their columns here.
+
+    Args:
+        r: Array of returns (bars x columns)
+        b: Benchmark returns (optional), either (bars,) shared by every
+            column or (bars x columns), one benchmark series per column
+        valid: Boolean array (bars x columns) of the returns each column
+            uses (default: all). Metrics of a column are computed over its
+            valid rows only; its wealth is carried across the others
+        risk_free_rate: Annual risk-free rate
+        trading_days: Bars per year
+
+    Returns:
+        Dictionary metric -> array (columns); benchmark-relative metrics
+        are NaN without a benchmark, and a metric needing more valid rows
+        than a column has (e.g. a downside deviation from one loss) is NaN
+    """
+    r = np.asarray(r, dtype=float)
+    count = len(r) if valid is None else valid.sum(axis=0)
+    scale = np.sqrt(trading_days)
+
+    def masked(x, mask=valid, fill=0.0):
+        return x if mask is None else np.where(mask, x, fill)
+
+    def annualized(x):
+        return np.prod(masked(1 + x, fill=1.0), axis=0) ** (trading_days / count) - 1
+
+    def variance(x, mask=valid):
+        # Sample variance (ddof=1) over the masked rows
+        n = len(x) if mask is None else mask.sum(axis=0)
+        deviations = x - masked(x, mask).sum(axis=0) / n
+        return masked(deviations ** 2, mask).sum(axis=0) / (n - 1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        annual = annualized(r)
+        volatility = np.sqrt(variance(r)) * scale
+        # Downside deviation: sample std of the negative returns only
+        negative = r < 0
+        downside = np.sqrt(variance(r, negative if valid is None else valid & negative)) * scale
+
+        wealth = np.cumprod(masked(1 + r, fill=1.0), axis=0)
+        metrics = {
+            'annual_return': annual,
+            'volatility': volatility,
+            'sharpe_ratio': (annual - risk_free_rate) / volatility,
+            'sortino_ratio': (annual - risk_free_rate) / downside,
+            'max_drawdown': (wealth / np.maximum.accumulate(wealth, axis=0) - 1).min(axis=0),
+        }
+
+        if b is None:
+            for metric in COMPARISON_METRICS[5:]:
+                metrics[metric] = np.full(r.shape[1], np.nan)
+            return metrics
+
+        b = np.asarray(b, dtype=float)
+        b = np.broadcast_to(b[:, None] if b.ndim == 1 else b, r.shape)
+        excess = r - b
+        tracking = np.sqrt(variance(excess)) * scale
+        centered = (r - masked(r).sum(axis=0) / count) * (b - masked(b).sum(axis=0) / count)
+        covariance = masked(centered).sum(axis=0) / (count - 1)
+
+        metrics['annualized_excess_return'] = annual - annualized(b)
+        metrics['tracking_error'] = tracking
+        metrics['information_ratio'] = annualized(excess) / tracking
+        metrics['beta'] = covariance / variance(b)
+    return metrics
+
+
+def compare_metrics(returns, benchmark_returns=None, risk_free_rate=0.065, trading_days=252):
+    """
+    Metrics for every column of a returns matrix, computed column-wise.
+
+    Matches get_metrics and the market metrics of a single Portfolio (see
+    column_metrics).
+
+    Args:
+        returns: DataFrame of returns (dates x portfolios)
+        benchmark_returns: Series of benchmark returns on the same dates (optional)
+        risk_free_rate: Annual risk-free rate
+        trading_days: Bars per year
+
+    Returns:
+        DataFrame (portfolios x COMPARISON_METRICS)
+    """
+    r = returns.to_numpy(dtype=float)
+    if len(r) < 2:
+        raise ValueError("Need at least two returns to compare portfolios")
+
+    b = None
+    if benchmark_returns is not None:
+        b = benchmark_returns.reindex(returns.index).to_numpy(dtype=float)
+    metrics = column_metrics(r, b, None, risk_free_rate, trading_days)
+    return pd.DataFrame(metrics, index=returns.columns)[COMPARISON_METRICS]
+
+
+def compare_portfolios(definitions, shared, risk_free_rate=None):
+    """
+    Compare portfolios on the aligned data of a shared portfolio.
+
+    Args:
+        definitions: Dictionary name -> (tickers, weights)
+        shared: Portfolio holding (at least) the union of tickers, with data
+            loaded; see shared_portfolio
+        risk_free_rate: Annual risk-free rate (default: the shared portfolio's)
+
+    Returns:
+        Dictionary with:
+            'weights' - weight matrix (tickers x portfolios)
+            'returns' - return series (dates x portfolios)
+            'cumulative_returns' - cumulative returns (dates x portfolios)
+            'metrics' - metric table (portfolios x metrics)
+    """
+    if risk_free_rate is None:
+        risk_free_rate = shared.risk_free_rate
+
+    stock_returns = shared.stock_returns_df
+    missing = [t for t in union_tickers(definitions) if t not in stock_returns.columns]
+    if missing:
+        raise KeyError(f"No aligned data for: {', '.join(missing)}")
+
+    weights = weight_matrix(definitions, list(stock_returns.columns))
+    returns = portfolio_returns_matrix(stock_returns, weights)
+
+    return {
+        'weights': weights,
+        'returns': returns,
+        'cumulative_returns': (1 + returns).cumprod() - 1,
+        'metrics': compare_metrics(returns, shared.benchmark_returns, risk_free_rate, shared.periods_per_year)
+    }
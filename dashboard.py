@@ -4,8 +4,19 @@ import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
 from portfolio import Portfolio
-from returns_calc import calculate_cumulative_returns
+from downsample import downsample_series, downsample_frame, describe_reduction
+from sweep import build_portfolio, run_sweep, pivot_cube
+from comparison import definitions_from_csv, union_tickers, compare_portfolios
+from attribution import load_classification, load_benchmark_weights, LINK_FREQUENCIES
+from calendar_returns import calendar_table, excess_returns
+from scenarios import HISTORICAL_SCENARIOS, HYPOTHETICAL_SHOCKS, stress_test
+from alignment import ALIGNMENT_POLICIES, DEFAULT_ALIGNMENT, DEFAULT_MAX_GAP
+from frequency import is_intraday
 import json
+import time
+from datetime import timedelta
+from jobs import BackgroundJob, analysis_pipeline, screen_pipeline
+from screener import universe_from_csv, filter_screen
 
 # Page configuration
 st.set_page_config(
@@ -41,6 +52,35 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
+@st.cache_resource
+def get_price_store():
+    """One price store per server process, shared by every session."""
+    from price_store import PriceStore
+    return PriceStore(refresh_policy={'^*': timedelta(minutes=15)}, default_max_age=timedelta(hours=12))
+
+
+# Seconds between reruns while a background analysis is in progress
+JOB_POLL_SECONDS = 0.5
+
+
+def wait_for(stage=None):
+    """
+    Stop rendering here until the running background job has published
+    `stage` (or finished, for None), then rerun the page.
+    """
+    job = st.session_state.get('job')
+    if job is None or (stage is not None and job.is_ready(stage)):
+        return
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
+
+
+# Selector options. One download covers every combination: the longest
+# period and all benchmarks are fetched once, and switching selectors only
+# slices that dataset in memory.
+BENCHMARK_OPTIONS = ["^NSEI", "^GSPC", "^DJI", "^IXIC"]
+PERIOD_OPTIONS = ["1mo", "3mo", "6mo", "1y", "2y", "5y"]
+
 # Title
 st.title(" Portfolio Analyzer Dashboard")
 st.markdown("---")
@@ -139,7 +179,7 @@ with st.sidebar:
     # Benchmark selector
     benchmark = st.selectbox(
         "📈 Benchmark",
-        ["^NSEI", "^GSPC", "^DJI", "^IXIC"],
+        BENCHMARK_OPTIONS,
         index=0,
         help="Select market benchmark for comparison"
     )
@@ -147,11 +187,20 @@ with st.sidebar:
     # Period selector
     period = st.selectbox(
         "📅 Analysis Period",
-        ["1mo", "3mo", "6mo", "1y", "2y", "5y"],
+        PERIOD_OPTIONS,
         index=3,
         help="Historical period for analysis"
     )
     
+    # Bar interval
+    interval = st.selectbox(
+        "⏱️ Bar Interval",
+        ["1d", "1wk", "1mo", "1h", "5m", "1m"],
+        index=0,
+        help="Price bar frequency. Metrics are annualized for the chosen interval. "
+             "Intraday bars are limited by the data source (5m: last 60 days, 1m: last 7 days)."
+    )
+    
     # Risk-free rate
     risk_free_rate = st.number_input(
         "🎯 Risk-Free Rate (%)",
@@ -162,10 +211,123 @@ with st.sidebar:
         help="Annual risk-free rate for Sharpe/Sortino calculation"
     ) / 100
     
+    # Additional portfolios compared against the one above
+    with st.expander("⚖️ Compare Portfolios"):
+        comparison_files = st.file_uploader(
+            "Upload portfolios to compare",
+            type=['csv'],
+            accept_multiple_files=True,
+            help="Each CSV (Ticker, Amount) is one portfolio, named after the file. "
+                 "All portfolios share one data download."
+        )
+    
+    # Sector / theme attribution from local files
+    with st.expander("🏷️ Sector Attribution"):
+        classification_file = st.file_uploader(
+            "Classification CSV",
+            type=['csv'],
+            help="Ticker,Sector[,Industry,Theme,...] - one column per grouping level"
+        )
+        benchmark_weights_file = st.file_uploader(
+            "Benchmark constituent weights CSV",
+            type=['csv'],
+            help="Ticker,Weight for the benchmark's constituents. Enables Brinson allocation/selection; "
+                 "constituents are included in the data download."
+        )
+    
+    # Historical windows and hypothetical shocks against the current weights
+    with st.expander("🧨 Stress Tests"):
+        stress_scenarios = st.multiselect(
+            "Historical windows",
+            list(HISTORICAL_SCENARIOS),
+            default=list(HISTORICAL_SCENARIOS),
+            help="Replayed from long daily history in the shared price store. Holdings without "
+                 "history in a window follow their beta to the benchmark."
+        )
+        stress_market_shock = st.number_input(
+            "Benchmark shock (%)",
+            min_value=-90.0,
+            max_value=50.0,
+            value=-20.0,
+            step=5.0,
+            help="Propagated to every holding through its beta"
+        ) / 100
+        stress_sector_shocks = st.text_input(
+            "Sector shocks (%)",
+            placeholder="IT:-15, Banks:-10",
+            help="Added to the members of each sector on top of the benchmark shock. "
+                 "Uses the classification file under Sector Attribution."
+        )
+        run_stress_test = st.button("Run Stress Tests", use_container_width=True)
+    
+    # Single-stock screen of a universe against the analyzed portfolio
+    with st.expander("🔎 Screener"):
+        universe_file = st.file_uploader(
+            "Universe CSV",
+            type=['csv'],
+            help="Tickers to screen (Ticker column, e.g. all NIFTY 500 names). "
+                 "Uses the selected benchmark, period and interval; prices come from the shared store."
+        )
+        run_screener = st.button("Run Screener", use_container_width=True, disabled=universe_file is None)
+    
+    # How dates of different exchanges are combined
+    with st.expander("🗓️ Date Alignment"):
+        alignment_policy = st.selectbox(
+            "Alignment policy",
+            list(ALIGNMENT_POLICIES),
+            index=list(ALIGNMENT_POLICIES).index(DEFAULT_ALIGNMENT),
+            format_func=lambda p: {'strict': "Strict (common dates only)",
+                                   'ffill': "Forward-fill short gaps",
+                                   'exchange': "Per-exchange calendars"}[p],
+            help="Strict drops every date on which any holding or the benchmark has no bar. The other "
+                 "policies carry the last price over exchange holidays and short gaps instead."
+        )
+        max_fill_gap = int(st.number_input(
+            "Max gap to fill (bars)",
+            min_value=0,
+            max_value=30,
+            value=DEFAULT_MAX_GAP,
+            step=1,
+            disabled=alignment_policy == 'strict',
+            help="Longer runs of missing bars are dropped rather than filled"
+        ))
+    
+    # Chart rendering
+    with st.expander("🖥️ Chart Settings"):
+        max_chart_points = st.number_input(
+            "Max points per trace",
+            min_value=200,
+            max_value=20000,
+            value=1500,
+            step=100,
+            help="Long series are downsampled (shape-preserving) to this many points before plotting"
+        )
+    
     st.markdown("---")
     
     # Run analysis button
     run_analysis = st.button("🚀 Run Analysis", type="primary", use_container_width=True)
+    
+    # Restore an analysis saved by a batch job or another session
+    with st.expander("📂 Load Snapshot"):
+        snapshot_path = st.text_input(
+            "Snapshot directory",
+            value="snapshots/latest",
+            help="Directory written by Portfolio.save_snapshot. Restores in milliseconds, no download."
+        )
+        load_snapshot = st.button("Load Snapshot", use_container_width=True)
+
+# Snapshot restore
+if load_snapshot:
+    try:
+        st.session_state['snapshot'] = Portfolio.load_snapshot(snapshot_path)
+        st.session_state['analysis_complete'] = True
+        running_job = st.session_state.pop('job', None)
+        if running_job is not None:
+            running_job.cancel()
+        st.success(f"✅ Snapshot loaded from {snapshot_path}")
+    except (FileNotFoundError, ValueError) as e:
+        st.error(f"❌ Could not load snapshot: {e}")
 
 # Main content
 if uploaded_file is not None or (input_method == "Edit Sample Portfolio" and edited_df is not None and len(edited_df) > 0):
@@ -191,41 +353,137 @@ if uploaded_file is not None or (input_method == "Edit Sample Portfolio" and edi
                 portfolio_source = "uploaded file"
             
             # Initialize portfolio
-            with st.spinner(f"Loading {portfolio_source}..."):
-                portfolio = Portfolio.from_csv("temp_portfolio.csv")
-                portfolio.benchmark_ticker = benchmark
-            
-            # Download data
-            with st.spinner(f"Downloading {period} of market data..."):
-                portfolio.download_data(period=period)
-            
-            # Validate data
-            with st.spinner("Validating data quality..."):
-                portfolio._validate_stock_data()
+            definition = Portfolio.from_csv("temp_portfolio.csv")
+            definitions = {"Current": (list(definition.tickers), list(definition.weights))}
+            definitions.update(definitions_from_csv(comparison_files or []))
             
-            # Calculate returns
-            with st.spinner("Calculating returns..."):
-                portfolio.calculate_portfolio_returns()
+            # Benchmark constituents share the download, for Brinson attribution
+            download_tickers = union_tickers(definitions)
+            if benchmark_weights_file is not None:
+                benchmark_weights_file.seek(0)
+                constituents = load_benchmark_weights(benchmark_weights_file).index
+                download_tickers += [t for t in constituents if t not in download_tickers]
             
-            # Get metrics
-            with st.spinner("Computing metrics..."):
-                metrics = portfolio.get_metrics(risk_free_rate)
-            
-            # Store in session state
-            st.session_state['portfolio'] = portfolio
-            st.session_state['metrics'] = metrics
-            st.session_state['analysis_complete'] = True
-            
-            st.success("✅ Analysis complete!")
+            # Download, validation and metrics run on a worker thread; the page
+            # polls the job and renders each section once its inputs are ready
+            previous_job = st.session_state.pop('job', None)
+            if previous_job is not None:
+                previous_job.cancel()
+            st.session_state['job'] = BackgroundJob(
+                analysis_pipeline,
+                list(definition.tickers), list(definition.weights), definitions, download_tickers,
+                BENCHMARK_OPTIONS, PERIOD_OPTIONS, period, benchmark, interval, risk_free_rate,
+                loader=get_price_store().get, alignment=alignment_policy, max_fill_gap=max_fill_gap
+            ).start()
+            st.session_state['job_context'] = {
+                'definition': (list(definition.tickers), list(definition.weights)),
+                'definitions': definitions,
+                'cell': (period, benchmark, alignment_policy, max_fill_gap)
+            }
+            st.session_state['snapshot'] = None
+            st.session_state['analysis_complete'] = False
             
         except Exception as e:
             st.error(f"❌ Error during analysis: {str(e)}")
             st.stop()
 
-# Display results if analysis is complete
-if 'analysis_complete' in st.session_state and st.session_state['analysis_complete']:
-    portfolio = st.session_state['portfolio']
-    metrics = st.session_state['metrics']
+# Background analysis: progress bar, cancellation, and hand-over of finished results
+job = st.session_state.get('job')
+if job is not None:
+    context = st.session_state['job_context']
+    
+    if job.status == 'done':
+        # Store in session state; other (period, benchmark) portfolios are built lazily
+        st.session_state['definition'] = context['definition']
+        st.session_state['sweep_data'] = job.stages['data']
+        st.session_state['sweep_portfolios'] = {context['cell']: job.stages['portfolio']}
+        st.session_state['definitions'] = context['definitions']
+        st.session_state['comparison_portfolios'] = (
+            {context['cell']: job.stages['comparison']} if job.is_ready('comparison') else {}
+        )
+        st.session_state['attribution_reports'] = {}
+        st.session_state.pop('sweep_cube', None)
+        st.session_state['analysis_complete'] = True
+        del st.session_state['job']
+        job = None
+        
+    elif job.status == 'failed':
+        del st.session_state['job']
+        st.error(f"❌ Error during analysis: {job.error}")
+        st.stop()
+    
+    elif job.status == 'cancelled':
+        del st.session_state['job']
+        job = None
+        st.warning("⚠️ Analysis cancelled")
+    
+    else:
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.progress(job.progress, text=f"{job.message} ({job.elapsed:.0f}s)")
+        with col2:
+            cancel_job = st.button("✖ Cancel", use_container_width=True)
+        if cancel_job:
+            # The worker stops at its next checkpoint (between tickers or stages)
+            job.cancel()
+            del st.session_state['job']
+            job = None
+            st.warning("⚠️ Analysis cancelled")
+
+# Display results as they become available
+if job is not None or st.session_state.get('analysis_complete'):
+    snapshot = st.session_state.get('snapshot')
+    
+    if job is not None:
+        # Still running: show the job's cell; sections below wait for their stage
+        wait_for('portfolio')
+        portfolio = job.stages['portfolio']
+        sweep_data = job.stages['data']
+        definitions = context['definitions']
+        cell = context['cell']
+        period, benchmark = cell[:2]
+        st.session_state['comparison_portfolios'] = (
+            {cell: job.stages['comparison']} if job.is_ready('comparison') else {}
+        )
+    
+    elif snapshot is not None:
+        # Snapshot: fixed data, so only the risk-free rate applies
+        portfolio = snapshot
+        sweep_data = None
+        definitions = {}
+        benchmark = portfolio.benchmark_ticker
+        st.info(f"📂 Snapshot: {len(portfolio.tickers)} stocks, {portfolio.price_matrix.index[0]:%Y-%m-%d} to "
+                f"{portfolio.price_matrix.index[-1]:%Y-%m-%d}, {portfolio.interval} bars vs {benchmark}. "
+                "Period, benchmark and interval selectors do not apply.")
+    else:
+        tickers, weights = st.session_state['definition']
+        sweep_data = st.session_state['sweep_data']
+        definitions = st.session_state['definitions']
+        
+        if interval != sweep_data['interval'] or period not in sweep_data['periods']:
+            st.warning("⚠️ Loaded data does not cover this interval/period. Click **Run Analysis** to reload.")
+            st.stop()
+        
+        # Selector changes slice the loaded dataset instead of re-downloading
+        cell = (period, benchmark, alignment_policy, max_fill_gap)
+        if cell not in st.session_state['sweep_portfolios']:
+            cell_portfolio = build_portfolio(tickers, weights, sweep_data, period, benchmark,
+                                             alignment=alignment_policy, max_fill_gap=max_fill_gap)
+            try:
+                cell_portfolio.calculate_portfolio_returns()
+            except (ValueError, KeyError) as e:
+                st.error(f"❌ Not enough data for {period} vs {benchmark}: {e}")
+                st.stop()
+            st.session_state['sweep_portfolios'][cell] = cell_portfolio
+        
+        portfolio = st.session_state['sweep_portfolios'][cell]
+    
+    if job is not None:
+        # The worker owns the portfolio until it finishes, so the rate is not changed under it
+        wait_for('summary')
+        metrics = portfolio.metrics
+    else:
+        metrics = portfolio.get_metrics(risk_free_rate)
     
     # =====================================================================
     # SECTION 1: PERFORMANCE SUMMARY
@@ -271,26 +529,39 @@ if 'analysis_complete' in st.session_state and st.session_state['analysis_comple
             delta_color="inverse"
         )
     
+    # What alignment did to the raw data (snapshots keep the report too)
+    alignment = portfolio.alignment_report
+    filled_cells = int(alignment['summary']['filled'].sum())
+    st.caption(f"🗓️ {len(portfolio.price_matrix)} of {alignment['calendar_size']} calendar dates kept "
+               f"({alignment['policy']} alignment): {filled_cells} prices carried forward, "
+               f"{len(alignment['dropped_dates'])} dates dropped.")
+    if filled_cells or len(alignment['dropped_dates']):
+        with st.expander("Alignment details"):
+            st.dataframe(alignment['summary'], use_container_width=True)
+            stamp = "%Y-%m-%d %H:%M" if is_intraday(portfolio.interval) else "%Y-%m-%d"
+            st.dataframe(
+                alignment['cells'].style.format({
+                    'date': lambda d: d.strftime(stamp),
+                    'source_date': lambda d: "-" if pd.isna(d) else d.strftime(stamp)
+                }),
+                hide_index=True,
+                use_container_width=True
+            )
+    
     st.markdown("---")
     
     # =====================================================================
     # SECTION 2: MARKET COMPARISON
     # =====================================================================
+    wait_for('market')
     st.header(" Market Comparison")
     
-    from market_metrics import (
-        calculate_excess_returns,
-        annualize_excess_returns,
-        tracking_error,
-        calculate_information_ratio,
-        calculate_beta
-    )
-    
-    excess_ret = calculate_excess_returns(portfolio.portfolio_returns, portfolio.benchmark_returns)
-    ann_excess = annualize_excess_returns(portfolio.portfolio_returns, portfolio.benchmark_returns)
-    te = tracking_error(excess_ret)
-    ir = calculate_information_ratio(portfolio.portfolio_returns, portfolio.benchmark_returns)
-    beta = calculate_beta(portfolio.portfolio_returns, portfolio.benchmark_returns)
+    # Derived state is memoized on the Portfolio, so nothing here recomputes
+    market = portfolio.market_metrics
+    ann_excess = market['annualized_excess_return']
+    te = market['tracking_error']
+    ir = market['information_ratio']
+    beta = market['beta']
     
     col1, col2 = st.columns([1, 2])
     
@@ -319,23 +590,38 @@ if 'analysis_complete' in st.session_state and st.session_state['analysis_comple
     with col2:
         st.subheader("Cumulative Returns Comparison")
         
-        # Calculate cumulative returns
-        portfolio_cum = calculate_cumulative_returns(portfolio.portfolio_returns)
-        benchmark_cum = calculate_cumulative_returns(portfolio.benchmark_returns)
+        portfolio_cum = portfolio.cumulative_returns
+        benchmark_cum = portfolio.benchmark_cumulative_returns
+        
+        # Zooming re-samples only the selected window, at full resolution if it fits
+        first_date = portfolio_cum.index[0].date()
+        last_date = portfolio_cum.index[-1].date()
+        zoom_range = st.slider(
+            "Zoom",
+            min_value=first_date,
+            max_value=last_date,
+            value=(first_date, last_date),
+            format="YYYY-MM-DD",
+            label_visibility="collapsed"
+        )
+        zoom_range = (pd.Timestamp(zoom_range[0]), pd.Timestamp(zoom_range[1]))
+        
+        portfolio_plot = downsample_series(portfolio_cum, max_chart_points, x_range=zoom_range)
+        benchmark_plot = downsample_series(benchmark_cum, max_chart_points, x_range=zoom_range)
         
         # Create comparison chart
         fig = go.Figure()
         
         fig.add_trace(go.Scatter(
-            x=portfolio_cum.index,
-            y=portfolio_cum.values * 100,
+            x=portfolio_plot.index,
+            y=portfolio_plot.values * 100,
             name="Portfolio",
             line=dict(color='#1f77b4', width=2)
         ))
         
         fig.add_trace(go.Scatter(
-            x=benchmark_cum.index,
-            y=benchmark_cum.values * 100,
+            x=benchmark_plot.index,
+            y=benchmark_plot.values * 100,
             name=benchmark,
             line=dict(color='#ff7f0e', width=2, dash='dash')
         ))
@@ -350,32 +636,82 @@ if 'analysis_complete' in st.session_state and st.session_state['analysis_comple
         )
         
         st.plotly_chart(fig, use_container_width=True)
+        st.caption(describe_reduction(
+            len(portfolio_cum.loc[zoom_range[0]:zoom_range[1]]) + len(benchmark_cum.loc[zoom_range[0]:zoom_range[1]]),
+            len(portfolio_plot) + len(benchmark_plot),
+            fig
+        ))
+    
+    # Other portfolios, evaluated from the same returns matrix
+    if len(definitions) > 1:
+        st.subheader("Portfolio Comparison")
+        
+        # One aligned returns matrix over the union of tickers per (period, benchmark, alignment)
+        if cell not in st.session_state['comparison_portfolios']:
+            all_tickers = union_tickers(definitions)
+            shared = build_portfolio(all_tickers, [1 / len(all_tickers)] * len(all_tickers),
+                                     sweep_data, period, benchmark, alignment=cell[2], max_fill_gap=cell[3])
+            st.session_state['comparison_portfolios'][cell] = shared
+        shared = st.session_state['comparison_portfolios'][cell]
+        
+        try:
+            comparison = compare_portfolios(definitions, shared, risk_free_rate)
+        except (ValueError, KeyError) as e:
+            st.error(f"❌ Could not compare portfolios: {e}")
+        else:
+            col1, col2 = st.columns([2, 3])
+            
+            with col1:
+                percent_columns = ['annual_return', 'volatility', 'max_drawdown',
+                                   'annualized_excess_return', 'tracking_error']
+                st.dataframe(
+                    comparison['metrics'].T.style.format("{:.3f}", na_rep="-")
+                                          .format("{:.2%}", subset=pd.IndexSlice[percent_columns, :], na_rep="-"),
+                    use_container_width=True
+                )
+                st.caption(f"All portfolios evaluated on the same {len(comparison['returns'])} aligned bars")
+            
+            with col2:
+                fig = go.Figure()
+                for name, series in downsample_frame(comparison['cumulative_returns'], max_chart_points).items():
+                    fig.add_trace(go.Scatter(x=series.index, y=series.values * 100, name=name))
+                if shared.benchmark_returns is not None:
+                    benchmark_plot = downsample_series(shared.benchmark_cumulative_returns, max_chart_points)
+                    fig.add_trace(go.Scatter(
+                        x=benchmark_plot.index,
+                        y=benchmark_plot.values * 100,
+                        name=benchmark,
+                        line=dict(color='gray', dash='dash')
+                    ))
+                
+                fig.update_layout(
+                    title="Cumulative Returns by Portfolio",
+                    xaxis_title="Date",
+                    yaxis_title="Cumulative Return (%)",
+                    hovermode='x unified',
+                    height=400
+                )
+                
+                st.plotly_chart(fig, use_container_width=True)
     
     st.markdown("---")
     
     # =====================================================================
     # SECTION 3: RISK QUALITY
     # =====================================================================
+    wait_for('risk')
     st.header(" Risk Quality")
     
-    from risk_metrics import (
-        calculate_volatility,
-        calculate_max_drawdown,
-        calculate_sharpe_ratio,
-        calculate_downside_deviation
-    )
-    
-    portfolio_vol = calculate_volatility(portfolio.portfolio_returns)
-    market_vol = calculate_volatility(portfolio.benchmark_returns)
+    risk = portfolio.risk_comparison
     
-    portfolio_dd = calculate_max_drawdown(portfolio.portfolio_returns)
-    market_dd = calculate_max_drawdown(portfolio.benchmark_returns)
+    portfolio_vol = risk['portfolio_volatility']
+    market_vol = risk['market_volatility']
     
-    portfolio_sharpe = calculate_sharpe_ratio(portfolio.portfolio_returns, risk_free_rate)
-    market_sharpe = calculate_sharpe_ratio(portfolio.benchmark_returns, risk_free_rate)
+    portfolio_sharpe = risk['portfolio_sharpe']
+    market_sharpe = risk['market_sharpe']
     
-    portfolio_downside = calculate_downside_deviation(portfolio.portfolio_returns)
-    market_downside = calculate_downside_deviation(portfolio.benchmark_returns)
+    portfolio_downside = risk['portfolio_downside']
+    market_downside = risk['market_downside']
     
     col1, col2, col3 = st.columns(3)
     
@@ -429,25 +765,196 @@ if 'analysis_complete' in st.session_state and st.session_state['analysis_comple
             showlegend=False
         )
         st.plotly_chart(fig, use_container_width=True)
+
+    # Tail risk: portfolio and benchmark evaluated together in one call
+    st.subheader("Tail Risk (VaR / Expected Shortfall)")
+
+    tail_table = portfolio.tail_risk
+
+    tail_display = tail_table.unstack('measure')
+    tail_display.columns = [f"{name} {measure.upper()}" for name, measure in tail_display.columns]
+    tail_display = tail_display.reset_index()
+    tail_display['confidence'] = tail_display['confidence'].map(lambda c: f"{c:.0%}")
+
+    st.dataframe(
+        tail_display.style.format({col: "{:.2%}" for col in tail_display.columns if 'VAR' in col}),
+        hide_index=True,
+        use_container_width=True
+    )
+
+    # Bootstrap intervals: 10k paired resamples evaluated as index matrices
+    st.subheader("Metric Uncertainty (95% Bootstrap Intervals)")
+
+    intervals = portfolio.confidence_intervals.dropna(subset=['estimate'])
+    percent_metrics = {'annual_return', 'volatility', 'max_drawdown'}
+    interval_display = pd.DataFrame({
+        'Metric': [name.replace('_', ' ').title() for name in intervals.index],
+        **{
+            column.title(): [
+                f"{value:.2%}" if name in percent_metrics else f"{value:.3f}"
+                for name, value in intervals[column].items()
+            ]
+            for column in ('estimate', 'lower', 'upper')
+        }
+    })
+    st.dataframe(interval_display, hide_index=True, use_container_width=True)
+    st.caption(
+        "Stationary block bootstrap of the aligned portfolio and benchmark returns. "
+        "A wide interval means the period is too short to tell the figure apart from luck."
+    )
+
+    # Underwater chart and drawdown episodes from one pass over both series
+    st.subheader("Underwater Chart")
+
+    drawdown_report = portfolio.drawdown_report
+    underwater = drawdown_report['underwater']
+    # Min/max bucketing keeps every trough visible
+    underwater_plot = downsample_frame(underwater, max_chart_points, method='minmax')
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=underwater_plot['Portfolio'].index,
+        y=underwater_plot['Portfolio'].values * 100,
+        name="Portfolio",
+        line=dict(color='#1f77b4', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(31, 119, 180, 0.2)'
+    ))
+    fig.add_trace(go.Scatter(
+        x=underwater_plot['Market'].index,
+        y=underwater_plot['Market'].values * 100,
+        name=benchmark,
+        line=dict(color='#ff7f0e', width=2, dash='dash')
+    ))
+    fig.update_layout(
+        xaxis_title="Date",
+        yaxis_title="Drawdown from Peak (%)",
+        hovermode='x unified',
+        height=350,
+        legend=dict(yanchor="bottom", y=0.01, xanchor="left", x=0.01)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption(describe_reduction(
+        underwater.size,
+        sum(len(trace) for trace in underwater_plot.values()),
+        fig
+    ))
+
+    col1, col2 = st.columns([1, 3])
+
+    with col1:
+        st.metric("Ulcer Index", f"{drawdown_report['ulcer_index']['Portfolio']:.2%}",
+                  help="Root-mean-square depth of the underwater curve")
+        st.metric("Pain Index", f"{drawdown_report['pain_index']['Portfolio']:.2%}",
+                  help="Average depth of the underwater curve")
+
+    with col2:
+        episodes = drawdown_report['episodes']
+        worst_episodes = episodes[episodes['portfolio'] == 'Portfolio'].nsmallest(5, 'depth')
+        st.dataframe(
+            worst_episodes.drop(columns='portfolio').style.format({
+                'depth': "{:.2%}",
+                'peak_date': "{:%Y-%m-%d}",
+                'trough_date': "{:%Y-%m-%d}",
+                'recovery_date': lambda d: "ongoing" if pd.isna(d) else f"{d:%Y-%m-%d}",
+                'time_to_recover': "{:.0f}"
+            }, na_rep="-"),
+            hide_index=True,
+            use_container_width=True
+        )
+
+    # Stress tests: every compared portfolio in one pass over the long history
+    stress_tables = st.session_state.setdefault('stress_tests', {})
+    stress_shocks = dict(HYPOTHETICAL_SHOCKS)
+    stress_shocks[f"Market {stress_market_shock:+.0%}"] = {'market': stress_market_shock}
+    sector_moves = {}
+    for item in stress_sector_shocks.split(','):
+        sector, _, move = item.rpartition(':')
+        try:
+            sector_moves[sector.strip()] = float(move) / 100
+        except ValueError:
+            if item.strip():
+                st.warning(f"⚠️ Ignoring sector shock '{item.strip()}' (use Sector:percent)")
+    if sector_moves:
+        stress_shocks["Sector shocks"] = {'market': stress_market_shock, 'sectors': sector_moves}
+    
+    stress_source = portfolio
+    stress_definitions = None
+    if len(definitions) > 1 and cell in st.session_state['comparison_portfolios']:
+        stress_source = st.session_state['comparison_portfolios'][cell]
+        stress_definitions = definitions
+    stress_key = (id(stress_source), tuple(stress_scenarios), repr(stress_shocks),
+                  getattr(classification_file, 'name', None), getattr(classification_file, 'size', None))
+    
+    if run_stress_test and stress_key not in stress_tables:
+        classification = None
+        if classification_file is not None:
+            classification_file.seek(0)
+            classification = load_classification(classification_file)
+        try:
+            with st.spinner("Replaying historical windows..."):
+                stress_tables[stress_key] = stress_test(
+                    stress_source, stress_definitions,
+                    {name: HISTORICAL_SCENARIOS[name] for name in stress_scenarios},
+                    stress_shocks, classification, loader=get_price_store().get
+                )
+        except (ValueError, KeyError) as e:
+            st.error(f"❌ Could not run stress tests: {e}")
     
+    stress_table = stress_tables.get(stress_key)
+    if stress_table is not None:
+        st.subheader("Stress Tests")
+        
+        stress_returns = stress_table['portfolio_return'].unstack('portfolio')
+        stress_returns = stress_returns.reindex(stress_table.index.unique('scenario'))
+        stress_returns[benchmark] = stress_table['benchmark_return'].groupby(level='scenario', sort=False).first()
+        
+        fig = go.Figure()
+        for name, series in stress_returns.items():
+            fig.add_trace(go.Bar(
+                x=series.values * 100,
+                y=series.index,
+                orientation='h',
+                name=name,
+                marker_color='gray' if name == benchmark else None
+            ))
+        fig.update_layout(
+            barmode='group',
+            xaxis_title="Return (%)",
+            height=max(300, 28 * len(stress_returns) * min(len(stress_returns.columns), 3)),
+            yaxis=dict(autorange='reversed')
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        st.dataframe(
+            stress_table.drop(columns='kind').style.format({
+                'start': lambda d: "-" if pd.isna(d) else f"{d:%Y-%m-%d}",
+                'end': lambda d: "-" if pd.isna(d) else f"{d:%Y-%m-%d}",
+                'portfolio_return': "{:.2%}",
+                'benchmark_return': "{:.2%}",
+                'relative_return': "{:.2%}",
+                'max_drawdown': "{:.2%}",
+                'coverage': "{:.0%}"
+            }, na_rep="-"),
+            use_container_width=True
+        )
+        st.caption("Historical windows replay daily prices against today's weights; coverage is the share of "
+                   "weight x days backed by real prices (the rest follows beta x benchmark). Hypothetical "
+                   "shocks are instant moves propagated through betas from the analysed window.")
+
     st.markdown("---")
-    
+
     # =====================================================================
     # SECTION 4: PORTFOLIO STRUCTURE
     # =====================================================================
+    wait_for('structure')
     st.header(" Portfolio Structure")
     
-    from portfolio_metrics import (
-        total_contribution_by_stock,
-        identify_top_contributors,
-        calculate_concentration,
-        calculate_effective_n_stocks
-    )
-    
-    contributions = total_contribution_by_stock(portfolio.stock_returns_df, portfolio.weights)
-    top_bottom = identify_top_contributors(portfolio.stock_returns_df, portfolio.weights)
-    concentration = calculate_concentration(portfolio.weights)
-    effective_n = calculate_effective_n_stocks(portfolio.weights)
+    structure = portfolio.structure
+    contributions = structure['contributions']
+    top_bottom = structure
+    concentration = structure['concentration']
+    effective_n = structure['effective_n']
     
     col1, col2 = st.columns(2)
     
@@ -530,37 +1037,170 @@ if 'analysis_complete' in st.session_state and st.session_state['analysis_comple
             help="True diversification level"
         )
     
+    # Correlation-aware diversification
+    st.subheader("Correlation Clusters")
+    
+    diversification = portfolio.diversification
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric(
+            "Correlation-Adj. Effective N",
+            f"{diversification['correlation_effective_n']:.1f}",
+            delta=f"{diversification['correlation_effective_n'] - effective_n:+.1f} vs weights only",
+            delta_color="normal",
+            help="1 / (w' C w): independent bets after accounting for correlation"
+        )
+    
+    with col2:
+        st.metric(
+            "Avg Pairwise Correlation",
+            f"{diversification['average_correlation']:.2f}",
+            help="Weighted average correlation between different holdings"
+        )
+    
+    with col3:
+        st.metric(
+            "Effective # of Clusters",
+            f"{diversification['effective_clusters']:.1f}",
+            help=f"{len(diversification['cluster_weights'])} clusters of stocks correlated above 0.5"
+        )
+    
+    with col4:
+        st.metric(
+            "Largest Cluster Weight",
+            f"{diversification['largest_cluster_weight']:.1%}",
+            help="Weight held in the most heavily owned correlation cluster"
+        )
+    
+    if diversification['correlation_effective_n'] < 0.5 * effective_n:
+        st.warning("⚠️ Holdings are highly correlated - much of the apparent diversification is an illusion")
+    
+    # Ticker-level heatmap for readable sizes, cluster averages beyond that
+    corr = diversification['correlation']
+    if len(corr) <= 150:
+        heatmap, title = corr, "Correlation (clustered order)"
+    else:
+        from diversification import cluster_correlation_matrix
+        heatmap = cluster_correlation_matrix(diversification)
+        heatmap.index = heatmap.columns = [f"C{c}" for c in heatmap.index]
+        title = f"Average correlation between {len(heatmap)} clusters"
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=heatmap.values,
+        x=list(heatmap.columns),
+        y=list(heatmap.index),
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu_r',
+        hovertemplate='%{y} / %{x}<br>Correlation: %{z:.2f}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=title,
+        height=max(400, min(900, 14 * len(heatmap))),
+        yaxis=dict(autorange='reversed')
+    )
+    
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Sector / theme attribution (needs a classification file)
+    if classification_file is not None:
+        st.subheader("Sector Attribution")
+        
+        classification_file.seek(0)
+        classification = load_classification(classification_file)
+        benchmark_weights = None
+        if benchmark_weights_file is not None:
+            benchmark_weights_file.seek(0)
+            benchmark_weights = load_benchmark_weights(benchmark_weights_file)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            level = st.selectbox("Group by", list(classification.columns))
+        with col2:
+            frequency = st.selectbox(
+                "Link periods",
+                [None] + list(LINK_FREQUENCIES),
+                format_func=lambda f: "Every bar" if f is None else f.title(),
+                help="Single-period Brinson effects are computed per period, then linked (Carino) "
+                     "so they add up to the compounded active return"
+            )
+        
+        # Reports are cached per portfolio and settings; constituents come from the shared download
+        reports = st.session_state.setdefault('attribution_reports', {})
+        report_key = (id(portfolio), level, frequency, classification_file.name, classification_file.size,
+                      getattr(benchmark_weights_file, 'name', None), getattr(benchmark_weights_file, 'size', None))
+        if report_key not in reports:
+            with st.spinner("Computing attribution..."):
+                reports[report_key] = portfolio.attribution(classification, benchmark_weights, level, frequency,
+                                                            loader=get_price_store().get)
+        report = reports[report_key]
+        groups = report['groups']
+        
+        if report['benchmark_return'] is None:
+            table = groups[['portfolio_weight', 'portfolio_return', 'contribution']]
+            st.dataframe(table.style.format("{:.2%}"), use_container_width=True)
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Portfolio Return", f"{report['portfolio_return']:.2%}")
+            col2.metric("Benchmark (constituents)", f"{report['benchmark_return']:.2%}",
+                        help="Return of the constituents at the uploaded weights")
+            col3.metric("Active Return", f"{report['active_return']:.2%}")
+            
+            table = groups[['portfolio_weight', 'benchmark_weight', 'portfolio_return', 'benchmark_return',
+                            'allocation', 'selection', 'interaction', 'active']]
+            st.dataframe(table.style.format("{:.2%}"), use_container_width=True)
+            
+            fig = go.Figure()
+            for effect in ['allocation', 'selection', 'interaction']:
+                fig.add_trace(go.Bar(
+                    x=groups[effect].values * 100,
+                    y=groups.index,
+                    orientation='h',
+                    name=effect.title()
+                ))
+            fig.update_layout(
+                barmode='relative',
+                xaxis_title="Effect (%)",
+                height=max(300, 30 * len(groups)),
+                yaxis=dict(autorange='reversed')
+            )
+            st.plotly_chart(fig, use_container_width=True)
+            
+            if report['missing']:
+                st.warning(f"⚠️ No data for {len(report['missing'])} constituent(s); their weight was spread "
+                           f"over the rest: {', '.join(report['missing'][:10])}")
+    
     st.markdown("---")
     
     # =====================================================================
     # SECTION 5: BEHAVIOUR CONSISTENCY
     # =====================================================================
+    wait_for('behaviour')
     st.header(" Behaviour Consistency")
     
-    from risk_metrics import (
-        calculate_rolling_cagr,
-        calculate_win_rate,
-        calculate_avg_gain_loss
-    )
-    
-    win_rate = calculate_win_rate(portfolio.portfolio_returns)
-    gain_loss = calculate_avg_gain_loss(portfolio.portfolio_returns)
-    benchmark_win_rate = calculate_win_rate(portfolio.benchmark_returns)
-    benchmark_gain_loss = calculate_avg_gain_loss(portfolio.benchmark_returns)
+    behaviour = portfolio.behaviour
+    win_rate = behaviour['win_rate']
+    gain_loss = behaviour['gain_loss']
+    benchmark_win_rate = behaviour['benchmark_win_rate']
+    benchmark_gain_loss = behaviour['benchmark_gain_loss']
     
     # Rolling CAGR chart
     n_days = len(portfolio.portfolio_returns)
-    if n_days >= 252:
+    if portfolio.rolling_cagr is not None:
         st.subheader("Rolling 1-Year CAGR")
         
-        rolling_cagr = calculate_rolling_cagr(portfolio.portfolio_returns)
+        rolling_cagr = portfolio.rolling_cagr
         rolling_cagr_clean = rolling_cagr.dropna()
+        rolling_cagr_plot = downsample_series(rolling_cagr_clean, max_chart_points)
         
         fig = go.Figure()
         
         fig.add_trace(go.Scatter(
-            x=rolling_cagr_clean.index,
-            y=rolling_cagr_clean.values * 100,
+            x=rolling_cagr_plot.index,
+            y=rolling_cagr_plot.values * 100,
             mode='lines',
             name='Rolling 1Y CAGR',
             line=dict(color='#1f77b4', width=2),
@@ -576,8 +1216,10 @@ if 'analysis_complete' in st.session_state and st.session_state['analysis_comple
         )
         
         st.plotly_chart(fig, use_container_width=True)
+        st.caption(describe_reduction(len(rolling_cagr_clean), len(rolling_cagr_plot), fig))
     else:
-        st.info(f"ℹ️ Need at least 252 days for rolling CAGR (currently have {n_days} days)")
+        st.info(f"ℹ️ Need at least {portfolio.periods_per_year:.0f} bars (1 year) for rolling CAGR "
+                f"(currently have {n_days} bars)")
     
     # Win rate and gain/loss
     col1, col2 = st.columns(2)
@@ -629,53 +1271,116 @@ if 'analysis_complete' in st.session_state and st.session_state['analysis_comple
         st.metric("Benchmark Avg Gain", f"{benchmark_gain_loss['avg_gain']:.2%}")
         st.metric("Benchmark Avg Loss", f"{benchmark_gain_loss['avg_loss']:.2%}")
     
+    # Calendar-period returns, all series from one grouped reduction
+    st.subheader("Calendar Returns")
+    
+    calendar_periods = portfolio.calendar_returns
+    calendar_excess = excess_returns(calendar_periods)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        calendar_options = ['Portfolio']
+        if calendar_excess:
+            calendar_options += ['Market', 'Excess vs Market']
+        calendar_options += list(portfolio.tickers)
+        calendar_series = st.selectbox("Series", calendar_options, key="calendar_series")
+    with col2:
+        calendar_frequency = st.selectbox("Period", ['month', 'quarter'], key="calendar_frequency",
+                                          format_func=lambda f: f"{f.title()}ly")
+    
+    if calendar_series == 'Excess vs Market':
+        calendar_grid = calendar_table(calendar_excess, 'Portfolio', calendar_frequency)
+    else:
+        calendar_grid = calendar_table(calendar_periods, calendar_series, calendar_frequency)
+    
+    # Symmetric colour scale so 0% is always the neutral colour
+    calendar_bound = float(np.nanmax(np.abs(calendar_grid.to_numpy()))) * 100 if calendar_grid.notna().any().any() else 1.0
+    fig = go.Figure(go.Heatmap(
+        z=calendar_grid.to_numpy() * 100,
+        x=list(calendar_grid.columns),
+        y=[str(year) for year in calendar_grid.index],
+        colorscale='RdYlGn',
+        zmin=-calendar_bound,
+        zmax=calendar_bound,
+        text=calendar_grid.map(lambda v: "" if pd.isna(v) else f"{v:.1%}").to_numpy(),
+        texttemplate="%{text}",
+        hovertemplate="%{y} %{x}: %{text}<extra></extra>",
+        colorbar=dict(title="%")
+    ))
+    fig.update_layout(
+        yaxis=dict(autorange='reversed', type='category'),
+        height=max(250, 45 * len(calendar_grid) + 100)
+    )
+    st.plotly_chart(fig, use_container_width=True)
+    st.caption("Compounded return per calendar period. First and last periods only cover the part "
+               "inside the analysed window; excess is the period return minus the benchmark's.")
+    
     st.markdown("---")
     
+    # Sweep and export use the finished analysis
+    wait_for()
+    
+    # Sweeps need the downloaded dataset (not available for snapshots)
+    if sweep_data is not None:
+        # =====================================================================
+        # PARAMETER SWEEP
+        # =====================================================================
+        st.header(" Parameter Sweep")
+    
+        st.caption("Every period × benchmark × risk-free rate, evaluated from the single download above.")
+    
+        if st.session_state.get('sweep_cube_alignment') != cell[2:]:
+            st.session_state.pop('sweep_cube', None)
+        if 'sweep_cube' not in st.session_state:
+            with st.spinner("Evaluating parameter grid..."):
+                sweep_rates = [round(r / 100, 3) for r in range(0, 10)] + [round(risk_free_rate, 4)]
+                st.session_state['sweep_cube'] = run_sweep(
+                    tickers, weights, sweep_data,
+                    sweep_data['periods'], list(sweep_data['benchmark_data']),
+                    sorted(set(sweep_rates)), alignment=cell[2], max_fill_gap=cell[3]
+                )
+                st.session_state['sweep_cube_alignment'] = cell[2:]
+        sweep_cube = st.session_state['sweep_cube']
+    
+        if sweep_cube.empty:
+            st.info("ℹ️ No period/benchmark combination has enough aligned data")
+        else:
+            col1, col2 = st.columns([1, 3])
+        
+            with col1:
+                sweep_metric = st.selectbox(
+                    "Metric",
+                    ["sharpe_ratio", "sortino_ratio", "annual_return", "volatility", "max_drawdown",
+                     "information_ratio", "beta", "tracking_error", "annualized_excess_return"]
+                )
+                rates = sorted(sweep_cube.index.unique('risk_free_rate'))
+                sweep_rate = st.select_slider(
+                    "Risk-Free Rate",
+                    options=rates,
+                    value=min(rates, key=lambda r: abs(r - risk_free_rate)),
+                    format_func=lambda r: f"{r:.1%}"
+                )
+        
+            with col2:
+                table = pivot_cube(sweep_cube, sweep_metric, risk_free_rate=sweep_rate)
+                is_ratio = sweep_metric in ("sharpe_ratio", "sortino_ratio", "information_ratio", "beta")
+                st.dataframe(
+                    table.style.format("{:.3f}" if is_ratio else "{:.2%}", na_rep="-")
+                               .background_gradient(cmap="RdYlGn", axis=None),
+                    use_container_width=True
+                )
+    
+        st.markdown("---")
+    
     # =====================================================================
     # EXPORT
     # =====================================================================
     st.header("💾 Export Results")
     
     # Prepare export data
-    export_data = {
-        "portfolio_composition": {
-            "tickers": portfolio.tickers,
-            "weights": portfolio.weights
-        },
-        "performance_metrics": {
-            "annual_return": float(metrics['annual_return']),
-            "volatility": float(metrics['volatility']),
-            "sharpe_ratio": float(metrics['sharpe_ratio']),
-            "sortino_ratio": float(metrics['sortino_ratio']),
-            "max_drawdown": float(metrics['max_drawdown'])
-        },
-        "market_comparison": {
-            "beta": float(beta),
-            "information_ratio": float(ir),
-            "tracking_error": float(te),
-            "excess_return": float(ann_excess)
-        },
-        "risk_quality": {
-            "portfolio_volatility": float(portfolio_vol),
-            "market_volatility": float(market_vol),
-            "portfolio_sharpe": float(portfolio_sharpe),
-            "market_sharpe": float(market_sharpe),
-            "portfolio_downside": float(portfolio_downside),
-            "market_downside": float(market_downside)
-        },
-        "portfolio_structure": {
-            "max_concentration": float(concentration),
-            "effective_n_stocks": float(effective_n),
-            "top_contributor": top_bottom['top_contributor'],
-            "top_dragger": top_bottom['top_dragger']
-        },
-        "behaviour": {
-            "win_rate": float(win_rate),
-            "avg_gain": float(gain_loss['avg_gain']),
-            "avg_loss": float(gain_loss['avg_loss']),
-            "gain_loss_ratio": float(gain_loss['gain_loss_ratio'])
-        }
-    }
+    from analysis_export import build_export_payload, write_analysis_dataset
+    
+    export_data = build_export_payload(portfolio)
     
     json_str = json.dumps(export_data, indent=2)
     
@@ -686,6 +1391,131 @@ if 'analysis_complete' in st.session_state and st.session_state['analysis_comple
         mime="application/json",
         use_container_width=True
     )
+    
+    # Full time series (returns, cumulative, rolling CAGR, contributions) as Parquet
+    try:
+        import io
+        import os
+        import tempfile
+        import zipfile
+        
+        # Stress results of this portfolio go into a 'scenarios' table alongside the time series
+        extra_tables = None
+        if stress_table is not None:
+            current = 'Portfolio' if stress_definitions is None else next(iter(stress_definitions))
+            extra_tables = {'portfolio': {'scenarios': stress_table.xs(current, level='portfolio').reset_index()}}
+        
+        with tempfile.TemporaryDirectory() as export_dir:
+            write_analysis_dataset({'portfolio': portfolio}, export_dir, extra_tables=extra_tables)
+            zip_buffer = io.BytesIO()
+            with zipfile.ZipFile(zip_buffer, 'w') as archive:
+                for root, _, files in os.walk(export_dir):
+                    for name in files:
+                        full_path = os.path.join(root, name)
+                        archive.write(full_path, os.path.relpath(full_path, export_dir))
+        
+        st.download_button(
+            label="📦 Download Time Series as Parquet",
+            data=zip_buffer.getvalue(),
+            file_name="portfolio_analysis_parquet.zip",
+            mime="application/zip",
+            use_container_width=True
+        )
+    except ImportError as e:
+        st.info(f"ℹ️ {e}")
+    
+    # Aligned data + returns for instant restore here or in a batch job
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        save_path = st.text_input("Snapshot directory", value="snapshots/latest", key="save_snapshot_path")
+    with col2:
+        st.write("")
+        if st.button("💾 Save Snapshot", use_container_width=True):
+            portfolio.save_snapshot(save_path)
+            st.success(f"✅ Snapshot saved to {save_path}")
+    
+    # =====================================================================
+    # UNIVERSE SCREENER
+    # =====================================================================
+    if run_screener and universe_file is not None:
+        universe_file.seek(0)
+        previous_screen = st.session_state.pop('screen_job', None)
+        if previous_screen is not None:
+            previous_screen.cancel()
+        st.session_state['screen_job'] = BackgroundJob(
+            screen_pipeline, universe_from_csv(universe_file), benchmark, period, portfolio.interval,
+            portfolio.risk_free_rate, portfolio, loader=get_price_store().get
+        ).start()
+    
+    screen_job = st.session_state.get('screen_job')
+    if screen_job is not None or 'screen' in st.session_state:
+        st.markdown("---")
+        st.header(" Universe Screener")
+        
+        if screen_job is not None and screen_job.status == 'done':
+            st.session_state['screen'] = screen_job.stages['screen']
+            del st.session_state['screen_job']
+        elif screen_job is not None and screen_job.status == 'failed':
+            del st.session_state['screen_job']
+            st.error(f"❌ Screen failed: {screen_job.error}")
+        elif screen_job is not None and screen_job.status == 'cancelled':
+            del st.session_state['screen_job']
+        elif screen_job is not None:
+            col1, col2 = st.columns([5, 1])
+            with col1:
+                st.progress(screen_job.progress, text=f"{screen_job.message} ({screen_job.elapsed:.0f}s)")
+            with col2:
+                if st.button("✖ Cancel", key="cancel_screen", use_container_width=True):
+                    screen_job.cancel()
+                    del st.session_state['screen_job']
+                    st.rerun()
+            time.sleep(JOB_POLL_SECONDS)
+            st.rerun()
+        
+        if 'screen' in st.session_state:
+            screen = st.session_state['screen']
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                min_sharpe = st.number_input("Min Sharpe", value=0.0, step=0.1)
+            with col2:
+                max_volatility = st.number_input("Max Volatility (%)", value=60.0, step=5.0) / 100
+            with col3:
+                max_correlation = st.number_input(
+                    "Max Corr. to Portfolio", value=1.0, min_value=-1.0, max_value=1.0, step=0.05,
+                    help="Low correlation to the current portfolio adds diversification"
+                )
+            with col4:
+                exclude_held = st.checkbox("Exclude current holdings", value=True)
+            
+            filtered = filter_screen(
+                screen,
+                {
+                    'sharpe_ratio': (min_sharpe, None),
+                    'volatility': (None, max_volatility),
+                    'correlation_to_portfolio': (None, max_correlation if max_correlation < 1 else None),
+                },
+                exclude=portfolio.tickers if exclude_held else None
+            )
+            
+            percent_columns = ['annual_return', 'volatility', 'max_drawdown']
+            st.dataframe(
+                filtered.style.format("{:.3f}", na_rep="-")
+                              .format("{:.2%}", subset=percent_columns, na_rep="-")
+                              .format("{:,.0f}", subset=['observations'])
+                              .format("{:,.2f}", subset=['last_price'], na_rep="-"),
+                use_container_width=True,
+                height=min(600, 36 * (len(filtered) + 1))
+            )
+            st.caption(f"{len(filtered)} of {len(screen)} tickers pass the filters. Click a column header to sort.")
+            
+            st.download_button(
+                label="📥 Download Screen as CSV",
+                data=filtered.to_csv(),
+                file_name="screen.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
 
 else:
     # Welcome screen
@@ -734,7 +1564,7 @@ else:
     3. **Risk Quality** - Risk-adjusted performance evaluation
     4. **Portfolio Structure** - Contribution and diversification analysis
     5. **Behaviour Consistency** - Win rate and consistency metrics
-    6. **Export Results** - Download complete analysis as JSON
+    6. **Export Results** - Download complete analysis as JSON, time series as Parquet
     
     ### Purpose
     
@@ -1,24 +1,79 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
-import  matplotlib.pyplot as plt
-import pprint
 
-def download_stock_data(ticker,start_date=None,end_date=None,period='1y'):
+# yfinance (and its requests/lxml stack) is only imported when a download
+# actually happens, so importing this module - and everything built on top
+# of it - stays cheap for batch workers and process-pool children.
+
+class NoDataError(ValueError):
+    """The source returned no bars for the requested ticker and range."""
+
+
+def download_stock_data(ticker,start_date=None,end_date=None,period='1y',interval='1d'):
+    import yfinance as yf
+
     if start_date and end_date:
-        df = yf.download(ticker,start = start_date,end=end_date,progress=False)
+        df = yf.download(ticker,start = start_date,end=end_date,interval=interval,progress=False)
     else:
-        df = yf.download(ticker,period=period,progress=False)
+        df = yf.download(ticker,period=period,interval=interval,progress=False)
     if(df.empty):
-        raise ValueError(f"No data downloaded check ticker for {ticker}")
-    print(f"downloaded {len(df)} days of data for {ticker}")
+        raise NoDataError(f"No data downloaded check ticker for {ticker}")
+    print(f"downloaded {len(df)} {interval} bars of data for {ticker}")
     return df
 
-def download_multiple_stocks(tickers,start_date = None, end_date = None , period='1yr'):
+
+# Longest span yfinance serves per request for each intraday interval
+INTRADAY_WINDOW_DAYS = {'1m': 7, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '60m': 730, '90m': 60, '1h': 730}
+
+# How far back yfinance serves each intraday interval at all
+INTRADAY_HISTORY_DAYS = {'1m': 30, '2m': 60, '5m': 60, '15m': 60, '30m': 60, '60m': 730, '90m': 60, '1h': 730}
+
+def iter_stock_data(ticker,start_date,end_date,interval='5m'):
+    """
+    Download a long bar history window by window, yielding each window.
+
+    Intraday histories are too long to request (or hold) in one piece, so the
+    caller consumes the chunks as they arrive - e.g. with
+    frequency.chunked_return_summary - and no full DataFrame is ever built.
+
+    A window with no bars (holidays, a suspension) is skipped with a warning;
+    any other download error propagates. A start beyond the source's
+    intraday history, or a history in which no window has bars (a mistyped
+    ticker), raises instead of yielding a partial or empty history.
+    """
+    window = pd.Timedelta(days=INTRADAY_WINDOW_DAYS.get(interval, 3650))
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date)
+
+    if interval in INTRADAY_HISTORY_DAYS:
+        oldest = pd.Timestamp.now().normalize() - pd.Timedelta(days=INTRADAY_HISTORY_DAYS[interval])
+        if start < oldest:
+            raise ValueError(f"{interval} bars are only available for the last "
+                             f"{INTRADAY_HISTORY_DAYS[interval]} days (from {oldest.date()}), "
+                             f"not from {start.date()}")
+
+    windows_with_data = 0
+    while start < end:
+        stop = min(start + window, end)
+        try:
+            df = download_stock_data(ticker,start_date=start.strftime('%Y-%m-%d'),
+                                     end_date=stop.strftime('%Y-%m-%d'),interval=interval)
+        except NoDataError:
+            print(f"⚠ no {interval} bars for {ticker} from {start.date()} to {stop.date()}")
+        else:
+            windows_with_data += 1
+            yield df['Close']
+        start = stop
+
+    if windows_with_data == 0:
+        raise NoDataError(f"No data downloaded check ticker for {ticker} "
+                          f"({interval} bars from {pd.Timestamp(start_date).date()} to {end.date()})")
+
+def download_multiple_stocks(tickers,start_date = None, end_date = None , period='1y'):
     data={}
     for ticker in tickers:
         try :
-            data[ticker] = yf.download_stock_data(ticker,start_date,end_date,period)
+            data[ticker] = download_stock_data(ticker,start_date,end_date,period)
         except Exception as e:
             print(f"failed to download {ticker}: {e}")
     return data
@@ -0,0 +1,239 @@
+"""
+Correlation-aware diversification.
+
+calculate_effective_n_stocks looks at weights alone: ten equally weighted
+banks count as ten independent bets. This module asks how many bets the
+portfolio really holds once correlation is taken into account:
+
+    correlation      - Pearson correlation of the aligned stock returns,
+                       computed block by block so wide universes (thousands
+                       of tickers) never need more than one block of
+                       temporaries
+    clustering       - average-linkage hierarchical clustering on the
+                       correlation distance sqrt((1 - rho) / 2), with
+                       optimal leaf ordering so correlated names sit next to
+                       each other in the heatmap
+    effective N      - 1 / (w' C w): equals 1 / sum(w^2) when all stocks are
+                       uncorrelated and falls to 1 when they move as one
+    cluster weights  - weight held in each correlation cluster, and the
+                       effective number of clusters 1 / sum(W_k^2)
+
+Clustering needs scipy, which is imported only when it is used.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_BLOCK_SIZE = 512
+
+# Stocks in one cluster are at least this correlated (average linkage)
+DEFAULT_CLUSTER_CORRELATION = 0.5
+
+# Optimal leaf ordering is O(n^3); beyond this many tickers the plain
+# dendrogram order is used (still groups clusters together)
+OPTIMAL_ORDERING_LIMIT = 1000
+
+
+def _require_scipy():
+    try:
+        import scipy.cluster.hierarchy as hierarchy
+    except ImportError as e:
+        raise ImportError(
+            "Correlation clustering needs scipy. Install it with: pip install scipy"
+        ) from e
+    return hierarchy
+
+
+def calculate_correlation_matrix(stock_returns_df, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Correlation matrix of aligned returns, computed in column blocks.
+
+    Returns are standardized once; each block of the (symmetric) matrix is
+    then a single matrix product of two column slices, and only the upper
+    triangle of blocks is computed.
+
+    Args:
+        stock_returns_df: DataFrame of aligned returns (dates x tickers)
+        block_size: Tickers per block
+
+    Returns:
+        DataFrame correlation matrix (tickers x tickers). Stocks with zero
+        variance get zero correlation with everything else.
+    """
+    values = stock_returns_df.to_numpy(dtype=float)
+    n_obs, n = values.shape
+    if n_obs < 2:
+        raise ValueError("Need at least two observations to compute correlations")
+
+    centered = values - values.mean(axis=0)
+    scale = np.sqrt((centered ** 2).sum(axis=0))
+    standardized = np.divide(centered, scale, out=np.zeros_like(centered), where=scale > 0)
+
+    corr = np.empty((n, n))
+    for i in range(0, n, block_size):
+        left = standardized[:, i:i + block_size]
+        for j in range(i, n, block_size):
+            block = left.T @ standardized[:, j:j + block_size]
+            corr[i:i + block_size, j:j + block_size] = block
+            corr[j:j + block_size, i:i + block_size] = block.T
+
+    np.clip(corr, -1.0, 1.0, out=corr)
+    np.fill_diagonal(corr, 1.0)
+    return pd.DataFrame(corr, index=stock_returns_df.columns, columns=stock_returns_df.columns)
+
+
+def correlation_distance(corr):
+    """Condensed distance vector sqrt((1 - rho) / 2) for scipy linkage."""
+    corr = np.asarray(corr, dtype=float)
+    upper = np.triu_indices(len(corr), k=1)
+    return np.sqrt(np.clip((1.0 - corr[upper]) / 2.0, 0.0, None))
+
+
+def cluster_correlation(corr, method='average', optimal_ordering=None):
+    """
+    Hierarchical clustering of a correlation matrix.
+
+    Args:
+        corr: Correlation matrix (DataFrame or array)
+        method: scipy linkage method
+        optimal_ordering: Reorder leaves so adjacent leaves are as similar as
+            possible. None = only when there are at most
+            OPTIMAL_ORDERING_LIMIT tickers
+
+    Returns:
+        Tuple of (linkage matrix, leaf order as an integer array)
+    """
+    hierarchy = _require_scipy()
+
+    n = len(corr)
+    if n < 2:
+        return np.empty((0, 4)), np.arange(n)
+
+    if optimal_ordering is None:
+        optimal_ordering = n <= OPTIMAL_ORDERING_LIMIT
+
+    link = hierarchy.linkage(correlation_distance(corr), method=method, optimal_ordering=optimal_ordering)
+    return link, hierarchy.leaves_list(link)
+
+
+def assign_clusters(link, n, min_correlation=DEFAULT_CLUSTER_CORRELATION):
+    """
+    Cut the dendrogram where the linkage correlation drops below min_correlation.
+
+    Returns:
+        Integer cluster label per ticker (1-based, in input order)
+    """
+    if n < 2:
+        return np.ones(n, dtype=int)
+
+    hierarchy = _require_scipy()
+    threshold = np.sqrt((1.0 - min_correlation) / 2.0)
+    return hierarchy.fcluster(link, t=threshold, criterion='distance')
+
+
+def calculate_correlation_effective_n(weights, corr):
+    """
+    Effective number of independent bets, 1 / (w' C w).
+
+    Uses the correlation (not covariance) matrix, so volatility differences
+    do not enter: with C = I this is calculate_effective_n_stocks, and with
+    perfectly correlated stocks it is 1. Negatively correlated holdings
+    push it above the weight-only figure.
+    """
+    w = np.asarray(weights, dtype=float)
+    return 1.0 / float(w @ np.asarray(corr, dtype=float) @ w)
+
+
+def calculate_cluster_concentration(weights, labels, tickers=None):
+    """
+    Weight held in each cluster.
+
+    Returns:
+        Dictionary with 'cluster_weights' (Series by cluster label, largest
+        first), 'largest_cluster_weight' and 'effective_clusters'
+        (1 / sum of squared cluster weights)
+    """
+    cluster_weights = (pd.Series(np.asarray(weights, dtype=float), index=tickers)
+                         .groupby(np.asarray(labels)).sum()
+                         .sort_values(ascending=False))
+    cluster_weights.index.name = 'cluster'
+    return {
+        'cluster_weights': cluster_weights,
+        'largest_cluster_weight': cluster_weights.iloc[0],
+        'effective_clusters': 1.0 / float((cluster_weights ** 2).sum())
+    }
+
+
+def analyze_diversification(stock_returns_df, weights, min_correlation=DEFAULT_CLUSTER_CORRELATION,
+                            method='average', block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Full correlation-aware diversification report.
+
+    Args:
+        stock_returns_df: DataFrame of aligned returns (dates x tickers)
+        weights: Portfolio weights in column order
+        min_correlation: Correlation level at which stocks form one cluster
+        method: scipy linkage method
+        block_size: Tickers per correlation block
+
+    Returns:
+        Dictionary with:
+            'correlation' - correlation matrix reordered by leaf order
+            'order' - tickers in leaf order
+            'linkage' - scipy linkage matrix
+            'clusters' - Series ticker -> cluster label
+            'effective_n' - weight-only effective N, 1 / sum(w^2)
+            'correlation_effective_n' - 1 / (w' C w)
+            'average_correlation' - weighted average pairwise correlation
+            'cluster_weights', 'largest_cluster_weight', 'effective_clusters'
+    """
+    corr = calculate_correlation_matrix(stock_returns_df, block_size)
+    w = np.asarray(weights, dtype=float)
+    tickers = corr.index
+
+    link, order = cluster_correlation(corr.to_numpy(), method=method)
+    labels = assign_clusters(link, len(tickers), min_correlation)
+
+    # Weighted mean of the off-diagonal correlations
+    pair_weight = 1.0 - float((w ** 2).sum())
+    off_diagonal = float(w @ corr.to_numpy() @ w) - float((w ** 2).sum())
+    average_correlation = off_diagonal / pair_weight if pair_weight > 0 else 1.0
+
+    ordered = tickers[order]
+    report = {
+        'correlation': corr.loc[ordered, ordered],
+        'order': list(ordered),
+        'linkage': link,
+        'clusters': pd.Series(labels, index=tickers, name='cluster'),
+        'effective_n': 1.0 / float((w ** 2).sum()),
+        'correlation_effective_n': calculate_correlation_effective_n(w, corr),
+        'average_correlation': average_correlation
+    }
+    report.update(calculate_cluster_concentration(w, labels, tickers))
+    return report
+
+
+def cluster_correlation_matrix(report):
+    """
+    Average correlation between and within clusters.
+
+    A compact heatmap for universes too wide to draw ticker by ticker.
+    Clusters appear in leaf order.
+    """
+    corr = report['correlation']
+    labels = report['clusters'].reindex(corr.index).to_numpy()
+    clusters = pd.unique(labels)
+
+    onehot = (labels[:, None] == clusters[None, :]).astype(float)
+    counts = onehot.sum(axis=0)
+    totals = onehot.T @ corr.to_numpy() @ onehot
+
+    # Exclude the diagonal ones from within-cluster averages
+    within_pairs = counts * (counts - 1)
+    pairs = np.outer(counts, counts)
+    np.fill_diagonal(pairs, within_pairs)
+    np.fill_diagonal(totals, np.diag(totals) - counts)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(pairs > 0, totals / pairs, 1.0)
+    return pd.DataFrame(mean, index=clusters, columns=clusters)
@@ -0,0 +1,165 @@
+"""
+Shape-preserving downsampling of long time series before charting.
+
+Twenty years of daily data across several overlaid traces is far more points
+than a chart a few hundred pixels wide can show, and every one of them is
+serialized into the Plotly payload. These helpers reduce a series to a point
+budget while keeping its visual shape:
+
+    lttb    - Largest-Triangle-Three-Buckets: keeps the points that span the
+              largest triangle with their neighbours, so peaks, troughs and
+              trend changes survive
+    minmax  - keeps the minimum and maximum of every bucket, so no extreme
+              is ever lost (best for drawdown / underwater curves)
+
+Both always keep the first and last point and run in O(n).
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 1500
+
+
+def _as_float_x(x):
+    """Numeric x positions (datetime -> int64 ns) for geometric calculations."""
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices of the points selected by Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: Array of x positions (numeric or datetime64), increasing
+        y: Array of values
+        n_out: Number of points to keep (>= 3)
+
+    Returns:
+        Sorted integer index array of length min(n_out, len(y))
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    xf = _as_float_x(x)
+    yf = np.asarray(y, dtype=float)
+
+    # Bucket edges over the interior points; first and last are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    prev = 0
+    for b in range(n_out - 2):
+        start, end = edges[b], edges[b + 1]
+        next_start = end
+        next_end = edges[b + 2] if b + 2 < len(edges) else n
+        avg_x = xf[next_start:next_end].mean()
+        avg_y = yf[next_start:next_end].mean()
+
+        bx = xf[start:end]
+        by = yf[start:end]
+        area = np.abs((xf[prev] - avg_x) * (by - yf[prev]) - (xf[prev] - bx) * (avg_y - yf[prev]))
+        prev = start + int(np.nanargmax(area)) if np.isfinite(area).any() else start
+        selected[b + 1] = prev
+
+    return selected
+
+
+def minmax_indices(x, y, n_out):
+    """
+    Indices keeping the minimum and maximum of each bucket.
+
+    Args:
+        x: Array of x positions (unused except for length)
+        y: Array of values
+        n_out: Approximate number of points to keep
+
+    Returns:
+        Sorted, de-duplicated integer index array
+    """
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    yf = np.asarray(y, dtype=float)
+    n_buckets = (n_out - 2) // 2
+    bucket_size = int(np.ceil((n - 2) / n_buckets))
+
+    # Pad the interior to a whole number of buckets and reduce row-wise
+    interior = yf[1:n - 1]
+    pad = n_buckets * bucket_size - len(interior)
+    low = np.concatenate([interior, np.full(pad, np.inf)]).reshape(n_buckets, bucket_size)
+    high = np.concatenate([interior, np.full(pad, -np.inf)]).reshape(n_buckets, bucket_size)
+
+    offsets = np.arange(n_buckets) * bucket_size + 1
+    mins = offsets + np.argmin(np.where(np.isnan(low), np.inf, low), axis=1)
+    maxs = offsets + np.argmax(np.where(np.isnan(high), -np.inf, high), axis=1)
+
+    keep = np.concatenate([[0], mins, maxs, [n - 1]])
+    return np.unique(np.clip(keep, 0, n - 1))
+
+
+_METHODS = {'lttb': lttb_indices, 'minmax': minmax_indices}
+
+
+def downsample_series(series, max_points=DEFAULT_MAX_POINTS, method='lttb', x_range=None):
+    """
+    Reduce a Series to at most ~max_points points for plotting.
+
+    Args:
+        series: Series indexed by date (or any increasing index)
+        max_points: Point budget for the returned series
+        method: 'lttb' or 'minmax'
+        x_range: Optional (start, end) zoom window. Only points inside it are
+            considered, so a narrow window is returned at full resolution
+            whenever it fits the budget
+
+    Returns:
+        Downsampled Series (NaNs dropped)
+    """
+    if method not in _METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'. Use 'lttb' or 'minmax'")
+
+    series = series.dropna()
+    if x_range is not None:
+        start, end = x_range
+        series = series.loc[start:end]
+
+    if len(series) <= max_points:
+        return series
+
+    idx = _METHODS[method](series.index.to_numpy(), series.to_numpy(), max_points)
+    return series.iloc[idx]
+
+
+def downsample_frame(frame, max_points=DEFAULT_MAX_POINTS, method='lttb', x_range=None):
+    """
+    Downsample each column of a DataFrame independently.
+
+    Returns:
+        Dictionary of column -> downsampled Series
+    """
+    return {
+        column: downsample_series(frame[column], max_points, method, x_range)
+        for column in frame.columns
+    }
+
+
+def payload_bytes(figure):
+    """Size of a Plotly figure's JSON payload as sent to the browser."""
+    return len(figure.to_json().encode('utf-8'))
+
+
+def describe_reduction(original_points, sent_points, figure):
+    """One-line summary of points and payload size for a chart caption."""
+    size_kb = payload_bytes(figure) / 1024
+    if sent_points < original_points:
+        return (f"Showing {sent_points:,} of {original_points:,} points "
+                f"({sent_points / original_points:.0%}) · payload {size_kb:,.1f} KB")
+    return f"Showing all {original_points:,} points · payload {size_kb:,.1f} KB"
@@ -0,0 +1,100 @@
+"""
+Drawdown-episode analytics.
+
+A single forward pass over the returns array tracks wealth, the running peak
+and the deepest point since that peak for every column. Each time a column
+climbs back to its previous peak, the completed episode is emitted; an
+episode still open on the last bar is reported with no recovery date. The
+underwater series and the Ulcer/Pain indices fall out of the same pass, so
+nothing is re-walked afterwards. The pass itself is kernels.drawdown_pass,
+compiled with numba when it is installed.
+
+Drawdowns follow the convention of risk_metrics.calculate_max_drawdown: the
+first observation sets the initial peak and depths are negative fractions.
+"""
+
+import numpy as np
+import pandas as pd
+
+from kernels import drawdown_pass
+
+EPISODE_COLUMNS = [
+    'portfolio', 'peak_date', 'trough_date', 'recovery_date',
+    'depth', 'duration', 'decline_periods', 'time_to_recover'
+]
+
+
+def _episodes_frame(episodes, index, columns):
+    n_obs = len(index)
+    recovery = episodes['recovery']
+    recovered = recovery >= 0
+    end = np.where(recovered, recovery, n_obs - 1)
+
+    frame = pd.DataFrame({
+        'portfolio': np.asarray(columns, dtype=object)[episodes['column']],
+        'peak_date': index[episodes['peak']],
+        'trough_date': index[episodes['trough']],
+        'recovery_date': index[np.maximum(recovery, 0)].where(recovered),
+        'depth': episodes['depth'],
+        'duration': end - episodes['peak'],
+        'decline_periods': episodes['trough'] - episodes['peak'],
+        'time_to_recover': np.where(recovered, recovery - episodes['trough'], np.nan)
+    }, columns=EPISODE_COLUMNS)
+    return frame.sort_values(['portfolio', 'peak_date'], kind='stable').reset_index(drop=True)
+
+
+def analyze_drawdowns(returns):
+    """
+    Full drawdown analysis for one returns Series or many portfolio columns.
+
+    Args:
+        returns: Series of returns or DataFrame with one column per portfolio
+
+    Returns:
+        Dictionary with:
+            'episodes'    - DataFrame, one row per drawdown episode with peak,
+                            trough and recovery dates, depth, duration (peak
+                            to recovery, in bars), decline_periods and
+                            time_to_recover (trough to recovery, in bars)
+            'underwater'  - Series/DataFrame of drawdown from running peak
+            'max_drawdown', 'ulcer_index', 'pain_index'
+                          - float for a Series, Series per column otherwise
+    """
+    is_series = isinstance(returns, pd.Series)
+    frame = returns.dropna().to_frame() if is_series else returns.dropna()
+    if is_series and returns.name is None:
+        frame.columns = ['portfolio']
+
+    matrix = frame.to_numpy(dtype=float)
+    columns = list(frame.columns)
+    underwater, episodes = drawdown_pass(matrix)
+
+    max_dd = underwater.min(axis=0)
+    ulcer = np.sqrt((underwater ** 2).mean(axis=0))
+    pain = np.abs(underwater).mean(axis=0)
+
+    underwater_df = pd.DataFrame(underwater, index=frame.index, columns=columns)
+    result = {
+        'episodes': _episodes_frame(episodes, frame.index, columns),
+        'underwater': underwater_df,
+        'max_drawdown': pd.Series(max_dd, index=columns),
+        'ulcer_index': pd.Series(ulcer, index=columns),
+        'pain_index': pd.Series(pain, index=columns)
+    }
+
+    if is_series:
+        result['underwater'] = underwater_df.iloc[:, 0].rename(returns.name)
+        for key in ('max_drawdown', 'ulcer_index', 'pain_index'):
+            result[key] = float(result[key].iloc[0])
+
+    return result
+
+
+def calculate_ulcer_index(returns):
+    """Root-mean-square depth of the underwater curve."""
+    return analyze_drawdowns(returns)['ulcer_index']
+
+
+def calculate_pain_index(returns):
+    """Mean absolute depth of the underwater curve."""
+    return analyze_drawdowns(returns)['pain_index']
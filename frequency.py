@@ -0,0 +1,151 @@
+"""
+Bar frequency and annualization.
+
+Every annualized metric needs to know how many bars make up a year. For
+daily data that is the familiar 252; weekly and monthly bars use 52 and 12,
+and intraday bars multiply the trading days by the number of bars in one
+session (NSE's 09:15-15:30 session is 375 minutes, so 75 five-minute bars).
+
+Intraday histories run to millions of rows, so this module also provides a
+chunked path: price chunks (from the chunked downloader in data_loader or a
+CSV read with chunksize) are turned into returns with the last price carried
+across chunk boundaries, and folded into streaming.PartialStats (the same
+mergeable statistics the out-of-core analysis uses) without ever
+concatenating the full history.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+SESSION_MINUTES = 375
+
+# Interval -> bar length in minutes for intraday intervals (yfinance names)
+INTRADAY_MINUTES = {
+    '1m': 1, '2m': 2, '5m': 5, '15m': 15, '30m': 30,
+    '60m': 60, '90m': 90, '1h': 60,
+}
+
+# Interval -> bars per year for daily and longer intervals
+PERIODIC_BARS = {
+    '1d': TRADING_DAYS,
+    '5d': TRADING_DAYS / 5,
+    '1wk': 52,
+    '1mo': 12,
+    '3mo': 4,
+}
+
+# Minimum number of aligned bars needed before metrics are meaningful
+MIN_OBSERVATIONS = {'1wk': 26, '5d': 26, '1mo': 12, '3mo': 8}
+DEFAULT_MIN_OBSERVATIONS = 60
+
+
+def periods_per_year(interval='1d', session_minutes=SESSION_MINUTES, trading_days=TRADING_DAYS):
+    """
+    Annualization factor (bars per year) for a bar interval.
+
+    Args:
+        interval: yfinance-style interval ('1m', '5m', '1h', '1d', '1wk', '1mo', ...)
+        session_minutes: Length of one trading session in minutes
+        trading_days: Trading days per year
+
+    Returns:
+        Float number of bars per year
+    """
+    if interval in PERIODIC_BARS:
+        return float(PERIODIC_BARS[interval]) * trading_days / TRADING_DAYS
+    if interval in INTRADAY_MINUTES:
+        bars_per_session = math.ceil(session_minutes / INTRADAY_MINUTES[interval])
+        return float(bars_per_session * trading_days)
+    raise ValueError(f"Unknown interval '{interval}'")
+
+
+def is_intraday(interval):
+    return interval in INTRADAY_MINUTES
+
+
+def min_observations(interval='1d'):
+    """Minimum aligned bars required for an analysis at this interval."""
+    return MIN_OBSERVATIONS.get(interval, DEFAULT_MIN_OBSERVATIONS)
+
+
+def iter_csv_prices(filepath, column='Close', chunksize=500_000, index_col=0):
+    """
+    Yield price Series chunks from a CSV without loading the whole file.
+
+    Args:
+        filepath: CSV with a datetime first column and a price column
+        column: Name of the price column
+        chunksize: Rows per chunk
+    """
+    for chunk in pd.read_csv(filepath, index_col=index_col, parse_dates=True, chunksize=chunksize):
+        yield chunk[column].astype(float)
+
+
+def iter_chunk_returns(price_chunks):
+    """
+    Convert a stream of price chunks into a stream of simple-return chunks.
+
+    The last price of each chunk is carried into the next one, so the
+    concatenation of the yielded chunks equals calculate_returns() on the
+    full series.
+    """
+    last_price = None
+    for prices in price_chunks:
+        if isinstance(prices, pd.DataFrame):
+            prices = prices.squeeze(axis=1)
+        prices = prices.dropna()
+        if prices.empty:
+            continue
+
+        values = prices.to_numpy(dtype=float)
+        if last_price is None:
+            returns = values[1:] / values[:-1] - 1
+            index = prices.index[1:]
+        else:
+            returns = values / np.concatenate([[last_price], values[:-1]]) - 1
+            index = prices.index
+
+        last_price = values[-1]
+        if len(returns):
+            yield pd.Series(returns, index=index)
+
+
+def chunked_return_summary(price_chunks, interval='1d', risk_free_rate=0.065):
+    """
+    Annualized return, volatility and Sharpe ratio from chunked prices.
+
+    Each return chunk is reduced to a streaming.PartialStats and merged, so
+    memory is bounded by the chunk size regardless of how many bars the
+    history holds.
+
+    Args:
+        price_chunks: Iterable of price Series chunks, in date order
+        interval: Bar interval of the prices
+        risk_free_rate: Annual risk-free rate
+
+    Returns:
+        Dictionary with 'bars', 'annual_return', 'volatility', 'sharpe_ratio'
+        computed exactly as annualized_returns / calculate_volatility /
+        calculate_sharpe_ratio would on the full series
+    """
+    from streaming import accumulate_stats
+
+    # No benchmark here: a zero series stands in, and only the portfolio side is read back
+    chunks = ((values, np.zeros(len(values))) for values in
+              (returns.to_numpy() for returns in iter_chunk_returns(price_chunks)))
+    stats = accumulate_stats(chunks)
+    if stats.count < 2:
+        raise ValueError("Need at least two returns for a summary")
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        metrics = stats.finalize(risk_free_rate, trading_days=periods_per_year(interval))
+
+    return {
+        'bars': metrics['observations'],
+        'annual_return': metrics['annual_return'],
+        'volatility': metrics['volatility'],
+        'sharpe_ratio': metrics['sharpe_ratio']
+    }
@@ -0,0 +1,207 @@
+"""
+Background analysis jobs for the dashboard.
+
+Streamlit runs the page script on one thread per session, so a long
+download blocks every widget until it finishes. A BackgroundJob runs the
+work on a worker thread instead and exposes what the page needs to stay
+responsive:
+
+    progress     fraction done and a message, updated per downloaded ticker
+    stages       named partial results, published as soon as each is ready
+                 so the page can render a section without waiting for the
+                 rest
+    cancel()     checked between tickers and between stages; the worker
+                 stops at the next checkpoint
+
+The job lives in st.session_state and the page polls it on reruns. A
+thread (not a process) is used on purpose: Portfolio memoizes derived
+state in its own cache, so values computed by the worker are read by the
+page directly, without copying anything between processes.
+"""
+
+import threading
+import time
+
+from frequency import is_intraday
+
+# Share of the progress bar given to downloading; the rest covers analysis stages
+DOWNLOAD_SHARE = 0.7
+
+# Analysis stages in dashboard section order, with the derived values each one warms
+ANALYSIS_STAGES = [
+    ('summary', ['portfolio_returns', 'metrics']),
+    ('market', ['market_metrics', 'cumulative_returns', 'benchmark_cumulative_returns']),
+    ('risk', ['risk_comparison', 'tail_risk', 'drawdown_report', 'confidence_intervals']),
+    ('structure', ['structure', 'diversification']),
+    ('behaviour', ['behaviour', 'rolling_cagr', 'calendar_returns']),
+]
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's worker at the first checkpoint after cancel()."""
+
+
+class BackgroundJob:
+    """
+    A function running on a daemon thread, with progress, stages and cancellation.
+
+    Args:
+        target: Callable run as target(job, *args, **kwargs). It reports
+            progress with job.report(), publishes partial results with
+            job.publish() and calls job.checkpoint() where stopping is safe
+    """
+
+    def __init__(self, target, *args, **kwargs):
+        self._target = target
+        self._args = args
+        self._kwargs = kwargs
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.status = 'pending'
+        self.progress = 0.0
+        self.message = ''
+        self.error = None
+        self.stages = {}
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self):
+        """Run the target on a new daemon thread; returns the job."""
+        self.status = 'running'
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='analysis-job', daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self._target(self, *self._args, **self._kwargs)
+            status = 'done'
+        except JobCancelled:
+            status = 'cancelled'
+        except Exception as e:
+            self.error = e
+            status = 'failed'
+        self.finished_at = time.time()
+        self.status = status
+
+    @property
+    def running(self):
+        return self.status in ('pending', 'running')
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def cancel(self):
+        """Ask the worker to stop at its next checkpoint."""
+        self._cancel.set()
+
+    def checkpoint(self):
+        """Raise JobCancelled if cancellation was requested (worker side)."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def report(self, progress, message=''):
+        """Update progress (0-1) and the status message; also a checkpoint."""
+        with self._lock:
+            self.progress = min(max(progress, 0.0), 1.0)
+            self.message = message
+        self.checkpoint()
+
+    def publish(self, stage, value=None):
+        """Make a partial result available to the page."""
+        with self._lock:
+            self.stages[stage] = value
+
+    def is_ready(self, stage):
+        return stage in self.stages
+
+    def wait(self, timeout=None):
+        """Block until the worker finishes (for scripts and tests)."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.status
+
+
+def analysis_pipeline(job, tickers, weights, definitions, download_tickers, benchmarks, periods,
+                      period, benchmark, interval, risk_free_rate, loader=None, alignment=None,
+                      max_fill_gap=None):
+    """
+    Dashboard analysis as a background job.
+
+    Downloads every ticker once (progress per ticker), then builds the
+    portfolio for the selected (period, benchmark) cell and computes its
+    derived state stage by stage, in the order the dashboard renders it.
+
+    Published stages:
+        'data'       sweep dataset (see sweep.download_sweep_data)
+        'portfolio'  Portfolio for the selected cell (prices aligned)
+        'comparison' shared Portfolio over every compared ticker (only
+                     with more than one definition)
+        'summary', 'market', 'risk', 'structure', 'behaviour'
+                     the portfolio's derived values for that section are
+                     cached
+    """
+    from comparison import union_tickers
+    from portfolio import Portfolio
+    from sweep import build_portfolio, download_sweep_data
+
+    sweep_periods = [period] if is_intraday(interval) else periods
+
+    def on_download(done, total, ticker):
+        job.report(DOWNLOAD_SHARE * done / total, f"Downloaded {ticker} ({done}/{total})")
+
+    job.report(0.0, f"Downloading {len(download_tickers)} stocks and {len(benchmarks)} benchmarks...")
+    data = download_sweep_data(download_tickers, benchmarks, sweep_periods, interval, loader=loader,
+                               progress=on_download)
+    data['periods'] = sweep_periods
+
+    job.report(DOWNLOAD_SHARE, "Validating data quality...")
+    definition = Portfolio(tickers, weights)
+    definition.stock_data = data['stock_data']
+    definition._validate_stock_data()
+    job.publish('data', data)
+
+    job.report(DOWNLOAD_SHARE, "Aligning prices...")
+    portfolio = build_portfolio(tickers, weights, data, period, benchmark, risk_free_rate, alignment, max_fill_gap)
+    portfolio.price_matrix  # alignment happens here; raises on insufficient data
+    job.publish('portfolio', portfolio)
+
+    for i, (stage, names) in enumerate(ANALYSIS_STAGES):
+        job.report(DOWNLOAD_SHARE + (1 - DOWNLOAD_SHARE) * i / len(ANALYSIS_STAGES), f"Computing {stage}...")
+        for name in names:
+            getattr(portfolio, name)
+        job.publish(stage)
+
+        # Compared portfolios render in the market section, so they are ready before it
+        if stage == 'summary' and len(definitions) > 1:
+            all_tickers = union_tickers(definitions)
+            shared = build_portfolio(all_tickers, [1 / len(all_tickers)] * len(all_tickers),
+                                     data, period, benchmark, risk_free_rate, alignment, max_fill_gap)
+            shared.stock_returns_df
+            job.publish('comparison', shared)
+
+    job.report(1.0, "Done")
+
+
+def screen_pipeline(job, tickers, benchmark, period, interval, risk_free_rate, portfolio=None, loader=None):
+    """
+    Universe screen as a background job (see screener.screen_universe).
+
+    Published stages:
+        'screen'     DataFrame of per-ticker metrics
+    """
+    from screener import screen_universe
+
+    def on_download(done, total, ticker):
+        job.report(done / total, f"Downloaded {ticker} ({done}/{total})")
+
+    job.report(0.0, f"Downloading {len(tickers)} tickers...")
+    table = screen_universe(tickers, benchmark, period, interval, risk_free_rate, portfolio, loader=loader,
+                            progress=on_download)
+    job.publish('screen', table)
@@ -0,0 +1,343 @@
+"""
+Path-dependent kernels with an optional JIT backend.
+
+Some computations are sequential by nature: a drawdown episode ends when
+wealth climbs back to its peak, a band-rebalanced portfolio's weights
+depend on every earlier drift and rebalance, a rolling product carries a
+window of state. NumPy can only vectorize them across columns, leaving a
+Python loop over time. This module keeps each such kernel in one place
+with two implementations:
+
+    numpy   always available; loops over bars in Python, vectorized across
+            columns (portfolios)
+    numba   the same recurrences compiled with numba.njit when numba is
+            installed; no Python in the inner loops
+
+Both perform the same floating-point operations in the same order, so
+they return identical results. The backend is picked with set_backend()
+or the PORTFOLIO_KERNELS environment variable ('auto', 'numpy' or
+'numba'); 'auto' (the default) uses numba when it can be imported.
+
+numba is optional and only imported the first time a kernel runs on it;
+functions are compiled on first use and cached on disk.
+"""
+
+import os
+
+import numpy as np
+
+KERNEL_BACKENDS = ('auto', 'numpy', 'numba')
+
+_backend = os.environ.get('PORTFOLIO_KERNELS', 'auto')
+_numba_available = None
+_compiled = {}
+
+
+def numba_available():
+    """True when numba can be imported."""
+    global _numba_available
+    if _numba_available is None:
+        try:
+            import numba  # noqa: F401
+            _numba_available = True
+        except ImportError:
+            _numba_available = False
+    return _numba_available
+
+
+def set_backend(name):
+    """
+    Choose the kernel backend.
+
+    Args:
+        name: 'auto' (numba if installed, else numpy), 'numpy' or 'numba'
+    """
+    global _backend
+    if name not in KERNEL_BACKENDS:
+        raise ValueError(f"Unknown kernel backend '{name}'. Use one of {KERNEL_BACKENDS}")
+    if name == 'numba' and not numba_available():
+        raise ImportError("The numba backend needs numba. Install it with: pip install numba")
+    _backend = name
+
+
+def get_backend():
+    """Backend kernels currently run on ('numpy' or 'numba')."""
+    if _backend == 'auto':
+        return 'numba' if numba_available() else 'numpy'
+    return _backend
+
+
+def _jit(loop):
+    """numba-compiled version of a loop function, compiled once per process."""
+    if loop not in _compiled:
+        import numba
+        _compiled[loop] = numba.njit(cache=True)(loop)
+    return _compiled[loop]
+
+
+# ---------------------------------------------------------------------------
+# Drawdown episodes
+# ---------------------------------------------------------------------------
+
+def _drawdown_loop(matrix):
+    n_obs, n_cols = matrix.shape
+    underwater = np.empty((n_obs, n_cols))
+
+    # An episode needs at least one bar under water, so a column has at most n/2 + 1
+    capacity = n_cols * (n_obs // 2 + 2)
+    cols = np.empty(capacity, dtype=np.int64)
+    peaks = np.empty(capacity, dtype=np.int64)
+    troughs = np.empty(capacity, dtype=np.int64)
+    recoveries = np.empty(capacity, dtype=np.int64)
+    depths = np.empty(capacity)
+    k = 0
+
+    wealth = np.ones(n_cols)
+    peak = np.zeros(n_cols)
+    peak_idx = np.zeros(n_cols, dtype=np.int64)
+    trough = np.full(n_cols, np.inf)
+    trough_idx = np.zeros(n_cols, dtype=np.int64)
+    in_drawdown = np.zeros(n_cols, dtype=np.bool_)
+
+    # Walk rows, not columns: the matrix is row-major
+    for t in range(n_obs):
+        for col in range(n_cols):
+            wealth[col] *= 1 + matrix[t, col]
+
+            if wealth[col] >= peak[col]:
+                if in_drawdown[col]:
+                    cols[k] = col
+                    peaks[k] = peak_idx[col]
+                    troughs[k] = trough_idx[col]
+                    recoveries[k] = t
+                    depths[k] = trough[col] / peak[col] - 1
+                    k += 1
+                peak[col] = wealth[col]
+                peak_idx[col] = t
+                in_drawdown[col] = False
+                trough[col] = np.inf
+            else:
+                in_drawdown[col] = True
+                if wealth[col] < trough[col]:
+                    trough[col] = wealth[col]
+                    trough_idx[col] = t
+
+            underwater[t, col] = wealth[col] / peak[col] - 1
+
+    for col in range(n_cols):
+        if in_drawdown[col]:
+            cols[k] = col
+            peaks[k] = peak_idx[col]
+            troughs[k] = trough_idx[col]
+            recoveries[k] = -1
+            depths[k] = trough[col] / peak[col] - 1
+            k += 1
+
+    return underwater, cols[:k], peaks[:k], troughs[:k], recoveries[:k], depths[:k]
+
+
+def _drawdown_numpy(matrix):
+    n_obs, n_cols = matrix.shape
+    underwater = np.empty((n_obs, n_cols))
+    episodes = []
+
+    wealth = np.ones(n_cols)
+    peak = np.zeros(n_cols)
+    peak_idx = np.zeros(n_cols, dtype=np.int64)
+    trough = np.full(n_cols, np.inf)
+    trough_idx = np.zeros(n_cols, dtype=np.int64)
+    in_drawdown = np.zeros(n_cols, dtype=bool)
+
+    for t in range(n_obs):
+        wealth *= 1 + matrix[t]
+
+        at_peak = wealth >= peak
+        recovered = np.flatnonzero(at_peak & in_drawdown)
+        if len(recovered):
+            episodes.append((recovered, peak_idx[recovered], trough_idx[recovered],
+                             np.full(len(recovered), t), trough[recovered] / peak[recovered] - 1))
+
+        peak = np.where(at_peak, wealth, peak)
+        peak_idx = np.where(at_peak, t, peak_idx)
+        in_drawdown = ~at_peak
+
+        deeper = in_drawdown & (wealth < trough)
+        trough = np.where(at_peak, np.inf, np.where(deeper, wealth, trough))
+        trough_idx = np.where(deeper, t, trough_idx)
+
+        underwater[t] = wealth / peak - 1
+
+    still_open = np.flatnonzero(in_drawdown)
+    episodes.append((still_open, peak_idx[still_open], trough_idx[still_open],
+                     np.full(len(still_open), -1), trough[still_open] / peak[still_open] - 1))
+
+    cols, peaks, troughs, recoveries, depths = (np.concatenate(part) for part in zip(*episodes))
+    return (underwater, cols.astype(np.int64), peaks.astype(np.int64), troughs.astype(np.int64),
+            recoveries.astype(np.int64), depths.astype(float))
+
+
+def drawdown_pass(matrix):
+    """
+    Underwater curve and drawdown episodes of every column in one walk.
+
+    Args:
+        matrix: Array of returns (bars x columns), no NaN
+
+    Returns:
+        Tuple (underwater, episodes): the (bars x columns) drawdown from
+        the running peak, and a dictionary of equal-length arrays 'column',
+        'peak', 'trough', 'recovery' (bar positions; recovery -1 for an
+        episode still open on the last bar) and 'depth', ordered by column
+        then peak
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=float)
+    if get_backend() == 'numba':
+        result = _jit(_drawdown_loop)(matrix)
+    else:
+        result = _drawdown_numpy(matrix)
+
+    underwater, cols, peaks, troughs, recoveries, depths = result
+    order = np.lexsort((peaks, cols))
+    episodes = {
+        'column': cols[order],
+        'peak': peaks[order],
+        'trough': troughs[order],
+        'recovery': recoveries[order],
+        'depth': depths[order],
+    }
+    return underwater, episodes
+
+
+# ---------------------------------------------------------------------------
+# Rolling compounded growth
+# ---------------------------------------------------------------------------
+
+def _rolling_growth_loop(matrix, window):
+    n_obs, n_cols = matrix.shape
+    growth = np.full((n_obs, n_cols), np.nan)
+    if n_obs < window:
+        return growth
+
+    # Walk rows, not columns: the matrix is row-major
+    for t in range(window - 1, n_obs):
+        for col in range(n_cols):
+            growth[t, col] = 1.0
+        for i in range(t - window + 1, t + 1):
+            for col in range(n_cols):
+                growth[t, col] *= 1 + matrix[i, col]
+    return growth
+
+
+def _rolling_growth_numpy(matrix, window):
+    n_obs, n_cols = matrix.shape
+    growth = np.full((n_obs, n_cols), np.nan)
+    if n_obs < window:
+        return growth
+
+    # Multiply the window in bar order (same order as the compiled loop)
+    factors = 1 + matrix
+    product = np.ones((n_obs - window + 1, n_cols))
+    for lag in range(window):
+        product *= factors[lag:n_obs - window + 1 + lag]
+    growth[window - 1:] = product
+    return growth
+
+
+def rolling_growth(matrix, window):
+    """
+    Compounded growth factor over the trailing `window` bars of every column.
+
+    Args:
+        matrix: Array of returns (bars x columns), no NaN
+        window: Window length in bars
+
+    Returns:
+        Array (bars x columns) of prod(1 + r) over each window, NaN for the
+        first window - 1 bars
+    """
+    matrix = np.ascontiguousarray(matrix, dtype=float)
+    if get_backend() == 'numba':
+        return _jit(_rolling_growth_loop)(matrix, window)
+    return _rolling_growth_numpy(matrix, window)
+
+
+# ---------------------------------------------------------------------------
+# Threshold-band rebalancing
+# ---------------------------------------------------------------------------
+
+def _band_rebalance_loop(returns, targets, band):
+    n_obs, n_assets = returns.shape
+    n_portfolios = targets.shape[1]
+    portfolio_returns = np.empty((n_obs, n_portfolios))
+    rebalances = np.zeros(n_portfolios, dtype=np.int64)
+    holdings = np.empty(n_assets)
+
+    for p in range(n_portfolios):
+        for a in range(n_assets):
+            holdings[a] = targets[a, p]
+
+        for t in range(n_obs):
+            period_return = 0.0
+            for a in range(n_assets):
+                period_return += holdings[a] * returns[t, a]
+            portfolio_returns[t, p] = period_return
+
+            drift = 0.0
+            for a in range(n_assets):
+                holdings[a] = holdings[a] * (1 + returns[t, a]) / (1 + period_return)
+                drift = max(drift, abs(holdings[a] - targets[a, p]))
+
+            if drift > band:
+                for a in range(n_assets):
+                    holdings[a] = targets[a, p]
+                rebalances[p] += 1
+
+    return portfolio_returns, rebalances
+
+
+def _band_rebalance_numpy(returns, targets, band):
+    n_obs, n_assets = returns.shape
+    portfolio_returns = np.empty((n_obs, targets.shape[1]))
+    rebalances = np.zeros(targets.shape[1], dtype=np.int64)
+    holdings = targets.copy()
+
+    for t in range(n_obs):
+        r = returns[t][:, None]
+
+        # Sum over assets in index order, as the compiled loop does
+        period_return = np.zeros(targets.shape[1])
+        for a in range(n_assets):
+            period_return += holdings[a] * r[a]
+        portfolio_returns[t] = period_return
+
+        holdings = holdings * (1 + r) / (1 + period_return)
+        rebalance = np.abs(holdings - targets).max(axis=0) > band
+        holdings[:, rebalance] = targets[:, rebalance]
+        rebalances += rebalance
+
+    return portfolio_returns, rebalances
+
+
+def band_rebalance(returns, targets, band):
+    """
+    Returns of portfolios that drift with prices and rebalance on a threshold.
+
+    Weights start at their targets and drift with each bar's returns. When
+    any weight is more than `band` away from its target at the close, the
+    portfolio is rebalanced back to the targets.
+
+    Args:
+        returns: Array of asset returns (bars x assets), no NaN
+        targets: Array of target weights (assets x portfolios)
+        band: Absolute weight tolerance (0 rebalances on every drift,
+            np.inf never rebalances)
+
+    Returns:
+        Tuple (portfolio_returns, rebalances): array (bars x portfolios)
+        and the number of rebalances per portfolio
+    """
+    returns = np.ascontiguousarray(returns, dtype=float)
+    targets = np.ascontiguousarray(targets, dtype=float)
+    if get_backend() == 'numba':
+        return _jit(_band_rebalance_loop)(returns, targets, float(band))
+    return _band_rebalance_numpy(returns, targets, float(band))
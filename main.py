@@ -105,6 +105,17 @@ def main():
             portfolio.analyze(start_date=start, end_date=end)
         else:
             portfolio.analyze(period=period)
+        
+        # Sector attribution when a classification file sits next to portfolio.csv
+        from attribution import DEFAULT_CLASSIFICATION_PATH, DEFAULT_BENCHMARK_WEIGHTS_PATH
+        if os.path.exists(DEFAULT_CLASSIFICATION_PATH):
+            benchmark_weights = (DEFAULT_BENCHMARK_WEIGHTS_PATH
+                                 if os.path.exists(DEFAULT_BENCHMARK_WEIGHTS_PATH) else None)
+            print()
+            portfolio.display_attribution(DEFAULT_CLASSIFICATION_PATH, benchmark_weights)
+        
+        # Keep the aligned data so the dashboard can restore this run instantly
+        portfolio.save_snapshot(os.path.join('snapshots', 'latest'))
             
     except Exception as e:
         print(f"\n✗ Error during analysis: {e}")
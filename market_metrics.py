@@ -6,16 +6,16 @@ def calculate_excess_returns(potfolio_returns,benchmark_returns):
     exr = potfolio_returns - benchmark_returns
     return exr
 
-def annualize_excess_returns(portfolio_returns,benchmark_returns):
-    return annualized_returns(portfolio_returns)-annualized_returns(benchmark_returns)
+def annualize_excess_returns(portfolio_returns,benchmark_returns,trading_days=252):
+    return annualized_returns(portfolio_returns,trading_days)-annualized_returns(benchmark_returns,trading_days)
 
-def tracking_error(excess_returns):
-    return excess_returns.std() * np.sqrt(252)
+def tracking_error(excess_returns,trading_days=252):
+    return excess_returns.std() * np.sqrt(trading_days)
     
 
-def calculate_information_ratio(portfolio_returns, benchmark_returns):
+def calculate_information_ratio(portfolio_returns, benchmark_returns,trading_days=252):
     excess = calculate_excess_returns(portfolio_returns, benchmark_returns)
-    return annualized_returns(excess) / tracking_error(excess)
+    return annualized_returns(excess,trading_days) / tracking_error(excess,trading_days)
 
 def calculate_beta(portfolio_returns,benchmark_returns):
     return portfolio_returns.cov(benchmark_returns)/benchmark_returns.var()
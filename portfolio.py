@@ -1,12 +1,65 @@
 import pandas as pd
 import numpy as np
-from data_loader import *
 from returns_calc import *
 from risk_metrics import *
 from market_metrics import *
 
 
+# Derived quantity -> the inputs/derived quantities it is computed from.
+# Filled in by @_derived and walked by Portfolio._invalidate.
+_DEPENDENCIES = {}
+
+
+def _input(name):
+    """
+    Plain attribute whose assignment invalidates everything derived from it.
+    """
+    private = '_' + name
+
+    def getter(self):
+        return getattr(self, private)
+
+    def setter(self, value):
+        setattr(self, private, value)
+        self._invalidate(name)
+
+    return property(getter, setter)
+
+
+def _derived(*depends_on):
+    """
+    Lazily computed, memoized property.
+
+    The value is computed on first access and cached until one of
+    `depends_on` (an input or another derived quantity) changes.
+    """
+    def decorator(func):
+        name = func.__name__
+        _DEPENDENCIES[name] = depends_on
+
+        def getter(self):
+            if name not in self._cache:
+                self._cache[name] = func(self)
+            return self._cache[name]
+
+        getter.__name__ = name
+        getter.__doc__ = func.__doc__
+        return property(getter)
+
+    return decorator
+
+
 class Portfolio:
+    tickers = _input('tickers')
+    weights = _input('weights')
+    benchmark_ticker = _input('benchmark_ticker')
+    stock_data = _input('stock_data')
+    benchmark_data = _input('benchmark_data')
+    risk_free_rate = _input('risk_free_rate')
+    interval = _input('interval')
+    alignment = _input('alignment')
+    max_fill_gap = _input('max_fill_gap')
+
     def __init__(self, tickers, weights):
         if len(tickers) != len(weights):
             raise ValueError("Number of Tickers must be equal to Number of Weights")
@@ -14,13 +67,31 @@ class Portfolio:
         if abs(sum(weights) - 1.0) > 0.001:
             raise ValueError("Weights must sum to 1.0")
         
+        self._cache = {}
         self.tickers = tickers
         self.weights = weights
         self.stock_data = {}
-        self.portfolio_returns = None
         self.benchmark_ticker = "^NSEI"
         self.benchmark_data = None
-        self.benchmark_returns = None
+        self.risk_free_rate = 0.065
+        self.interval = '1d'
+        self.alignment = 'exchange'
+        self.max_fill_gap = 5
+    
+    
+    def _invalidate(self, name):
+        """Drop every cached quantity that depends (transitively) on `name`."""
+        stale = {name}
+        changed = True
+        while changed:
+            changed = False
+            for key, depends_on in _DEPENDENCIES.items():
+                if key not in stale and stale.intersection(depends_on):
+                    stale.add(key)
+                    changed = True
+        
+        for key in stale:
+            self._cache.pop(key, None)
     
     
     @classmethod
@@ -33,20 +104,30 @@ class Portfolio:
         return cls(tickers, weights)
     
     
-    def download_data(self, period='1y', start_date=None, end_date=None):
+    def download_data(self, period='1y', start_date=None, end_date=None, interval=None):
+        from data_loader import download_stock_data
+        
+        if interval is not None:
+            self.interval = interval
+        
         print(f"Downloading data for {len(self.tickers)} stocks...")
         
+        stock_data = {}
         for ticker in self.tickers:
             try:
-                df = download_stock_data(ticker, start_date=start_date, end_date=end_date, period=period)
-                self.stock_data[ticker] = df
+                df = download_stock_data(ticker, start_date=start_date, end_date=end_date, period=period,
+                                         interval=self.interval)
+                stock_data[ticker] = df
             except Exception as e:
                 print(f"✗ Failed to download {ticker}: {e}")
         
+        # Assign (rather than mutate) so derived state is invalidated
+        self.stock_data = stock_data
         print(f"✓ Downloaded {len(self.stock_data)}/{len(self.tickers)} stocks\n")
 
         try:
-            self.benchmark_data = download_stock_data(self.benchmark_ticker,start_date=start_date,end_date=end_date,period=period)
+            self.benchmark_data = download_stock_data(self.benchmark_ticker,start_date=start_date,end_date=end_date,period=period,
+                                                      interval=self.interval)
             print(f"Bench mark data downloaded")
         except Exception as e:
             print(F"Failed to download Benchmarks Data {e}")
@@ -97,39 +178,50 @@ class Portfolio:
         print("-" * 60)
     
     
-    def calculate_portfolio_returns(self):
+    @_derived('interval')
+    def periods_per_year(self):
+        """Annualization factor for the bar interval (252 for daily bars)."""
+        from frequency import periods_per_year
+        return periods_per_year(self.interval)
+    
+    
+    @_derived('stock_data', 'benchmark_data', 'benchmark_ticker', 'tickers', 'interval', 'alignment',
+              'max_fill_gap')
+    def alignment_report(self):
+        """Union-calendar alignment of stocks and benchmark (see alignment.align_prices)."""
+        from alignment import align_prices
+        from frequency import is_intraday
         
         if not self.stock_data:
             raise ValueError("No data! Call download_data() first")
         
-        # Build price DataFrame
-        prices_df = pd.DataFrame()
-        original_lengths = {}
-        
-        for ticker in self.tickers:
-            close_prices = self.stock_data[ticker]['Close']
-            if isinstance(close_prices, pd.DataFrame):
-                close_prices = close_prices.squeeze()
-            
-            prices_df[ticker] = close_prices
-            original_lengths[ticker] = len(close_prices)
-        
-        # Check alignment quality BEFORE dropping
+        closes = {ticker: self.stock_data[ticker]['Close'] for ticker in self.tickers}
+        benchmark_prices = self.benchmark_data['Close'] if self.benchmark_data is not None else None
+        return align_prices(closes, benchmark_prices, self.benchmark_ticker, self.alignment, self.max_fill_gap,
+                            daily=not is_intraday(self.interval))
+    
+    
+    @_derived('alignment_report')
+    def _aligned_prices(self):
+        """Stock price matrix and benchmark prices on common dates."""
+        report = self.alignment_report
+        summary = report['summary']
+        aligned_df = report['prices']
+        total_dates = report['calendar_size']
+        
+        # Check alignment quality
         print("\nData Alignment Analysis:")
         print("-" * 60)
         
-        total_dates = len(prices_df)
-        print(f"Total unique dates: {total_dates}")
+        print(f"Total unique dates: {total_dates} (union calendar, {report['policy']} alignment)")
         
-        data_availability = prices_df.notna().sum(axis=1)
-        fully_aligned_dates = (data_availability == len(self.tickers)).sum()
-        
-        print(f"Dates with ALL stocks: {fully_aligned_dates} ({fully_aligned_dates/total_dates*100:.1f}%)")
+        fully_aligned_dates = total_dates - len(report['dropped_dates']) - report['filled'].any(axis=1).sum()
+        print(f"Dates with ALL series: {fully_aligned_dates} ({fully_aligned_dates/total_dates*100:.1f}%)")
         
         # Check per-stock overlap
         print("\nPer-stock overlap:")
-        for ticker in self.tickers:
-            available = prices_df[ticker].notna().sum()
+        for ticker, row in summary.iterrows():
+            available = row['observed']
             overlap_pct = available / total_dates * 100
             
             if overlap_pct < 80:
@@ -137,12 +229,11 @@ class Portfolio:
             else:
                 print(f"  ✓ {ticker}: {available}/{total_dates} days ({overlap_pct:.1f}%)")
         
-        # Drop missing data
-        aligned_df = prices_df.dropna()
-        dropped_dates = total_dates - len(aligned_df)
+        dropped_dates = len(report['dropped_dates'])
         
         print(f"\nAfter alignment:")
         print(f"  Kept: {len(aligned_df)} days")
+        print(f"  Filled: {int(summary['filled'].sum())} cells (last price carried, max gap {report['max_gap']})")
         print(f"  Dropped: {dropped_dates} days ({dropped_dates/total_dates*100:.1f}%)")
         
         # Warn if too much data lost
@@ -151,74 +242,358 @@ class Portfolio:
             print(f"  This may indicate stocks trading on different exchanges or bad tickers")
         
         # Error if insufficient data
-        if len(aligned_df) < 60:
-            print(f"\n  ✗ ERROR: Only {len(aligned_df)} aligned days - insufficient for analysis")
-            print(f"  Need at least 60 days. Check if tickers are valid.")
+        from frequency import min_observations
+        min_bars = min_observations(self.interval)
+        if len(aligned_df) < min_bars:
+            print(f"\n  ✗ ERROR: Only {len(aligned_df)} aligned bars - insufficient for analysis")
+            print(f"  Need at least {min_bars} bars. Check if tickers are valid.")
             raise ValueError("Insufficient aligned data")
         
         print("-" * 60)
         
-        # Align with benchmark BEFORE calculating returns
-        aligned_df = self._align_with_benchmark(aligned_df)
+        if report['benchmark'] is None:
+            print("\n  WARNING: No benchmark data available")
+        else:
+            print(f"\nBenchmark aligned: {len(aligned_df)} common trading days")
         
-        # Calculate returns for each stock from aligned prices
-        returns_df = pd.DataFrame()
-        for ticker in self.tickers:
-            returns_df[ticker] = calculate_returns(aligned_df[ticker])
-
-        self.stock_returns_df = returns_df
+        return aligned_df, report['benchmark']
+    
+    
+    @_derived('_aligned_prices')
+    def price_matrix(self):
+        """Aligned close prices, one column per ticker."""
+        return self._aligned_prices[0]
+    
+    
+    @_derived('_aligned_prices')
+    def benchmark_returns(self):
+        """Benchmark returns on the portfolio's dates (None without benchmark)."""
+        benchmark_prices = self._aligned_prices[1]
+        if benchmark_prices is None:
+            return None
+        return calculate_returns(benchmark_prices)
+    
+    
+    @_derived('price_matrix')
+    def stock_returns_df(self):
+        """Returns matrix computed from the aligned prices."""
+        return calculate_returns(self.price_matrix)
+    
+    
+    @_derived('stock_returns_df', 'weights')
+    def portfolio_returns(self):
+        """Weighted daily portfolio returns."""
+        return (self.stock_returns_df * self.weights).sum(axis=1)
+    
+    
+    @_derived('portfolio_returns')
+    def cumulative_returns(self):
+        return calculate_cumulative_returns(self.portfolio_returns)
+    
+    
+    @_derived('benchmark_returns')
+    def benchmark_cumulative_returns(self):
+        if self.benchmark_returns is None:
+            return None
+        return calculate_cumulative_returns(self.benchmark_returns)
+    
+    
+    @_derived('portfolio_returns', 'periods_per_year')
+    def rolling_cagr(self):
+        """Rolling 1-year CAGR, or None with less than one year of bars."""
+        window = int(round(self.periods_per_year))
+        if len(self.portfolio_returns) < window:
+            return None
+        return calculate_rolling_cagr(self.portfolio_returns, window=window, trading_days=self.periods_per_year)
+    
+    
+    @_derived('portfolio_returns', 'periods_per_year')
+    def _rate_free_metrics(self):
+        """Headline metrics that do not depend on the risk-free rate."""
+        bars = self.periods_per_year
+        return {
+            'annual_return': annualized_returns(self.portfolio_returns, bars),
+            'volatility': calculate_volatility(self.portfolio_returns, trading_days=bars),
+            'max_drawdown': calculate_max_drawdown(self.portfolio_returns)
+        }
+    
+    
+    @_derived('_rate_free_metrics', 'portfolio_returns', 'risk_free_rate', 'periods_per_year')
+    def metrics(self):
+        """Headline performance metrics (see get_metrics)."""
+        bars = self.periods_per_year
+        base = self._rate_free_metrics
+        return {
+            'annual_return': base['annual_return'],
+            'volatility': base['volatility'],
+            'sharpe_ratio': calculate_sharpe_ratio(self.portfolio_returns, self.risk_free_rate, bars),
+            'sortino_ratio': calculate_sortino_ratio(self.portfolio_returns, self.risk_free_rate, bars),
+            'max_drawdown': base['max_drawdown']
+        }
+    
+    
+    @_derived('portfolio_returns', 'benchmark_returns', 'periods_per_year')
+    def market_metrics(self):
+        """Benchmark-relative metrics (None without benchmark)."""
+        if self.benchmark_returns is None:
+            return None
+        bars = self.periods_per_year
+        excess_ret = calculate_excess_returns(self.portfolio_returns, self.benchmark_returns)
+        return {
+            'excess_returns': excess_ret,
+            'annualized_excess_return': annualize_excess_returns(self.portfolio_returns, self.benchmark_returns, bars),
+            'tracking_error': tracking_error(excess_ret, bars),
+            'information_ratio': calculate_information_ratio(self.portfolio_returns, self.benchmark_returns, bars),
+            'beta': calculate_beta(self.portfolio_returns, self.benchmark_returns)
+        }
+    
+    
+    @_derived('metrics', 'benchmark_returns')
+    def risk_comparison(self):
+        """Portfolio vs benchmark risk figures (None without benchmark)."""
+        if self.benchmark_returns is None:
+            return None
+        bars = self.periods_per_year
+        return {
+            'portfolio_volatility': self.metrics['volatility'],
+            'market_volatility': calculate_volatility(self.benchmark_returns, trading_days=bars),
+            'portfolio_drawdown': self.metrics['max_drawdown'],
+            'market_drawdown': calculate_max_drawdown(self.benchmark_returns),
+            'portfolio_sharpe': self.metrics['sharpe_ratio'],
+            'market_sharpe': calculate_sharpe_ratio(self.benchmark_returns, self.risk_free_rate, bars),
+            'portfolio_downside': calculate_downside_deviation(self.portfolio_returns, trading_days=bars),
+            'market_downside': calculate_downside_deviation(self.benchmark_returns, trading_days=bars)
+        }
+    
+    
+    @_derived('stock_returns_df', 'weights')
+    def structure(self):
+        """Return contribution and concentration figures."""
+        from portfolio_metrics import (
+            total_contribution_by_stock,
+            calculate_concentration,
+            calculate_effective_n_stocks
+        )
         
-        # Calculate weighted portfolio returns
-        portfolio_returns = (returns_df * self.weights).sum(axis=1)
-        self.portfolio_returns = portfolio_returns
-        # Final safety alignment between portfolio and benchmark returns
+        contributions = total_contribution_by_stock(self.stock_returns_df, self.weights)
+        return {
+            'contributions': contributions,
+            'top_contributor': contributions.idxmax(),
+            'top_contributor_value': contributions.max(),
+            'top_dragger': contributions.idxmin(),
+            'top_dragger_value': contributions.min(),
+            'concentration': calculate_concentration(self.weights),
+            'effective_n': calculate_effective_n_stocks(self.weights)
+        }
+    
+    
+    @_derived('stock_returns_df', 'weights')
+    def diversification(self):
+        """Correlation clusters and correlation-adjusted effective N."""
+        from diversification import analyze_diversification
+        return analyze_diversification(self.stock_returns_df, self.weights)
+    
+    
+    @_derived('portfolio_returns', 'benchmark_returns')
+    def behaviour(self):
+        """Win rate and average gain/loss for portfolio and benchmark."""
+        behaviour = {
+            'win_rate': calculate_win_rate(self.portfolio_returns),
+            'gain_loss': calculate_avg_gain_loss(self.portfolio_returns),
+            'benchmark_win_rate': None,
+            'benchmark_gain_loss': None
+        }
         if self.benchmark_returns is not None:
-            common_idx = self.portfolio_returns.index.intersection(self.benchmark_returns.index)
-            self.portfolio_returns = self.portfolio_returns.loc[common_idx]
-            self.benchmark_returns = self.benchmark_returns.loc[common_idx]
-
+            behaviour['benchmark_win_rate'] = calculate_win_rate(self.benchmark_returns)
+            behaviour['benchmark_gain_loss'] = calculate_avg_gain_loss(self.benchmark_returns)
+        return behaviour
+    
+    
+    @_derived('portfolio_returns', 'benchmark_returns')
+    def comparison_returns(self):
+        """Portfolio and benchmark returns side by side."""
+        columns = {'Portfolio': self.portfolio_returns}
+        if self.benchmark_returns is not None:
+            columns['Market'] = self.benchmark_returns
+        return pd.DataFrame(columns)
+    
+    
+    @_derived('comparison_returns')
+    def drawdown_report(self):
+        """Drawdown episodes, underwater series and Ulcer/Pain indices."""
+        from drawdown import analyze_drawdowns
+        return analyze_drawdowns(self.comparison_returns)
+    
+    
+    @_derived('comparison_returns')
+    def tail_risk(self):
+        """VaR / ES table at 95% and 99%, 1 and 10 days."""
+        from tail_risk import calculate_tail_risk_table
+        return calculate_tail_risk_table(self.comparison_returns)
+    
+    
+    @_derived('comparison_returns', 'risk_free_rate', 'periods_per_year')
+    def confidence_intervals(self):
+        """95% stationary-bootstrap intervals for get_metrics, IR and beta."""
+        from bootstrap import bootstrap_confidence_intervals
+        returns = self.comparison_returns
+        return bootstrap_confidence_intervals(
+            returns['Portfolio'].dropna(),
+            returns['Market'] if 'Market' in returns else None,
+            self.risk_free_rate,
+            self.periods_per_year,
+            seed=0
+        )
+    
+    
+    @_derived('comparison_returns', 'stock_returns_df')
+    def calendar_returns(self):
+        """Monthly, quarterly and yearly returns of portfolio, benchmark and holdings."""
+        from calendar_returns import calendar_returns
+        return calendar_returns(self.comparison_returns.join(self.stock_returns_df))
+    
+    
+    def constituent_returns(self, tickers, loader=None):
+        """
+        Returns of extra tickers (e.g. benchmark constituents) on the portfolio's dates.
+        
+        Prices come from stock_data when present (a download that included
+        them), otherwise they are downloaded for the aligned date range.
+        Gaps are forward-filled, so a move across a missing bar lands on the
+        next bar; tickers without any data are left out.
+        """
+        index = self.price_matrix.index
+        closes = {}
+        for ticker in tickers:
+            df = self.stock_data.get(ticker)
+            if df is None:
+                if loader is None:
+                    from data_loader import download_stock_data as loader
+                try:
+                    end = index[-1] + pd.Timedelta(days=1)
+                    df = loader(ticker, start_date=index[0].strftime('%Y-%m-%d'),
+                                end_date=end.strftime('%Y-%m-%d'), interval=self.interval)
+                except Exception as e:
+                    print(f"✗ Failed to download {ticker}: {e}")
+                    continue
+            close = df['Close']
+            closes[ticker] = close.squeeze(axis=1) if isinstance(close, pd.DataFrame) else close
+        
+        if not closes:
+            return pd.DataFrame(index=self.stock_returns_df.index)
+        prices = pd.DataFrame(closes).reindex(index).ffill()
+        returns = prices.pct_change().reindex(self.stock_returns_df.index)
+        return returns.dropna(axis=1, how='all')
+    
+    
+    def attribution(self, classification, benchmark_weights=None, level='Sector', frequency=None, loader=None):
+        """
+        Sector/group contribution and linked Brinson attribution (see attribution.attribute).
+        
+        Args:
+            classification: DataFrame from load_classification or a CSV path
+            benchmark_weights: Series from load_benchmark_weights or a CSV path (optional)
+            level: Classification column to group by
+            frequency: None (every bar) or 'week'/'month'/'quarter'/'year'
+            loader: Downloader for constituents not in stock_data
+        """
+        from attribution import attribute, load_benchmark_weights, load_classification
+        
+        if not isinstance(classification, pd.DataFrame):
+            classification = load_classification(classification)
+        if benchmark_weights is not None and not isinstance(benchmark_weights, pd.Series):
+            benchmark_weights = load_benchmark_weights(benchmark_weights)
+        
+        stock_returns = self.stock_returns_df
+        if benchmark_weights is not None:
+            extra = [t for t in benchmark_weights.index if t not in stock_returns.columns]
+            if extra:
+                stock_returns = pd.concat([stock_returns, self.constituent_returns(extra, loader)], axis=1)
+        
+        weights = pd.Series(list(self.weights), index=list(self.tickers))
+        return attribute(stock_returns, weights, classification, benchmark_weights, level, frequency)
+    
+    
+    def stress_test(self, scenarios=None, shocks=None, classification=None, level='Sector', loader=None):
+        """
+        Historical windows and hypothetical shocks against the current weights (see scenarios.stress_test).
+        
+        Args:
+            scenarios: Dictionary name -> (start, end) (default: scenarios.HISTORICAL_SCENARIOS)
+            shocks: Dictionary name -> shock definition (default: scenarios.HYPOTHETICAL_SHOCKS)
+            classification: DataFrame from load_classification or a CSV path (for sector shocks)
+            level: Classification column sector shocks refer to
+            loader: Downloader for the long history (default: a PriceStore)
+        
+        Returns:
+            DataFrame indexed by scenario
+        """
+        from scenarios import stress_test
+        table = stress_test(self, None, scenarios, shocks, classification, level, loader)
+        return table.xs('Portfolio', level='portfolio')
+    
+    
+    def calculate_portfolio_returns(self):
         return self.portfolio_returns
     
     
-    def _align_with_benchmark(self, aligned_df):
-        if self.benchmark_data is None:
-            print("\n  WARNING: No benchmark data available")
-            return aligned_df
-        
-        # Extract benchmark close prices
-        benchmark_prices = self.benchmark_data['Close']
-        if isinstance(benchmark_prices, pd.DataFrame):
-            benchmark_prices = benchmark_prices.squeeze()
-        
-        # Find common dates between portfolio and benchmark
-        common_dates = aligned_df.index.intersection(benchmark_prices.index)
-        
-        # Filter both to common dates
-        aligned_df = aligned_df.loc[common_dates]
-        aligned_benchmark_prices = benchmark_prices.loc[common_dates]
-        
-        # Calculate benchmark returns from filtered prices
-        self.benchmark_returns = calculate_returns(aligned_benchmark_prices)
-        
-        print(f"\nBenchmark aligned: {len(common_dates)} common trading days")
-        
-        return aligned_df
-
+    def stream_metrics(self, price_chunks, benchmark_column=None):
+        """
+        Metrics from a chunked price history without loading it into memory.
+        
+        Args:
+            price_chunks: Iterable of wide price DataFrames in date order
+                (columns = tickers plus the benchmark), e.g. from
+                streaming.iter_csv_price_chunks
+            benchmark_column: Benchmark column name (defaults to benchmark_ticker)
+        """
+        from streaming import stream_metrics
+        
+        return stream_metrics(
+            price_chunks,
+            self.tickers,
+            self.weights,
+            benchmark_column or self.benchmark_ticker,
+            risk_free_rate=self.risk_free_rate,
+            trading_days=self.periods_per_year,
+            alignment=self.alignment,
+            max_fill_gap=self.max_fill_gap
+        )
     
     
-    def get_metrics(self, risk_free_rate=0.065):
-        if self.portfolio_returns is None:
-            raise ValueError("Calculate portfolio returns first!")
-        
-        metrics = {
-            'annual_return': annualized_returns(self.portfolio_returns),
-            'volatility': calculate_volatility(self.portfolio_returns),
-            'sharpe_ratio': calculate_sharpe_ratio(self.portfolio_returns, risk_free_rate),
-            'sortino_ratio': calculate_sortino_ratio(self.portfolio_returns, risk_free_rate),
-            'max_drawdown': calculate_max_drawdown(self.portfolio_returns)
-        }
+    def estimate_from_index(self, index, benchmark=None):
+        """
+        Approximate volatility, beta, expected return and tracking error
+        from a TickerStatsIndex, without downloading or aligning any data.
+        """
+        return index.estimate(
+            self.tickers,
+            self.weights,
+            benchmark or self.benchmark_ticker,
+            self.risk_free_rate
+        )
+    
+    
+    def save_snapshot(self, path):
+        """Save aligned data, returns and metrics for fast restore (see snapshot.py)."""
+        from snapshot import save_snapshot
+        return save_snapshot(self, path)
+    
+    
+    @classmethod
+    def load_snapshot(cls, path, mmap=True):
+        """Restore an analyzed portfolio saved with save_snapshot."""
+        from snapshot import load_snapshot
+        return load_snapshot(path, mmap=mmap)
+    
+    
+    def get_metrics(self, risk_free_rate=None):
+        if risk_free_rate is not None and risk_free_rate != self.risk_free_rate:
+            self.risk_free_rate = risk_free_rate
         
-        return metrics
+        return self.metrics
+    
+    
     def display_market_comparison(self):
         if self.benchmark_returns is None:
             print("No benchmark Data found")
@@ -226,11 +601,11 @@ class Portfolio:
         print("\n" + "=" * 60)
         print("MARKET COMPARISON")
         print("=" * 60)
-        excess_ret = calculate_excess_returns(self.portfolio_returns,self.benchmark_returns)
-        annualized_excess_ret = annualize_excess_returns(self.portfolio_returns,self.benchmark_returns)
-        te = tracking_error(excess_ret)
-        ir = calculate_information_ratio(self.portfolio_returns,self.benchmark_returns)
-        beta = calculate_beta(self.portfolio_returns,self.benchmark_returns)
+        market = self.market_metrics
+        annualized_excess_ret = market['annualized_excess_return']
+        te = market['tracking_error']
+        ir = market['information_ratio']
+        beta = market['beta']
         
         print(f"\nAnnualized Excess Return: {annualized_excess_ret:>10.2%}")
         print(f"Tracking Error:           {te:>10.2%}")
@@ -261,37 +636,34 @@ class Portfolio:
         print("=" * 60)
         
         print()
-    def display_risk_comparison(self, risk_free_rate=0.065):
+    def display_risk_comparison(self, risk_free_rate=None):
         
         if self.benchmark_returns is None:
             print("No benchmark data available")
             return
         
+        if risk_free_rate is not None and risk_free_rate != self.risk_free_rate:
+            self.risk_free_rate = risk_free_rate
+        
         print("\n" + "=" * 60)
         print("RISK COMPARISON")
         print("=" * 60)
         
-        from risk_metrics import (
-            calculate_volatility,
-            calculate_max_drawdown,
-            calculate_sharpe_ratio,
-            calculate_downside_deviation
-        )
+        risk = self.risk_comparison
         
-        # Calculate metrics
-        portfolio_vol = calculate_volatility(self.portfolio_returns)
-        market_vol = calculate_volatility(self.benchmark_returns)
+        portfolio_vol = risk['portfolio_volatility']
+        market_vol = risk['market_volatility']
         relative_vol = portfolio_vol / market_vol
         
-        portfolio_dd = calculate_max_drawdown(self.portfolio_returns)
-        market_dd = calculate_max_drawdown(self.benchmark_returns)
+        portfolio_dd = risk['portfolio_drawdown']
+        market_dd = risk['market_drawdown']
         relative_dd = portfolio_dd / market_dd
         
-        portfolio_sharpe = calculate_sharpe_ratio(self.portfolio_returns, risk_free_rate)
-        market_sharpe = calculate_sharpe_ratio(self.benchmark_returns, risk_free_rate)
+        portfolio_sharpe = risk['portfolio_sharpe']
+        market_sharpe = risk['market_sharpe']
         
-        portfolio_downside = calculate_downside_deviation(self.portfolio_returns)
-        market_downside = calculate_downside_deviation(self.benchmark_returns)
+        portfolio_downside = risk['portfolio_downside']
+        market_downside = risk['market_downside']
         
         # Display
         print("\nVolatility:")
@@ -319,18 +691,11 @@ class Portfolio:
         print("PORTFOLIO STRUCTURE")
         print("=" * 60)
         
-        from portfolio_metrics import (
-            total_contribution_by_stock,
-            identify_top_contributors,
-            calculate_concentration,
-            calculate_effective_n_stocks
-        )
-        
-        # Calculate metrics
-        contributions = total_contribution_by_stock(self.stock_returns_df, self.weights)
-        top_bottom = identify_top_contributors(self.stock_returns_df, self.weights)
-        concentration = calculate_concentration(self.weights)
-        effective_n = calculate_effective_n_stocks(self.weights)
+        structure = self.structure
+        contributions = structure['contributions']
+        top_bottom = structure
+        concentration = structure['concentration']
+        effective_n = structure['effective_n']
         
         # Display contribution by stock
         print("\nReturn Contribution by Stock:")
@@ -351,6 +716,17 @@ class Portfolio:
         print(f"  Max Concentration:       {concentration:>10.1%}")
         print(f"  Effective # of Stocks:   {effective_n:>10.1f}")
         
+        # Correlation-aware view: how many independent bets are really held
+        diversification = self.diversification
+        print(f"  Correlation-Adj. Eff. N: {diversification['correlation_effective_n']:>10.1f}")
+        print(f"  Avg Pairwise Correlation:{diversification['average_correlation']:>10.2f}")
+        print(f"  Correlation Clusters:    {len(diversification['cluster_weights']):>10}")
+        print(f"  Effective # of Clusters: {diversification['effective_clusters']:>10.1f}")
+        print(f"  Largest Cluster Weight:  {diversification['largest_cluster_weight']:>10.1%}")
+        
+        if diversification['correlation_effective_n'] < 0.5 * effective_n:
+            print("\n  ⚠ Holdings are highly correlated - diversification is largely an illusion")
+        
         
     def display_behaviour_analysis(self):
         
@@ -359,57 +735,228 @@ class Portfolio:
         print("BEHAVIOUR ANALYSIS")
         print("=" * 60)
         
-        from risk_metrics import (
-            calculate_rolling_cagr,
-            calculate_win_rate,
-            calculate_avg_gain_loss
-        )
+        behaviour = self.behaviour
+        win_rate = behaviour['win_rate']
+        gain_loss = behaviour['gain_loss']
+        benchmark_win_rate = behaviour['benchmark_win_rate']
+        benchmark_gain_loss = behaviour['benchmark_gain_loss']
         
-        # Calculate metrics
-        win_rate = calculate_win_rate(self.portfolio_returns)
-        gain_loss = calculate_avg_gain_loss(self.portfolio_returns)
-        
-        # Also calculate for benchmark
-        benchmark_win_rate = calculate_win_rate(self.benchmark_returns)
-        benchmark_gain_loss = calculate_avg_gain_loss(self.benchmark_returns)
-        
-        # Only calculate rolling CAGR if we have enough data
+        # Rolling CAGR is only computed when there is enough data
         n_days = len(self.portfolio_returns)
-        if n_days >= 252:
-            rolling_cagr = calculate_rolling_cagr(self.portfolio_returns)
-            rolling_cagr_clean = rolling_cagr.dropna()  # Drop NaN values
-            
-            print("\nReturn Consistency:")
-            if len(rolling_cagr_clean) > 0:
-                print(f"  Current 1Y CAGR:       {rolling_cagr_clean.iloc[-1]:>10.2%}")
-                print(f"  Rolling CAGR Std Dev:  {rolling_cagr_clean.std():>10.2%}")
-                self.rolling_cagr = rolling_cagr  # Store for plotting
-            else:
-                print(f"  Insufficient data for rolling CAGR (need 252 days, have {n_days})")
+        rolling_cagr = self.rolling_cagr
+        rolling_cagr_clean = rolling_cagr.dropna() if rolling_cagr is not None else pd.Series(dtype=float)
+        
+        print("\nReturn Consistency:")
+        if len(rolling_cagr_clean) > 0:
+            print(f"  Current 1Y CAGR:       {rolling_cagr_clean.iloc[-1]:>10.2%}")
+            print(f"  Rolling CAGR Std Dev:  {rolling_cagr_clean.std():>10.2%}")
         else:
-            print(f"\nReturn Consistency:")
-            print(f"  Insufficient data for rolling CAGR (need 252 days, have {n_days})")
+            print(f"  Insufficient data for rolling CAGR (need {self.periods_per_year:.0f} bars, have {n_days})")
         
         print("\nWin Rate:")
         print(f"  Portfolio:             {win_rate:>10.1%}")
-        print(f"  Benchmark:             {benchmark_win_rate:>10.1%}")
+        if benchmark_win_rate is not None:
+            print(f"  Benchmark:             {benchmark_win_rate:>10.1%}")
         
         print("\nAverage Gain vs Loss:")
         print(f"  Avg Daily Gain:        {gain_loss['avg_gain']:>10.2%}")
         print(f"  Avg Daily Loss:        {gain_loss['avg_loss']:>10.2%}")
         print(f"  Gain/Loss Ratio:       {gain_loss['gain_loss_ratio']:>10.2f}x")
         
-        print(f"\n  Benchmark Gain:        {benchmark_gain_loss['avg_gain']:>10.2%}")
-        print(f"  Benchmark Loss:        {benchmark_gain_loss['avg_loss']:>10.2%}")
-        print(f"  Benchmark Ratio:       {benchmark_gain_loss['gain_loss_ratio']:>10.2f}x")
+        if benchmark_gain_loss is not None:
+            print(f"\n  Benchmark Gain:        {benchmark_gain_loss['avg_gain']:>10.2%}")
+            print(f"  Benchmark Loss:        {benchmark_gain_loss['avg_loss']:>10.2%}")
+            print(f"  Benchmark Ratio:       {benchmark_gain_loss['gain_loss_ratio']:>10.2f}x")
+        
+        
+        print("=" * 60)
+
+    def display_drawdown_analysis(self, top_n=5):
+        
+        print("\n" + "=" * 60)
+        print("DRAWDOWN EPISODES")
+        print("=" * 60)
         
+        report = self.drawdown_report
+        episodes = report['episodes']
+        worst = episodes[episodes['portfolio'] == 'Portfolio'].nsmallest(top_n, 'depth')
         
+        print(f"\n  {'Peak':<12} {'Trough':<12} {'Recovery':<12} {'Depth':>8} {'Days':>6}")
+        print("-" * 60)
+        for _, episode in worst.iterrows():
+            recovery = episode['recovery_date']
+            recovery = recovery.strftime('%Y-%m-%d') if pd.notna(recovery) else 'ongoing'
+            print(f"  {episode['peak_date']:%Y-%m-%d}   {episode['trough_date']:%Y-%m-%d}   "
+                  f"{recovery:<12} {episode['depth']:>8.2%} {episode['duration']:>6}")
+        
+        print(f"\n  Ulcer Index:           {report['ulcer_index']['Portfolio']:>10.2%}")
+        print(f"  Pain Index:            {report['pain_index']['Portfolio']:>10.2%}")
         print("=" * 60)
+        return report
 
-    def analyze(self, period='1y', risk_free_rate=0.065):
+    def display_attribution(self, classification, benchmark_weights=None, level='Sector', frequency=None):
+        
+        report = self.attribution(classification, benchmark_weights, level, frequency)
+        groups = report['groups']
+        
+        print("\n" + "=" * 60)
+        print(f"{level.upper()} ATTRIBUTION")
+        print("=" * 60)
+        
+        if report['benchmark_return'] is None:
+            print(f"\n  {level:<20} {'Weight':>8} {'Return':>10} {'Contrib':>10}")
+            print("-" * 60)
+            for group, row in groups.iterrows():
+                print(f"  {group[:20]:<20} {row['portfolio_weight']:>8.1%} "
+                      f"{row['portfolio_return']:>10.2%} {row['contribution']:>10.2%}")
+        else:
+            print(f"\n  {level:<14} {'Wt':>6} {'BmWt':>6} {'Alloc':>8} {'Select':>8} {'Inter':>8} {'Active':>8}")
+            print("-" * 60)
+            for group, row in groups.iterrows():
+                print(f"  {group[:14]:<14} {row['portfolio_weight']:>6.1%} {row['benchmark_weight']:>6.1%} "
+                      f"{row['allocation']:>8.2%} {row['selection']:>8.2%} "
+                      f"{row['interaction']:>8.2%} {row['active']:>8.2%}")
+            print("-" * 60)
+            print(f"  Portfolio Return:        {report['portfolio_return']:>10.2%}")
+            print(f"  Benchmark (constituents):{report['benchmark_return']:>10.2%}")
+            print(f"  Active Return:           {report['active_return']:>10.2%}")
+            if report['missing']:
+                print(f"\n  ⚠ No data for {len(report['missing'])} constituent(s): "
+                      f"{', '.join(report['missing'][:5])}{'...' if len(report['missing']) > 5 else ''}")
+        
+        print("=" * 60)
+        return report
+    
+    
+    def display_confidence_intervals(self, n_resamples=None, method=None, confidence=None):
+        
+        if n_resamples is None and method is None and confidence is None:
+            table = self.confidence_intervals
+            confidence = 0.95
+        else:
+            from bootstrap import bootstrap_confidence_intervals
+            returns = self.comparison_returns
+            confidence = confidence or 0.95
+            table = bootstrap_confidence_intervals(
+                returns['Portfolio'].dropna(),
+                returns['Market'] if 'Market' in returns else None,
+                self.risk_free_rate,
+                self.periods_per_year,
+                n_resamples=n_resamples or 10000,
+                method=method or 'stationary',
+                confidence=confidence,
+                seed=0
+            )
+        
+        print("\n" + "=" * 60)
+        print(f"METRIC UNCERTAINTY ({confidence:.0%} BOOTSTRAP INTERVALS)")
+        print("=" * 60)
+        
+        labels = {
+            'annual_return': 'Annual Return',
+            'volatility': 'Volatility',
+            'sharpe_ratio': 'Sharpe Ratio',
+            'sortino_ratio': 'Sortino Ratio',
+            'max_drawdown': 'Max Drawdown',
+            'information_ratio': 'Information Ratio',
+            'beta': 'Beta'
+        }
+        percent = {'annual_return', 'volatility', 'max_drawdown'}
+        
+        print(f"\n  {'Metric':<20} {'Estimate':>10} {'Lower':>10} {'Upper':>10}")
+        print("-" * 60)
+        for metric, row in table.dropna(subset=['estimate']).iterrows():
+            fmt = '.2%' if metric in percent else '.3f'
+            print(f"  {labels[metric]:<20} {row['estimate']:>10{fmt}} "
+                  f"{row['lower']:>10{fmt}} {row['upper']:>10{fmt}}")
+        
+        print("=" * 60)
+    
+    
+    def display_stress_test(self, scenarios=None, shocks=None, classification=None, level='Sector', loader=None):
+        
+        table = self.stress_test(scenarios, shocks, classification, level, loader)
+        
+        print("\n" + "=" * 60)
+        print("STRESS TESTS")
+        print("=" * 60)
+        
+        print(f"\n  {'Scenario':<24} {'Portfolio':>10} {'Market':>9} {'MaxDD':>8} {'Cover':>6}")
+        print("-" * 60)
+        for scenario, row in table.iterrows():
+            if row['kind'] == 'historical' and row['bars'] == 0:
+                print(f"  {scenario[:24]:<24} {'no data for this window':>35}")
+                continue
+            print(f"  {scenario[:24]:<24} {row['portfolio_return']:>10.2%} {row['benchmark_return']:>9.2%} "
+                  f"{row['max_drawdown']:>8.2%} {row['coverage']:>6.0%}")
+        
+        print("\n  Historical windows replay daily prices; holdings without history follow")
+        print("  their beta to the benchmark (Cover = share backed by real prices).")
+        print("=" * 60)
+        return table
+    
+    
+    def display_calendar_returns(self):
+        
+        from calendar_returns import excess_returns
+        
+        print("\n" + "=" * 60)
+        print("CALENDAR YEAR RETURNS")
+        print("=" * 60)
+        
+        periods = self.calendar_returns
+        yearly = periods['year']
+        excess = excess_returns(periods).get('year')
+        
+        if excess is None:
+            print(f"\n  {'Year':<8} {'Portfolio':>12}")
+            print("-" * 60)
+            for year, value in yearly['Portfolio'].items():
+                print(f"  {year.year:<8} {value:>12.2%}")
+        else:
+            print(f"\n  {'Year':<8} {'Portfolio':>12} {'Market':>12} {'Excess':>12}")
+            print("-" * 60)
+            for year, row in yearly.iterrows():
+                print(f"  {year.year:<8} {row['Portfolio']:>12.2%} {row['Market']:>12.2%} "
+                      f"{excess.loc[year, 'Portfolio']:>12.2%}")
+        
+        monthly = periods['month']['Portfolio'].dropna()
+        print(f"\n  Best Month:            {monthly.max():>10.2%}  ({monthly.idxmax()})")
+        print(f"  Worst Month:           {monthly.min():>10.2%}  ({monthly.idxmin()})")
+        print(f"  Positive Months:       {(monthly > 0).mean():>10.1%}")
+        print("=" * 60)
+        return periods
+    
+    
+    def display_tail_risk(self, confidence_levels=None, horizons=None):
+        
+        print("\n" + "=" * 60)
+        print("TAIL RISK (VaR / EXPECTED SHORTFALL)")
+        print("=" * 60)
+        
+        if confidence_levels is None and horizons is None:
+            table = self.tail_risk.xs('Portfolio', axis=1).unstack('measure')
+        else:
+            from tail_risk import calculate_tail_risk_table
+            table = calculate_tail_risk_table(
+                self.portfolio_returns,
+                confidence_levels or (0.95, 0.99),
+                horizons or (1, 10)
+            )
+        
+        print(f"\n  {'Method':<16} {'Conf':>6} {'Days':>5} {'VaR':>10} {'ES':>10}")
+        print("-" * 60)
+        for (method, confidence, horizon), row in table.iterrows():
+            print(f"  {method:<16} {confidence:>6.0%} {horizon:>5} "
+                  f"{row['var']:>10.2%} {row['cvar']:>10.2%}")
+        
+        print("=" * 60)
+        return table
+
+    def analyze(self, period='1y', risk_free_rate=0.065, start_date=None, end_date=None, interval='1d'):
         
         # Download data
-        self.download_data(period=period)
+        self.download_data(period=period, start_date=start_date, end_date=end_date, interval=interval)
         
         # Validate data quality
         self._validate_stock_data()
@@ -440,6 +987,18 @@ class Portfolio:
 
         print()
         self.display_behaviour_analysis()
+
+        print()
+        self.display_calendar_returns()
+
+        print()
+        self.display_drawdown_analysis()
+
+        print()
+        self.display_tail_risk()
+
+        print()
+        self.display_confidence_intervals()
         return metrics
 
 
@@ -0,0 +1,346 @@
+"""
+Process-wide shared price store.
+
+When several analysts use the dashboard at once, every session downloads
+the same NIFTY names independently. A PriceStore sits in front of the
+downloader and is shared by all sessions (the dashboard holds one through
+st.cache_resource):
+
+    persistent   bars are kept in a local SQLite database, so they survive
+                 restarts and are shared by every process on the machine
+    coalescing   concurrent requests for the same ticker and interval wait
+                 on one in-flight fetch instead of each starting their own
+    freshness    each ticker has a maximum age (configurable per ticker
+                 pattern, e.g. indices every 15 minutes, stocks twice a day);
+                 within it, requests covered by stored data never reach the
+                 network; a stale or partial span downloads only the
+                 missing head or tail, never the history already stored
+
+get() has the same signature and return shape as
+data_loader.download_stock_data, so it can be passed anywhere a loader is
+accepted.
+"""
+
+import fnmatch
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+
+import pandas as pd
+
+DEFAULT_STORE_PATH = os.path.join('data', 'price_store.sqlite')
+DEFAULT_MAX_AGE = timedelta(hours=12)
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, adj_close REAL, volume REAL,
+    PRIMARY KEY (ticker, interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER,
+    fetched_at REAL NOT NULL,
+    tz TEXT,
+    PRIMARY KEY (ticker, interval)
+);
+"""
+
+
+def _period_start(period, now):
+    from sweep import PERIOD_OFFSETS
+
+    if period not in PERIOD_OFFSETS:
+        raise ValueError(f"Unsupported period '{period}' for the price store")
+    return (now - PERIOD_OFFSETS[period]).normalize()
+
+
+def _to_ns(timestamp):
+    timestamp = pd.Timestamp(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.tz_convert('UTC').tz_localize(None)
+    return int(timestamp.value)
+
+
+def _fetch_day_ns(fetched_at):
+    """Start of the (UTC) day an open span was fetched: bars before it were complete."""
+    return _to_ns(pd.Timestamp(fetched_at, unit='s').normalize())
+
+
+def _flatten(df):
+    """Single-ticker yfinance frame with plain column names."""
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.droplevel(1, axis=1) if df.columns.nlevels > 1 else df
+    return df
+
+
+class PriceStore:
+    """
+    Thread-safe, coalescing, SQLite-backed cache in front of a price downloader.
+
+    Args:
+        path: SQLite database file
+        refresh_policy: Dictionary of ticker pattern (fnmatch, e.g. '^*' for
+            indices or '*.NS') -> maximum age (timedelta or seconds). The
+            first matching pattern wins
+        default_max_age: Maximum age for tickers matching no pattern
+        loader: Downloader with download_stock_data's signature (default:
+            data_loader.download_stock_data)
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, refresh_policy=None, default_max_age=DEFAULT_MAX_AGE,
+                 loader=None):
+        self.path = path
+        self.refresh_policy = dict(refresh_policy or {})
+        self.default_max_age = default_max_age
+        self.loader = loader
+
+        self._local = threading.local()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.stats = {'hits': 0, 'fetches': 0, 'coalesced': 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._write_lock:
+            self._connection().executescript(_SCHEMA)
+
+    def _connection(self):
+        """One SQLite connection per thread (connections are not thread-safe)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def max_age(self, ticker):
+        """Refresh interval for a ticker under the configured policy."""
+        for pattern, age in self.refresh_policy.items():
+            if fnmatch.fnmatchcase(ticker, pattern):
+                return age if isinstance(age, timedelta) else timedelta(seconds=age)
+        return self.default_max_age
+
+    def _coverage(self, ticker, interval):
+        row = self._connection().execute(
+            'SELECT start_ts, end_ts, fetched_at, tz FROM coverage WHERE ticker = ? AND interval = ?',
+            (ticker, interval)
+        ).fetchone()
+        return row
+
+    def _is_covered(self, ticker, interval, start_ns, end_ns):
+        row = self._coverage(ticker, interval)
+        if row is None:
+            return False
+        stored_start, stored_end, fetched_at, _ = row
+        if stored_start > start_ns:
+            return False
+        if stored_end is not None:
+            # A closed historical range does not go stale, but says nothing past its end
+            return end_ns is not None and end_ns <= stored_end
+        if end_ns is not None and end_ns <= _fetch_day_ns(fetched_at):
+            # History that was already complete when the open span was last fetched
+            return True
+        return time.time() - fetched_at <= self.max_age(ticker).total_seconds()
+
+    def _last_bar(self, ticker, interval):
+        return self._connection().execute(
+            'SELECT MAX(ts) FROM bars WHERE ticker = ? AND interval = ?', (ticker, interval)
+        ).fetchone()[0]
+
+    def _fetch_plan(self, ticker, interval, start, end):
+        """
+        Ranges to download, and the coverage record once they are stored.
+
+        Coverage is a single contiguous span per ticker, so only the missing
+        head (before the stored start) and tail (since the last stored bar's
+        day) are fetched; stored history is never downloaded again. Intraday
+        sources only serve recent windows, so intraday requests replace the
+        span instead. A span whose end has not passed yet is recorded as
+        open, so today's partial bar goes stale like any other open span.
+
+        Returns:
+            Tuple (segments, coverage): list of (role, start, end) ranges
+            with role 'full', 'head' or 'tail' (end None = up to now), and
+            (start, end, fetched_at) to record once every segment is stored
+        """
+        from frequency import is_intraday
+
+        if end is not None and _to_ns(end) >= _fetch_day_ns(time.time()):
+            end = None
+        row = self._coverage(ticker, interval)
+        if row is None or is_intraday(interval):
+            return [('full', start, end)], (start, end, None)
+
+        stored_start, stored_end, fetched_at, _ = row
+        segments = []
+        if _to_ns(start) < stored_start:
+            segments.append(('head', start, pd.Timestamp(stored_start)))
+        else:
+            start = pd.Timestamp(stored_start)
+
+        end_ns = _to_ns(end) if end is not None else None
+        if stored_end is not None:
+            wanted = end_ns is None or end_ns > stored_end
+        else:
+            stale = time.time() - fetched_at > self.max_age(ticker).total_seconds()
+            wanted = stale and (end_ns is None or end_ns > _fetch_day_ns(fetched_at))
+
+        if not wanted:
+            return segments, (start, pd.Timestamp(stored_end) if stored_end is not None else None, fetched_at)
+        # Re-read the last stored day: it may have been fetched mid-session, and
+        # the tail is never empty for a ticker that still trades
+        last_bar = self._last_bar(ticker, interval)
+        tail_from = pd.Timestamp(last_bar).normalize() if last_bar is not None else pd.Timestamp(stored_end)
+        segments.append(('tail', tail_from, end))
+        return segments, (start, end, None)
+
+    def _download(self, ticker, interval, start, end):
+        loader = self.loader
+        if loader is None:
+            from data_loader import download_stock_data as loader
+
+        end_date = end if end is not None else pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+        df = _flatten(loader(ticker, start_date=start.strftime('%Y-%m-%d'),
+                             end_date=pd.Timestamp(end_date).strftime('%Y-%m-%d'), interval=interval))
+        self.stats['fetches'] += 1
+        return df
+
+    def _fetch(self, ticker, interval, start, end):
+        """
+        Download the planned segments and store whatever succeeded.
+
+        Coverage only grows over segments that were downloaded: a failed head
+        leaves the stored start, a failed tail leaves the stored end and its
+        fetch time (so the span stays stale). The first failure is raised
+        after the successful segments are stored. The one tolerated failure
+        is a head with no bars, i.e. a start before the ticker was listed.
+        """
+        from data_loader import NoDataError
+
+        row = self._coverage(ticker, interval)
+        segments, (span_start, span_end, fetched_at) = self._fetch_plan(ticker, interval, start, end)
+
+        frames, error = [], None
+        for role, segment_start, segment_end in segments:
+            try:
+                frames.append(self._download(ticker, interval, segment_start, segment_end))
+            except Exception as e:
+                if role == 'head' and isinstance(e, NoDataError):
+                    # No bars before the stored span: the start predates the listing
+                    continue
+                if role == 'full':
+                    raise
+                error = error or e
+                if role == 'head':
+                    span_start = pd.Timestamp(row[0])
+                else:
+                    span_end = pd.Timestamp(row[1]) if row[1] is not None else None
+                    fetched_at = row[2]
+        tz = row[3] if row is not None else None
+
+        rows = []
+        for df in frames:
+            index = pd.DatetimeIndex(df.index)
+            tz = str(index.tz) if index.tz is not None else tz
+            ts = (index.tz_convert('UTC').tz_localize(None) if index.tz is not None else index).as_unit('ns').asi8
+            columns = [df[c].to_numpy(dtype=float) if c in df.columns else [None] * len(df) for c in PRICE_COLUMNS]
+            rows += [(ticker, interval, int(t), *values) for t, *values in zip(ts, *columns)]
+
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows
+                )
+                connection.execute(
+                    'INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, ?, ?)',
+                    (ticker, interval, _to_ns(span_start), _to_ns(span_end) if span_end is not None else None,
+                     fetched_at if fetched_at is not None else time.time(), tz)
+                )
+        if error is not None:
+            raise error
+
+    def _read(self, ticker, interval, start_ns, end_ns):
+        query = ('SELECT ts, open, high, low, close, adj_close, volume FROM bars '
+                 'WHERE ticker = ? AND interval = ? AND ts >= ?')
+        params = [ticker, interval, start_ns]
+        if end_ns is not None:
+            query += ' AND ts < ?'
+            params.append(end_ns)
+        rows = self._connection().execute(query + ' ORDER BY ts', params).fetchall()
+
+        df = pd.DataFrame(rows, columns=['ts'] + PRICE_COLUMNS)
+        index = pd.DatetimeIndex(df.pop('ts').to_numpy().astype('datetime64[ns]'), name='Date')
+        tz = self._coverage(ticker, interval)[3]
+        if tz:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        df.index = index
+        return df.dropna(axis=1, how='all')
+
+    def get(self, ticker, start_date=None, end_date=None, period='1y', interval='1d'):
+        """
+        Bars for a ticker, from the store when fresh, otherwise fetched once.
+
+        Same arguments and result as data_loader.download_stock_data.
+        """
+        now = pd.Timestamp.now()
+        if start_date and end_date:
+            start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        else:
+            start, end = _period_start(period, now), None
+        start_ns, end_ns = _to_ns(start), (_to_ns(end) if end is not None else None)
+
+        key = (ticker, interval)
+        while not self._is_covered(ticker, interval, start_ns, end_ns):
+            with self._inflight_lock:
+                future = self._inflight.get(key)
+                owner = future is None
+                if owner:
+                    future = self._inflight[key] = Future()
+
+            if not owner:
+                # Someone is already fetching this ticker: wait, then re-check coverage
+                self.stats['coalesced'] += 1
+                future.result()
+                continue
+
+            try:
+                self._fetch(ticker, interval, start, end)
+                future.set_result(None)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            finally:
+                with self._inflight_lock:
+                    del self._inflight[key]
+            break
+        else:
+            self.stats['hits'] += 1
+
+        df = self._read(ticker, interval, start_ns, end_ns)
+        if df.empty:
+            raise ValueError(f"No data downloaded check ticker for {ticker}")
+        return df
+
+    def invalidate(self, ticker=None):
+        """Force the next request for `ticker` (or every ticker) to refetch."""
+        with self._write_lock:
+            connection = self._connection()
+            with connection:
+                if ticker is None:
+                    connection.execute('UPDATE coverage SET fetched_at = 0, end_ts = NULL')
+                else:
+                    connection.execute('UPDATE coverage SET fetched_at = 0, end_ts = NULL WHERE ticker = ?',
+                                       (ticker,))
@@ -15,16 +15,47 @@ def calculate_cumulative_returns(returns):
     #returns CR as a series
     return cumulative_returns 
 
-def calculate_cagr(prices):
+def calculate_cagr(prices,trading_days=252):
     start_val = prices.iloc[0].item()
     end_val = prices.iloc[-1].item()
-    years = len(prices)/252
+    years = len(prices)/trading_days
     cagr = (end_val/start_val)**(1/years) -1
     #returns as a float
     return cagr
 
-def annualized_returns(returns):
+def annualized_returns(returns,trading_days=252):
     total_growth = (1+returns).prod()
     n_days = returns.count()
-    ann_returns = total_growth ** (252/n_days)-1
-    return ann_returns
\ No newline at end of file
+    ann_returns = total_growth ** (trading_days/n_days)-1
+    return ann_returns
+
+
+def calculate_band_rebalanced_returns(stock_returns, weights, band=0.05):
+    """
+    Returns of a portfolio that drifts with prices and is rebalanced on a threshold.
+    
+    Weights start at their targets; whenever one drifts more than `band`
+    from its target at a close, all are reset (see kernels.band_rebalance).
+    band=0 matches fixed weights, np.inf is buy and hold.
+    
+    Args:
+        stock_returns: DataFrame of returns (dates x tickers)
+        weights: Target weights, one per column of stock_returns, or a
+            DataFrame (tickers x portfolios) for many portfolios at once
+        band: Absolute weight tolerance (0.05 = 5 percentage points)
+    
+    Returns:
+        (returns, rebalances): Series (DataFrame for several portfolios) of
+        returns, and the number of rebalances (Series for several)
+    """
+    from kernels import band_rebalance
+    
+    many = isinstance(weights, pd.DataFrame)
+    targets = weights.reindex(stock_returns.columns, fill_value=0.0) if many else \
+        pd.DataFrame({'portfolio': np.asarray(weights, dtype=float)}, index=stock_returns.columns)
+    returns, rebalances = band_rebalance(stock_returns.to_numpy(dtype=float), targets.to_numpy(dtype=float), band)
+    
+    if many:
+        return (pd.DataFrame(returns, index=stock_returns.index, columns=targets.columns),
+                pd.Series(rebalances, index=targets.columns))
+    return pd.Series(returns[:, 0], index=stock_returns.index), int(rebalances[0])
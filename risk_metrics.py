@@ -9,8 +9,8 @@ def calculate_volatility(returns,annualize=True,trading_days=252):
     return volatility
 
 def calculate_sharpe_ratio (returns,risk_free_rate = 0.065,trading_days=252):
-    annual_returns = annualized_returns(returns)
-    annual_volatility = calculate_volatility(returns,annualize=True)
+    annual_returns = annualized_returns(returns,trading_days)
+    annual_volatility = calculate_volatility(returns,annualize=True,trading_days=trading_days)
     excess_return = annual_returns - risk_free_rate
     sharpe_ratio = excess_return/annual_volatility
     return sharpe_ratio
@@ -26,40 +26,38 @@ def calculate_max_drawdown(returns):
 
 def calculate_downside_deviation(returns,annualize=True,trading_days=252):
     negative_returns = returns[returns<0].dropna()
-    negative_volatility = calculate_volatility(negative_returns,annualize=annualize)
+    negative_volatility = calculate_volatility(negative_returns,annualize=annualize,trading_days=trading_days)
     return negative_volatility
 
 
 def calculate_sortino_ratio(returns,risk_free_rate = 0.065,trading_days=252):
-    annual_returns = annualized_returns(returns)
+    annual_returns = annualized_returns(returns,trading_days)
     excess_return = annual_returns-risk_free_rate
-    downside_deviation = calculate_downside_deviation(returns)
+    downside_deviation = calculate_downside_deviation(returns,trading_days=trading_days)
     sortino_ratio = excess_return/downside_deviation
     return sortino_ratio
 
 
 
-def calculate_rolling_cagr(returns, window=252):
+def calculate_rolling_cagr(returns, window=252, trading_days=252):
     """
     Calculate rolling CAGR over a specified window.
     
+    The trailing products come from kernels.rolling_growth (numba-compiled
+    when available) instead of a Python call per window.
+    
     Args:
         returns: Series of daily returns
-        window: Rolling window size in days (default 252 = 1 year)
+        window: Rolling window size in bars (default 252 = 1 year of days)
+        trading_days: Bars per year used to annualize (default 252)
         
     Returns:
         Series of rolling CAGR values
     """
-    def cagr_for_window(window_returns):
-        total_growth = (1 + window_returns).prod()
-        n_days = len(window_returns)
-        if n_days == 0:
-            return np.nan
-        cagr = total_growth ** (252 / n_days) - 1
-        return cagr
+    from kernels import rolling_growth
     
-    rolling_cagr = returns.rolling(window=window).apply(cagr_for_window, raw=False)
-    return rolling_cagr
+    growth = rolling_growth(returns.to_numpy(dtype=float)[:, None], window)[:, 0]
+    return pd.Series(growth ** (trading_days / window) - 1, index=returns.index, name=returns.name)
 
 
 def calculate_win_rate(returns):
@@ -0,0 +1,353 @@
+"""
+Historical and hypothetical stress tests.
+
+Answers "what would this allocation have done in the 2008 crash or the
+March 2020 sell-off" for the current weights:
+
+    historical     named windows replayed from long daily history (through
+                   the shared price store). A holding that was not listed
+                   yet, or has no bar on a day, moves with its beta times
+                   the benchmark that day; 'coverage' is the share of
+                   weight x days backed by real prices
+    hypothetical   instant shocks: a benchmark move propagated to every
+                   holding through its beta, plus optional sector moves
+                   added to the members of each shocked sector
+
+Betas come from the analysed window (the aligned stock and benchmark
+returns), so they describe the stocks as they are today.
+
+Portfolios are the columns of a weight matrix W (tickers x portfolios, as
+in comparison.weight_matrix). Historical paths are one product R @ W over
+the whole history; every window's return and drawdown is then read off
+the cumulative log path at once. Hypothetical shocks are a
+(shocks x tickers) matrix times W. One portfolio or many cost the same
+number of passes.
+
+Shock definitions:
+
+    {'market': -0.20}                                   benchmark -20%
+    {'market': -0.10, 'sectors': {'IT': -0.15}}         plus IT names -15%
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Name -> (first day, last day) of the window, roughly peak to trough of the NIFTY 50
+HISTORICAL_SCENARIOS = {
+    'Global Financial Crisis': ('2008-01-08', '2009-03-09'),
+    'Lehman Collapse': ('2008-09-12', '2008-10-27'),
+    'Euro Debt Crisis': ('2011-07-25', '2011-12-20'),
+    'Taper Tantrum': ('2013-05-22', '2013-08-28'),
+    'China Devaluation': ('2015-08-10', '2015-09-07'),
+    'Demonetisation': ('2016-11-08', '2016-12-26'),
+    'COVID-19 Crash': ('2020-02-19', '2020-03-23'),
+    '2022 Rate Hikes': ('2022-01-17', '2022-06-17'),
+}
+
+HYPOTHETICAL_SHOCKS = {
+    'Market -10%': {'market': -0.10},
+    'Market -20%': {'market': -0.20},
+    'Market -30%': {'market': -0.30},
+}
+
+SCENARIO_COLUMNS = [
+    'kind', 'start', 'end', 'bars', 'portfolio_return', 'benchmark_return', 'relative_return',
+    'max_drawdown', 'coverage'
+]
+
+
+def stock_betas(stock_returns, benchmark_returns):
+    """
+    Beta of every column against the benchmark, column-wise.
+
+    Args:
+        stock_returns: DataFrame of returns (dates x tickers)
+        benchmark_returns: Series of benchmark returns on the same dates
+
+    Returns:
+        Series ticker -> beta
+    """
+    r = stock_returns.to_numpy(dtype=float)
+    b = benchmark_returns.reindex(stock_returns.index).to_numpy(dtype=float)
+    r_centered = r - r.mean(axis=0)
+    b_centered = b - b.mean()
+    beta = (r_centered * b_centered[:, None]).sum(axis=0) / (b_centered ** 2).sum()
+    return pd.Series(beta, index=stock_returns.columns)
+
+
+def _naive(index):
+    # Scenario dates are calendar days; compare them without a timezone
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+
+def load_history(tickers, benchmark, scenarios=None, loader=None):
+    """
+    Daily returns covering every scenario window, on the benchmark's calendar.
+
+    Args:
+        tickers: Holdings
+        benchmark: Benchmark ticker
+        scenarios: Dictionary name -> (start, end) (default: HISTORICAL_SCENARIOS)
+        loader: Callable with download_stock_data's signature (default: a
+            PriceStore, so a second stress test reads the local cache)
+
+    Returns:
+        (stock_returns, benchmark_returns): DataFrame (dates x tickers), NaN
+        before a ticker's first price and for tickers without data, and the
+        benchmark Series
+    """
+    scenarios = HISTORICAL_SCENARIOS if scenarios is None else scenarios
+    if loader is None:
+        from price_store import PriceStore
+        loader = PriceStore().get
+
+    # A few days before the first window so its first bar has a previous close
+    start = min(pd.Timestamp(s) for s, _ in scenarios.values()) - pd.Timedelta(days=10)
+    end = max(pd.Timestamp(e) for _, e in scenarios.values()) + pd.Timedelta(days=1)
+
+    def closes(ticker):
+        df = loader(ticker, start_date=start.strftime('%Y-%m-%d'), end_date=end.strftime('%Y-%m-%d'),
+                    interval='1d')
+        close = df['Close']
+        close = close.squeeze(axis=1) if isinstance(close, pd.DataFrame) else close
+        close.index = _naive(close.index)
+        return close[~close.index.duplicated(keep='last')]
+
+    benchmark_prices = closes(benchmark).dropna()
+    index = benchmark_prices.index
+
+    prices = {}
+    for ticker in tickers:
+        try:
+            prices[ticker] = closes(ticker)
+        except Exception as e:
+            print(f"⚠ No history for {ticker} ({e}); it follows its beta in every window")
+
+    # Gaps carry the last close, so a move across a missing bar lands on the next one
+    frame = pd.DataFrame(prices, columns=list(tickers)).reindex(index).ffill()
+    stock_returns = frame.pct_change(fill_method=None).iloc[1:]
+    benchmark_returns = benchmark_prices.pct_change().iloc[1:]
+    return stock_returns, benchmark_returns
+
+
+def historical_impact(stock_returns, benchmark_returns, weights, betas, scenarios=None):
+    """
+    Return and drawdown of every portfolio over every historical window.
+
+    Args:
+        stock_returns: DataFrame of daily returns (dates x tickers), NaN
+            where a ticker has no price (see load_history)
+        benchmark_returns: Series of benchmark returns on the same dates
+        weights: DataFrame (tickers x portfolios)
+        betas: Series ticker -> beta, used for missing returns
+        scenarios: Dictionary name -> (start, end) (default: HISTORICAL_SCENARIOS)
+
+    Returns:
+        DataFrame indexed by (scenario, portfolio) with SCENARIO_COLUMNS;
+        windows outside the history have NaN results and 0 bars
+    """
+    scenarios = HISTORICAL_SCENARIOS if scenarios is None else scenarios
+    tickers = list(weights.index)
+    r = stock_returns.reindex(columns=tickers).to_numpy(dtype=float)
+    b = benchmark_returns.reindex(stock_returns.index).to_numpy(dtype=float)
+    w = weights.to_numpy(dtype=float)
+    beta = betas.reindex(tickers).fillna(1.0).to_numpy(dtype=float)
+
+    present = ~np.isnan(r)
+    filled = np.where(present, r, beta[None, :] * b[:, None])
+
+    # Cumulative log paths with a leading zero: path[k] covers the first k bars
+    zero = np.zeros((1, w.shape[1]))
+    path = np.vstack([zero, np.cumsum(np.log1p(filled @ w), axis=0)])
+    benchmark_path = np.concatenate([[0.0], np.cumsum(np.log1p(b))])
+    present_days = np.vstack([np.zeros((1, len(tickers))), np.cumsum(present, axis=0)])
+
+    dates = _naive(stock_returns.index)
+    names = list(scenarios)
+    starts = dates.searchsorted([pd.Timestamp(scenarios[n][0]) for n in names])
+    ends = dates.searchsorted([pd.Timestamp(scenarios[n][1]) for n in names], side='right')
+    bars = np.maximum(ends - starts, 0)
+    ends = np.maximum(ends, starts)
+
+    portfolio_return = np.expm1(path[ends] - path[starts])
+    benchmark_return = np.expm1(benchmark_path[ends] - benchmark_path[starts])
+
+    # Windows side by side, each padded with its own last bar (no new peaks or troughs)
+    longest = max(int(bars.max()), 1)
+    steps = np.minimum(starts[:, None] + 1 + np.arange(longest), np.maximum(ends, starts + 1)[:, None])
+    steps = np.minimum(steps, len(path) - 1)
+    window = path[steps] - path[starts][:, None, :]
+    peak = np.maximum(np.maximum.accumulate(window, axis=1), 0.0)
+    max_drawdown = np.expm1((window - peak).min(axis=1))
+
+    # Share of weight x days with a real price
+    with np.errstate(invalid='ignore', divide='ignore'):
+        present_share = (present_days[ends] - present_days[starts]) / bars[:, None]
+        coverage = present_share @ np.abs(w) / np.abs(w).sum(axis=0)
+
+    empty = bars == 0
+    for values in (portfolio_return, max_drawdown, coverage):
+        values[empty] = np.nan
+    benchmark_return[empty] = np.nan
+
+    n_portfolios = w.shape[1]
+    table = pd.DataFrame({
+        'kind': 'historical',
+        'start': np.repeat([pd.Timestamp(scenarios[n][0]) for n in names], n_portfolios),
+        'end': np.repeat([pd.Timestamp(scenarios[n][1]) for n in names], n_portfolios),
+        'bars': np.repeat(bars, n_portfolios),
+        'portfolio_return': portfolio_return.ravel(),
+        'benchmark_return': np.repeat(benchmark_return, n_portfolios),
+        'max_drawdown': max_drawdown.ravel(),
+        'coverage': coverage.ravel(),
+    }, index=pd.MultiIndex.from_product([names, list(weights.columns)], names=['scenario', 'portfolio']))
+    table['relative_return'] = table['portfolio_return'] - table['benchmark_return']
+    return table[SCENARIO_COLUMNS]
+
+
+def shock_matrix(tickers, betas, shocks, labels=None):
+    """
+    Instant return of every ticker under every hypothetical shock.
+
+    Args:
+        tickers: Ticker order of the result's columns
+        betas: Series ticker -> beta
+        shocks: Dictionary name -> {'market': move, 'sectors': {sector: move}}
+        labels: Series ticker -> sector (needed for sector shocks)
+
+    Returns:
+        DataFrame (shocks x tickers), floored at -100%
+    """
+    beta = betas.reindex(tickers).fillna(1.0).to_numpy(dtype=float)
+    rows = []
+    for name, shock in shocks.items():
+        row = shock.get('market', 0.0) * beta
+        sectors = shock.get('sectors') or {}
+        if sectors:
+            if labels is None:
+                raise ValueError(f"Shock '{name}' moves sectors; pass a classification")
+            sector_of = labels.reindex(tickers).to_numpy()
+            for sector, move in sectors.items():
+                row = row + np.where(sector_of == sector, move, 0.0)
+        rows.append(np.maximum(row, -1.0))
+    return pd.DataFrame(rows, index=list(shocks), columns=list(tickers))
+
+
+def hypothetical_impact(weights, betas, shocks=None, labels=None):
+    """
+    Instant impact of hypothetical shocks on every portfolio.
+
+    Args:
+        weights: DataFrame (tickers x portfolios)
+        betas: Series ticker -> beta
+        shocks: Dictionary name -> shock definition (default: HYPOTHETICAL_SHOCKS)
+        labels: Series ticker -> sector (needed for sector shocks)
+
+    Returns:
+        DataFrame indexed by (scenario, portfolio) with SCENARIO_COLUMNS
+    """
+    shocks = HYPOTHETICAL_SHOCKS if shocks is None else shocks
+    moves = shock_matrix(list(weights.index), betas, shocks, labels)
+    impact = moves.to_numpy() @ weights.to_numpy(dtype=float)
+
+    n_portfolios = weights.shape[1]
+    market = np.array([shock.get('market', 0.0) for shock in shocks.values()], dtype=float)
+    table = pd.DataFrame({
+        'kind': 'hypothetical',
+        'start': pd.NaT,
+        'end': pd.NaT,
+        'bars': 0,
+        'portfolio_return': impact.ravel(),
+        'benchmark_return': np.repeat(market, n_portfolios),
+        'max_drawdown': np.minimum(impact, 0.0).ravel(),
+        'coverage': 1.0,
+    }, index=pd.MultiIndex.from_product([list(shocks), list(weights.columns)], names=['scenario', 'portfolio']))
+    table['relative_return'] = table['portfolio_return'] - table['benchmark_return']
+    return table[SCENARIO_COLUMNS]
+
+
+def stress_test(source, definitions=None, scenarios=None, shocks=None, classification=None, level='Sector',
+                loader=None):
+    """
+    Historical and hypothetical scenarios for one or many portfolios.
+
+    Args:
+        source: Portfolio with data loaded and a benchmark; its aligned
+            returns give the betas, so it must hold every ticker of
+            `definitions` (see comparison.shared_portfolio)
+        definitions: Dictionary name -> (tickers, weights) (default: the
+            source portfolio itself, named 'Portfolio')
+        scenarios: Historical windows (default: HISTORICAL_SCENARIOS; {} to skip)
+        shocks: Hypothetical shocks (default: HYPOTHETICAL_SHOCKS; {} to skip)
+        classification: DataFrame from attribution.load_classification or a
+            CSV path (needed for sector shocks)
+        level: Classification column sector shocks refer to
+        loader: Downloader for the long history (default: a PriceStore)
+
+    Returns:
+        DataFrame indexed by (scenario, portfolio) with SCENARIO_COLUMNS
+    """
+    from comparison import weight_matrix
+
+    if source.benchmark_returns is None:
+        raise ValueError("Stress tests need benchmark data (betas and history are measured against it)")
+    if definitions is None:
+        definitions = {'Portfolio': (list(source.tickers), list(source.weights))}
+
+    stock_returns = source.stock_returns_df
+    weights = weight_matrix(definitions)
+    missing = [t for t in weights.index if t not in stock_returns.columns]
+    if missing:
+        raise KeyError(f"No aligned data for: {', '.join(missing)}")
+    betas = stock_betas(stock_returns[list(weights.index)], source.benchmark_returns)
+
+    scenarios = HISTORICAL_SCENARIOS if scenarios is None else scenarios
+    shocks = HYPOTHETICAL_SHOCKS if shocks is None else shocks
+
+    tables = []
+    if scenarios:
+        history, benchmark_history = load_history(list(weights.index), source.benchmark_ticker, scenarios, loader)
+        tables.append(historical_impact(history, benchmark_history, weights, betas, scenarios))
+    if shocks:
+        labels = None
+        if classification is not None:
+            from attribution import group_labels, load_classification
+            if not isinstance(classification, pd.DataFrame):
+                classification = load_classification(classification)
+            labels = group_labels(weights.index, classification, level)
+        tables.append(hypothetical_impact(weights, betas, shocks, labels))
+
+    if not tables:
+        raise ValueError("No scenarios or shocks to evaluate")
+    return pd.concat(tables)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress-test a portfolio against historical and hypothetical scenarios.")
+    parser.add_argument('portfolio', help="Portfolio CSV (Ticker, Amount)")
+    parser.add_argument('--benchmark', default='^NSEI')
+    parser.add_argument('--period', default='1y', help="Window the betas are estimated over")
+    parser.add_argument('--classification', help="Ticker,Sector CSV for sector shocks")
+    parser.add_argument('--market-shock', type=float, action='append',
+                        help="Extra benchmark shock, e.g. -0.25 (repeatable)")
+    args = parser.parse_args()
+
+    from portfolio import Portfolio
+
+    portfolio = Portfolio.from_csv(args.portfolio)
+    portfolio.benchmark_ticker = args.benchmark
+    portfolio.download_data(period=args.period)
+
+    shocks = dict(HYPOTHETICAL_SHOCKS)
+    for move in args.market_shock or []:
+        shocks[f"Market {move:+.0%}"] = {'market': move}
+
+    portfolio.display_stress_test(shocks=shocks, classification=args.classification)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""
+Dependency-aware nightly refresh of saved portfolios.
+
+Most nights most tickers get no new bar (holidays, suspended names, other
+exchanges' calendars), yet re-analyzing every saved portfolio redoes all of
+them. The scheduler models the refresh as a job graph:
+
+    ticker:X / benchmark:B  ->  portfolio:name  ->  report:summary
+                                                ->  export:dataset (optional)
+
+Ticker jobs refresh the price store and fingerprint the bars they got
+back; a ticker whose download fails is a failed job, and the portfolios
+that hold it are blocked (kept at their last snapshot and retried on the
+next run). A portfolio job recomputes (and re-snapshots) only if its input
+signature changed: its definition, the fingerprints of its tickers and
+benchmark, and the analysis settings. The summary report is rebuilt only
+when a portfolio changed. With a dataset directory, the same portfolios are
+also streamed one snapshot at a time into a single Parquet/Arrow dataset
+(analysis_export), rewritten only when a portfolio changed. Each
+portfolio's stress-test results (scenarios.py, history read through the
+same price store) go into its 'scenarios' table.
+
+Jobs run through a bounded thread pool in topological order (graphlib), so
+portfolios start as soon as their own tickers are done. Progress is saved
+to a JSON state file after every job; an interrupted run resumes where it
+stopped. Every job's latency is recorded and reported.
+
+Usage:
+    python scheduler.py portfolios/ --benchmark ^NSEI --workers 8 [--dataset exports/nightly]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from graphlib import TopologicalSorter
+
+import pandas as pd
+
+DEFAULT_STATE_PATH = os.path.join('data', 'refresh_state.json')
+DEFAULT_SNAPSHOT_DIR = 'snapshots'
+DEFAULT_REPORT_PATH = os.path.join('reports', 'portfolio_summary.csv')
+
+REPORT_JOB = 'report:summary'
+EXPORT_JOB = 'export:dataset'
+
+# Job statuses that are not recorded as done (retried when a run resumes)
+INCOMPLETE = ('failed', 'blocked', 'partial')
+
+
+def _digest(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def fingerprint_bars(df):
+    """Fingerprint of a price frame: changes whenever a bar is added or revised."""
+    close = df['Close']
+    if isinstance(close, pd.DataFrame):
+        close = close.squeeze(axis=1)
+    values = pd.util.hash_pandas_object(close, index=True).to_numpy()
+    return hashlib.sha1(values.tobytes()).hexdigest()
+
+
+class RefreshScheduler:
+    """
+    Nightly refresh of saved portfolios, recomputing only what changed.
+
+    Args:
+        definitions: Dictionary name -> (tickers, weights)
+        benchmark: Benchmark ticker used for every portfolio
+        period, interval: Analysis window and bar interval
+        risk_free_rate: Annual risk-free rate for the metrics
+        store: PriceStore to refresh and read from (default: a PriceStore
+            at its default path)
+        state_path: JSON file with fingerprints, input signatures and
+            run progress
+        snapshot_dir: Portfolio snapshots are written to snapshot_dir/<name>
+        report_path: CSV summary of every portfolio's metrics
+        max_workers: Size of the worker pool
+        dataset_path: Directory of a columnar dataset with every portfolio's
+            time series and metrics (optional; see analysis_export)
+        dataset_format: 'parquet' or 'arrow'
+        partition_by_portfolio: Hive-partition the dataset by portfolio
+        stress_test: Add a 'scenarios' table with each portfolio's
+            historical and hypothetical stress results to the dataset
+    """
+
+    def __init__(self, definitions, benchmark='^NSEI', period='1y', interval='1d', risk_free_rate=0.065,
+                 store=None, state_path=DEFAULT_STATE_PATH, snapshot_dir=DEFAULT_SNAPSHOT_DIR,
+                 report_path=DEFAULT_REPORT_PATH, max_workers=8, dataset_path=None, dataset_format='parquet',
+                 partition_by_portfolio=False, stress_test=True):
+        if store is None:
+            from price_store import PriceStore
+            store = PriceStore()
+
+        self.definitions = definitions
+        self.benchmark = benchmark
+        self.period = period
+        self.interval = interval
+        self.risk_free_rate = risk_free_rate
+        self.store = store
+        self.state_path = state_path
+        self.snapshot_dir = snapshot_dir
+        self.report_path = report_path
+        self.max_workers = max_workers
+        self.dataset_path = dataset_path
+        self.dataset_format = dataset_format
+        self.partition_by_portfolio = partition_by_portfolio
+        self.stress_test = stress_test
+
+        self._lock = threading.Lock()
+        self.state = self._load_state()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path) as f:
+                return json.load(f)
+        return {'fingerprints': {}, 'portfolio_inputs': {}, 'run': None}
+
+    def _save_state(self):
+        directory = os.path.dirname(self.state_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    # ------------------------------------------------------------------
+    # Graph
+    # ------------------------------------------------------------------
+
+    def build_graph(self):
+        """Job -> set of jobs it depends on."""
+        graph = {f'benchmark:{self.benchmark}': set(), REPORT_JOB: set()}
+        for name, (tickers, _) in self.definitions.items():
+            inputs = {f'ticker:{t}' for t in tickers} | {f'benchmark:{self.benchmark}'}
+            for job in inputs:
+                graph.setdefault(job, set())
+            graph[f'portfolio:{name}'] = inputs
+            graph[REPORT_JOB].add(f'portfolio:{name}')
+        if self.dataset_path:
+            graph[EXPORT_JOB] = {job for job in graph if job.startswith('portfolio:')}
+        return graph
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def _refresh_ticker(self, ticker):
+        # Bypass the freshness window: tonight's bar is exactly what we want.
+        # After invalidate() the store raises if the download fails rather than
+        # serving the stored bars, so a provider outage fails this job and
+        # blocks its portfolios instead of passing for an 'unchanged' night
+        self.store.invalidate(ticker)
+        df = self.store.get(ticker, period=self.period, interval=self.interval)
+        fingerprint = fingerprint_bars(df)
+
+        with self._lock:
+            changed = self.state['fingerprints'].get(ticker) != fingerprint
+            self.state['fingerprints'][ticker] = fingerprint
+        return 'changed' if changed else 'unchanged'
+
+    def _input_signature(self, name):
+        tickers, weights = self.definitions[name]
+        fingerprints = self.state['fingerprints']
+        return _digest({
+            'tickers': list(tickers),
+            'weights': [round(float(w), 10) for w in weights],
+            'benchmark': self.benchmark,
+            'fingerprints': [fingerprints.get(t) for t in list(tickers) + [self.benchmark]],
+            'period': self.period,
+            'interval': self.interval,
+            'risk_free_rate': self.risk_free_rate,
+        })
+
+    def _snapshot_path(self, name):
+        return os.path.join(self.snapshot_dir, name)
+
+    def _snapshot_readable(self, name):
+        """A complete snapshot in the current schema (older ones are recomputed)."""
+        from snapshot import read_snapshot_meta
+
+        try:
+            read_snapshot_meta(self._snapshot_path(name))
+        except (FileNotFoundError, ValueError):
+            return False
+        return True
+
+    def _run_portfolio(self, name):
+        from portfolio import Portfolio
+
+        with self._lock:
+            signature = self._input_signature(name)
+            unchanged = self.state['portfolio_inputs'].get(name) == signature
+        if unchanged and self._snapshot_readable(name):
+            return 'unchanged'
+
+        tickers, weights = self.definitions[name]
+        portfolio = Portfolio(tickers, weights)
+        portfolio.interval = self.interval
+        portfolio.risk_free_rate = self.risk_free_rate
+        portfolio.benchmark_ticker = self.benchmark
+        # Read back from the store: every input was refreshed by an upstream job
+        portfolio.stock_data = {
+            t: self.store.get(t, period=self.period, interval=self.interval) for t in tickers
+        }
+        portfolio.benchmark_data = self.store.get(self.benchmark, period=self.period, interval=self.interval)
+        portfolio.save_snapshot(self._snapshot_path(name))
+
+        with self._lock:
+            self.state['portfolio_inputs'][name] = signature
+        return 'recomputed'
+
+    def _build_report(self, changed_portfolios):
+        if not changed_portfolios and os.path.exists(self.report_path):
+            return 'unchanged'
+
+        from snapshot import read_snapshot_meta
+
+        rows = {}
+        for name in self.definitions:
+            try:
+                meta = read_snapshot_meta(self._snapshot_path(name))
+            except (FileNotFoundError, ValueError):
+                continue
+            row = dict(meta['metrics'] or {})
+            row.update(meta['market_metrics'] or {})
+            row.update({'start': meta['start'], 'end': meta['end']})
+            rows[name] = row
+
+        directory = os.path.dirname(self.report_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        pd.DataFrame.from_dict(rows, orient='index').rename_axis('portfolio').to_csv(self.report_path)
+        return 'recomputed'
+
+    def _snapshots(self):
+        """(name, Portfolio) restored from each complete snapshot, one at a time."""
+        from snapshot import load_snapshot
+
+        for name in self.definitions:
+            try:
+                portfolio = load_snapshot(self._snapshot_path(name))
+            except (FileNotFoundError, ValueError):
+                continue
+            yield name, portfolio
+
+    def _stress_tables(self, name, portfolio):
+        """Extra dataset tables for one portfolio: its stress-test results."""
+        try:
+            table = portfolio.stress_test(loader=self.store.get)
+        except Exception as e:
+            print(f"⚠ No stress results for {name}: {e}")
+            return None
+        return {'scenarios': table.reset_index()}
+
+    def _export_dataset(self, changed_portfolios):
+        if not changed_portfolios and os.path.exists(self.dataset_path):
+            return 'unchanged'
+
+        from analysis_export import write_analysis_dataset
+
+        # Write beside the old dataset and swap, so readers never see half of one
+        tmp_path = self.dataset_path.rstrip('/\\') + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        write_analysis_dataset(self._snapshots(), tmp_path, format=self.dataset_format,
+                               partition_by_portfolio=self.partition_by_portfolio,
+                               extra_tables=self._stress_tables if self.stress_test else None)
+        shutil.rmtree(self.dataset_path, ignore_errors=True)
+        os.replace(tmp_path, self.dataset_path)
+        return 'recomputed'
+
+    def _execute(self, job, failed_inputs, changed_portfolios):
+        kind, _, name = job.partition(':')
+        if kind in ('ticker', 'benchmark', 'portfolio') and failed_inputs:
+            return 'blocked'
+        if kind in ('ticker', 'benchmark'):
+            return self._refresh_ticker(name)
+        if kind == 'portfolio':
+            return self._run_portfolio(name)
+
+        # The summary (and dataset) is still written from the portfolios that
+        # did succeed, but stays pending so a resumed run rebuilds it
+        if kind == 'export':
+            status = self._export_dataset(changed_portfolios or failed_inputs)
+        else:
+            status = self._build_report(changed_portfolios or failed_inputs)
+        return 'partial' if failed_inputs else status
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def run(self, resume=True):
+        """
+        Run the refresh.
+
+        Args:
+            resume: Continue an interrupted run, skipping jobs it completed
+
+        Returns:
+            DataFrame indexed by job with 'status' and 'seconds'
+        """
+        run = self.state.get('run')
+        if not (resume and run and not run.get('finished')):
+            run = {'id': uuid.uuid4().hex[:12], 'started_at': time.time(), 'finished': False, 'jobs': {}}
+            self.state['run'] = run
+        else:
+            print(f"Resuming run {run['id']} ({len(run['jobs'])} jobs already done)")
+
+        graph = self.build_graph()
+        sorter = TopologicalSorter(graph)
+        sorter.prepare()
+
+        results = {}
+        changed_portfolios = set()
+        failed = set()
+
+        def record(job, status, seconds):
+            results[job] = {'status': status, 'seconds': seconds}
+            if status == 'recomputed' and job.startswith('portfolio:'):
+                changed_portfolios.add(job)
+            if status in INCOMPLETE:
+                # Not recorded as done, so a resumed run retries it
+                failed.add(job)
+            else:
+                with self._lock:
+                    run['jobs'][job] = results[job]
+                    self._save_state()
+
+        def timed(job, failed_inputs):
+            start = time.perf_counter()
+            try:
+                status = self._execute(job, failed_inputs, changed_portfolios)
+            except Exception as e:
+                print(f"✗ {job}: {e}")
+                status = 'failed'
+            return status, time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            running = {}
+            while sorter.is_active():
+                for job in sorter.get_ready():
+                    previous = run['jobs'].get(job)
+                    if previous is not None and previous['status'] not in INCOMPLETE:
+                        # Completed before the interruption
+                        results[job] = {'status': 'resumed', 'seconds': 0.0}
+                        if previous['status'] == 'recomputed' and job.startswith('portfolio:'):
+                            changed_portfolios.add(job)
+                        sorter.done(job)
+                        continue
+                    failed_inputs = graph[job] & failed
+                    running[pool.submit(timed, job, failed_inputs)] = job
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job = running.pop(future)
+                    status, seconds = future.result()
+                    record(job, status, seconds)
+                    sorter.done(job)
+
+        with self._lock:
+            run['finished'] = not failed
+            run['finished_at'] = time.time()
+            self._save_state()
+
+        report = pd.DataFrame.from_dict(results, orient='index').rename_axis('job')
+        return report.sort_index()
+
+
+def print_refresh_report(report):
+    """Per-job latency and status counts of a refresh run."""
+    print("\n" + "=" * 60)
+    print("NIGHTLY REFRESH")
+    print("=" * 60)
+
+    kinds = report.index.str.split(':').str[0]
+    for kind, jobs in report.groupby(kinds):
+        counts = ', '.join(f"{n} {status}" for status, n in jobs['status'].value_counts().items())
+        print(f"\n{kind:<10} {len(jobs):>5} jobs  ({counts})")
+        print(f"  Total: {jobs['seconds'].sum():>8.2f} s   "
+              f"p50: {jobs['seconds'].median() * 1000:>8.1f} ms   "
+              f"max: {jobs['seconds'].max() * 1000:>8.1f} ms")
+
+    slowest = report.nlargest(5, 'seconds')
+    print("\nSlowest jobs:")
+    print("-" * 60)
+    for job, row in slowest.iterrows():
+        print(f"  {job:<40} {row['status']:<12} {row['seconds'] * 1000:>8.1f} ms")
+
+    failed = report[report['status'].isin(INCOMPLETE)]
+    if len(failed):
+        print(f"\n✗ {len(failed)} jobs incomplete (failed, blocked or partial); re-run to resume")
+    else:
+        print("\n✓ Refresh complete")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh saved portfolios, recomputing only what changed.")
+    parser.add_argument('directory', help="Directory of portfolio CSV files (Ticker, Amount)")
+    parser.add_argument('--benchmark', default='^NSEI')
+    parser.add_argument('--period', default='1y')
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--risk-free-rate', type=float, default=0.065)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--no-resume', action='store_true', help="Start a fresh run")
+    parser.add_argument('--dataset', help="Also write every portfolio to a Parquet/Arrow dataset in this directory")
+    parser.add_argument('--dataset-format', choices=['parquet', 'arrow'], default='parquet')
+    parser.add_argument('--partition', action='store_true', help="Partition the dataset by portfolio")
+    parser.add_argument('--no-stress', action='store_true', help="Leave stress-test results out of the dataset")
+    args = parser.parse_args()
+
+    from comparison import definitions_from_csv
+
+    files = sorted(glob.glob(os.path.join(args.directory, '*.csv')))
+    if not files:
+        print(f"✗ No portfolio CSV files in {args.directory}")
+        return
+
+    scheduler = RefreshScheduler(
+        definitions_from_csv(files),
+        benchmark=args.benchmark,
+        period=args.period,
+        interval=args.interval,
+        risk_free_rate=args.risk_free_rate,
+        max_workers=args.workers,
+        dataset_path=args.dataset,
+        dataset_format=args.dataset_format,
+        partition_by_portfolio=args.partition,
+        stress_test=not args.no_stress
+    )
+    print_refresh_report(scheduler.run(resume=not args.no_resume))
+
+
+if __name__ == "__main__":
+    main()
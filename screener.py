@@ -0,0 +1,266 @@
+"""
+Universe-wide single-stock screener.
+
+Deciding what to add to a portfolio used to mean running a one-ticker
+Portfolio per candidate. The screener evaluates a whole universe (e.g. all
+NIFTY 500 names) at once: prices come through the shared price store (or
+any loader), and every metric is a column-wise operation on one
+(dates x tickers) returns matrix.
+
+Each ticker keeps its own history: listings, suspensions and gaps do not
+shorten anyone else's window. A stock's returns (and the benchmark
+returns it is compared with) are taken between its own consecutive
+trading dates within the benchmark calendar, which is what a one-ticker
+Portfolio computes with strict alignment, so the figures match it. The
+metrics themselves come from comparison.column_metrics with a per-column
+validity mask, the same formulas the comparison and bootstrap use.
+
+Usage:
+    python screener.py nifty500.csv --benchmark ^NSEI --period 1y --portfolio portfolio.csv --sort sharpe_ratio
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+SCREEN_COLUMNS = [
+    'annual_return', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown',
+    'beta', 'information_ratio', 'correlation_to_portfolio', 'observations', 'last_price'
+]
+DEFAULT_SCREEN_PATH = os.path.join('reports', 'screen.csv')
+
+
+def universe_from_csv(source):
+    """Tickers of a universe file ('Ticker' column, or the first column)."""
+    df = pd.read_csv(source)
+    column = 'Ticker' if 'Ticker' in df.columns else df.columns[0]
+    tickers = df[column].dropna().astype(str).str.strip()
+    return list(dict.fromkeys(tickers[tickers != '']))
+
+
+def _gap_aware_returns(prices, valid):
+    """
+    Returns between each column's consecutive valid rows.
+
+    Args:
+        prices: Array (dates x columns) with NaN where a column has no price
+        valid: Boolean array of the same shape
+
+    Returns:
+        Array of returns, NaN where there is no price or no earlier price
+    """
+    rows = np.arange(len(prices))[:, None]
+    last = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    previous = np.vstack([np.full((1, prices.shape[1]), -1), last[:-1]])
+    has_previous = valid & (previous >= 0)
+
+    filled = np.take_along_axis(prices, np.maximum(previous, 0), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = prices / filled - 1
+    returns[~has_previous] = np.nan
+    return returns, previous
+
+
+def _nan_covariance(x, y, count):
+    """Column-wise sample covariance over rows where both are present."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_centered = x - np.nansum(x, axis=0) / count
+        y_centered = y - np.nansum(y, axis=0) / count
+        return np.nansum(x_centered * y_centered, axis=0) / (count - 1)
+
+
+def screen_prices(prices, benchmark_prices=None, portfolio_returns=None, risk_free_rate=0.065,
+                  trading_days=252, min_observations=60):
+    """
+    Metrics for every ticker of a wide price matrix, column-wise.
+
+    Args:
+        prices: DataFrame of close prices (dates x tickers), NaN where a
+            ticker did not trade
+        benchmark_prices: Series of benchmark closes (optional). When given,
+            dates are restricted to the benchmark's calendar
+        portfolio_returns: Series of current portfolio returns (optional),
+            for correlation_to_portfolio
+        risk_free_rate: Annual risk-free rate
+        trading_days: Bars per year
+        min_observations: Tickers with fewer returns get NaN metrics
+
+    Returns:
+        DataFrame (tickers x SCREEN_COLUMNS)
+    """
+    from comparison import column_metrics
+
+    if benchmark_prices is not None:
+        benchmark_prices = benchmark_prices.dropna()
+        prices = prices.reindex(prices.index.intersection(benchmark_prices.index))
+        benchmark_prices = benchmark_prices.loc[prices.index]
+
+    p = prices.to_numpy(dtype=float)
+    valid = ~np.isnan(p)
+    r, previous = _gap_aware_returns(p, valid)
+    present = ~np.isnan(r)
+    count = present.sum(axis=0).astype(float)
+
+    br = None
+    if benchmark_prices is not None:
+        # Benchmark return over the same span as each stock's return
+        b = benchmark_prices.to_numpy(dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            br = b[:, None] / b[np.maximum(previous, 0)] - 1
+
+    # Each column over its own returns only; gaps carry its wealth for the drawdown
+    metrics = column_metrics(r, br, present, risk_free_rate, trading_days)
+    table = pd.DataFrame({column: metrics[column] for column in SCREEN_COLUMNS[:7]}, index=prices.columns)
+
+    last_row = np.maximum.accumulate(np.where(valid, np.arange(len(p))[:, None], -1), axis=0)[-1]
+    last_price = np.where(last_row >= 0, p[np.maximum(last_row, 0), np.arange(p.shape[1])], np.nan)
+
+    table['correlation_to_portfolio'] = np.nan
+    if portfolio_returns is not None:
+        pr = portfolio_returns.reindex(prices.index).to_numpy(dtype=float)[:, None]
+        pair = present & ~np.isnan(pr)
+        x = np.where(pair, r, np.nan)
+        y = np.where(pair, pr, np.nan)
+        pair_count = pair.sum(axis=0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table['correlation_to_portfolio'] = _nan_covariance(x, y, pair_count) / np.sqrt(
+                _nan_covariance(x, x, pair_count) * _nan_covariance(y, y, pair_count))
+
+    table['observations'] = count.astype(int)
+    table['last_price'] = last_price
+
+    short = count < min_observations
+    table.loc[short, SCREEN_COLUMNS[:8]] = np.nan
+    return table[SCREEN_COLUMNS]
+
+
+def screen_universe(tickers, benchmark='^NSEI', period='1y', interval='1d', risk_free_rate=0.065,
+                    portfolio=None, loader=None, progress=None):
+    """
+    Download a universe through the shared price path and screen it.
+
+    Args:
+        tickers: Universe tickers
+        benchmark: Benchmark ticker (None to skip beta/IR)
+        period: History to screen
+        interval: Bar interval
+        risk_free_rate: Annual risk-free rate
+        portfolio: Current Portfolio (optional), for correlation_to_portfolio
+        loader: Callable with download_stock_data's signature (default: a
+            PriceStore, so repeated screens read the local cache)
+        progress: Optional callable(done, total, ticker), as in
+            sweep.download_sweep_data
+
+    Returns:
+        DataFrame (tickers x SCREEN_COLUMNS); tickers that failed to
+        download are left out
+    """
+    from frequency import min_observations, periods_per_year
+    from sweep import download_sweep_data
+
+    if loader is None:
+        from price_store import PriceStore
+        loader = PriceStore().get
+
+    data = download_sweep_data(list(tickers), [benchmark] if benchmark else [], [period], interval,
+                               loader=loader, progress=progress)
+
+    closes = {}
+    for ticker, df in data['stock_data'].items():
+        close = df['Close']
+        closes[ticker] = close.squeeze(axis=1) if isinstance(close, pd.DataFrame) else close
+    if not closes:
+        raise ValueError("No data downloaded for any ticker in the universe")
+
+    benchmark_prices = None
+    if benchmark in data['benchmark_data']:
+        benchmark_prices = data['benchmark_data'][benchmark]['Close']
+        if isinstance(benchmark_prices, pd.DataFrame):
+            benchmark_prices = benchmark_prices.squeeze(axis=1)
+
+    return screen_prices(
+        pd.DataFrame(closes),
+        benchmark_prices,
+        portfolio.portfolio_returns if portfolio is not None else None,
+        risk_free_rate,
+        periods_per_year(interval),
+        min_observations(interval)
+    )
+
+
+def filter_screen(table, filters=None, exclude=None, sort_by='sharpe_ratio', ascending=False, top=None):
+    """
+    Filter and sort a screen.
+
+    Args:
+        table: DataFrame from screen_prices / screen_universe
+        filters: Dictionary column -> (low, high); None leaves a side open
+        exclude: Tickers to drop (e.g. current holdings)
+        sort_by: Column to sort by
+        ascending: Sort direction
+        top: Keep only the first `top` rows
+
+    Returns:
+        Filtered, sorted DataFrame
+    """
+    mask = pd.Series(True, index=table.index)
+    for column, (low, high) in (filters or {}).items():
+        if low is not None:
+            mask &= table[column] >= low
+        if high is not None:
+            mask &= table[column] <= high
+    if exclude:
+        mask &= ~table.index.isin(list(exclude))
+
+    result = table[mask].sort_values(sort_by, ascending=ascending, na_position='last')
+    return result.head(top) if top else result
+
+
+def print_screen(table, top=20):
+    print("\n" + "=" * 60)
+    print("UNIVERSE SCREEN")
+    print("=" * 60)
+    print(f"\n  {'Ticker':<14} {'Return':>8} {'Vol':>7} {'Sharpe':>7} {'MaxDD':>8} {'Beta':>6} {'Corr':>6}")
+    print("-" * 60)
+    for ticker, row in table.head(top).iterrows():
+        print(f"  {ticker[:14]:<14} {row['annual_return']:>8.1%} {row['volatility']:>7.1%} "
+              f"{row['sharpe_ratio']:>7.2f} {row['max_drawdown']:>8.1%} {row['beta']:>6.2f} "
+              f"{row['correlation_to_portfolio']:>6.2f}")
+    print("=" * 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Screen a universe of stocks in one pass.")
+    parser.add_argument('universe', help="CSV with a Ticker column (or tickers in the first column)")
+    parser.add_argument('--benchmark', default='^NSEI')
+    parser.add_argument('--period', default='1y')
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--risk-free-rate', type=float, default=0.065)
+    parser.add_argument('--portfolio', help="Portfolio CSV for correlation to current holdings")
+    parser.add_argument('--sort', default='sharpe_ratio', choices=SCREEN_COLUMNS)
+    parser.add_argument('--ascending', action='store_true')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--output', default=DEFAULT_SCREEN_PATH)
+    args = parser.parse_args()
+
+    portfolio = None
+    if args.portfolio:
+        from portfolio import Portfolio
+        portfolio = Portfolio.from_csv(args.portfolio)
+        portfolio.benchmark_ticker = args.benchmark
+        portfolio.download_data(period=args.period, interval=args.interval)
+
+    table = screen_universe(universe_from_csv(args.universe), args.benchmark, args.period, args.interval,
+                            args.risk_free_rate, portfolio)
+    table = filter_screen(table, sort_by=args.sort, ascending=args.ascending)
+
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    table.to_csv(args.output)
+    print_screen(table, args.top)
+    print(f"✓ Screened {len(table)} tickers, saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
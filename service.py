@@ -0,0 +1,436 @@
+"""
+Local HTTP analysis service with micro-batching.
+
+Other systems can request analyses over HTTP instead of going through
+main.py or the dashboard:
+
+    POST /analyze   {"tickers": [...], "weights": [...],          (or "amounts")
+                     "benchmark": "^NSEI", "period": "1y",
+                     "interval": "1d", "risk_free_rate": 0.065}
+                    -> the dashboard's JSON export (build_export_payload)
+    GET  /health    -> {"status": "ok", "pending": n}
+    GET  /stats     -> request, batch and rejection counters
+
+Requests are not evaluated one by one. They wait in a queue for up to
+batch_window seconds, or until max_batch have arrived. Each batch is then
+evaluated together:
+
+    - every distinct ticker in the batch is loaded once
+    - requests whose holdings align on the same dates share one returns
+      matrix R; their portfolio returns come from one R @ W and their
+      headline metrics from one column-wise pass (comparison.py)
+    - the remaining sections of each payload are computed from the
+      seeded returns
+
+Holdings are aligned strictly (only dates on which every holding and the
+benchmark have a bar), which is what the date-mask grouping relies on;
+payloads match a standalone Portfolio with alignment = 'strict'.
+
+Batches run on a bounded thread pool (max_workers). Backpressure works in
+two layers. The queue holds at most max_pending requests; beyond that a
+request is rejected immediately with 503 and Retry-After, instead of piling
+up latency. The batcher also waits for a free worker before it takes more
+work from the queue.
+
+Usage:
+    python service.py --port 8765 --workers 4 --batch-window-ms 10
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_PORT = 8765
+MAX_BODY_BYTES = 1 << 20
+
+
+class RequestError(Exception):
+    """Invalid request (HTTP 400) or unanalyzable portfolio (HTTP 422)."""
+
+    def __init__(self, message, status=HTTPStatus.BAD_REQUEST):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_analysis_request(body):
+    """
+    Validate an /analyze body.
+
+    Returns:
+        Dictionary with tickers, weights, benchmark, period, interval and
+        risk_free_rate
+    """
+    try:
+        spec = json.loads(body or b'{}')
+    except json.JSONDecodeError as e:
+        raise RequestError(f"Invalid JSON: {e}")
+    if not isinstance(spec, dict):
+        raise RequestError("Body must be a JSON object")
+
+    tickers = spec.get('tickers')
+    if not tickers or not isinstance(tickers, list):
+        raise RequestError("'tickers' must be a non-empty list")
+
+    if 'amounts' in spec:
+        amounts = np.asarray(spec['amounts'], dtype=float)
+        if len(amounts) != len(tickers) or (amounts <= 0).any():
+            raise RequestError("'amounts' must be positive, one per ticker")
+        weights = list(amounts / amounts.sum())
+    else:
+        weights = spec.get('weights')
+
+    # Same validation as the Portfolio constructor
+    from portfolio import Portfolio
+    try:
+        Portfolio(tickers, weights or [])
+    except (ValueError, TypeError) as e:
+        raise RequestError(str(e))
+
+    return {
+        'tickers': [str(t) for t in tickers],
+        'weights': [float(w) for w in weights],
+        'benchmark': str(spec.get('benchmark', '^NSEI')),
+        'period': str(spec.get('period', '1y')),
+        'interval': str(spec.get('interval', '1d')),
+        'risk_free_rate': float(spec.get('risk_free_rate', 0.065)),
+    }
+
+
+def _close(df):
+    close = df['Close']
+    return close.squeeze(axis=1) if isinstance(close, pd.DataFrame) else close
+
+
+def _select_drawdowns(report, label):
+    """One portfolio's view of a batch drawdown report, as Portfolio.drawdown_report."""
+    columns = [label, 'Market']
+    rename = {label: 'Portfolio'}
+    episodes = report['episodes']
+    episodes = episodes[episodes['portfolio'].isin(columns)].replace({'portfolio': rename})
+    selected = {'episodes': episodes.sort_values(['portfolio', 'peak_date'], kind='stable').reset_index(drop=True),
+                'underwater': report['underwater'][columns].rename(columns=rename)}
+    for key in ('max_drawdown', 'ulcer_index', 'pain_index'):
+        selected[key] = report[key][columns].rename(index=rename)
+    return selected
+
+
+def evaluate_batch(requests, loader):
+    """
+    Evaluate requests that share benchmark, period and interval.
+
+    Args:
+        requests: List of parsed request dictionaries
+        loader: Callable with download_stock_data's signature
+
+    Returns:
+        List with one payload dictionary or exception per request
+    """
+    from analysis_export import build_export_payload
+    from comparison import compare_metrics
+    from drawdown import analyze_drawdowns
+    from frequency import min_observations, periods_per_year
+    from portfolio import Portfolio
+    from returns_calc import calculate_returns
+    from tail_risk import calculate_tail_risk_table
+
+    first = requests[0]
+    benchmark, period, interval = first['benchmark'], first['period'], first['interval']
+    results = [None] * len(requests)
+
+    # Every distinct ticker in the batch is loaded once
+    closes = {}
+    for ticker in dict.fromkeys(t for r in requests for t in r['tickers']):
+        try:
+            closes[ticker] = _close(loader(ticker, period=period, interval=interval))
+        except Exception as e:
+            closes[ticker] = e
+    try:
+        benchmark_close = _close(loader(benchmark, period=period, interval=interval))
+    except Exception as e:
+        return [RequestError(f"Benchmark {benchmark} unavailable: {e}", HTTPStatus.UNPROCESSABLE_ENTITY)] * len(requests)
+
+    valid = [t for t, c in closes.items() if not isinstance(c, Exception)]
+    prices = pd.DataFrame({t: closes[t] for t in valid})
+    prices = prices.reindex(prices.index.intersection(benchmark_close.index))
+    present = prices.notna().to_numpy()
+    column = {t: i for i, t in enumerate(valid)}
+
+    # Group requests by the dates their own holdings align on, so every
+    # request sees exactly the dates a standalone analysis would use
+    groups = {}
+    for i, request in enumerate(requests):
+        missing = [t for t in request['tickers'] if t not in column]
+        if missing:
+            results[i] = RequestError(f"No data for: {', '.join(missing)}", HTTPStatus.UNPROCESSABLE_ENTITY)
+            continue
+        mask = present[:, [column[t] for t in request['tickers']]].all(axis=1)
+        if mask.sum() < min_observations(interval):
+            results[i] = RequestError("Insufficient aligned data", HTTPStatus.UNPROCESSABLE_ENTITY)
+            continue
+        groups.setdefault(mask.tobytes(), (mask, []))[1].append(i)
+
+    bars = periods_per_year(interval)
+    for mask, members in groups.values():
+        tickers = list(dict.fromkeys(t for i in members for t in requests[i]['tickers']))
+        aligned = prices.loc[mask, tickers]
+        aligned_benchmark = benchmark_close.loc[aligned.index]
+        stock_returns = calculate_returns(aligned)
+        benchmark_returns = calculate_returns(aligned_benchmark)
+
+        # One R @ W for the whole group
+        weights = pd.DataFrame(0.0, index=tickers, columns=members)
+        for i in members:
+            weights.loc[requests[i]['tickers'], i] = requests[i]['weights']
+        returns = pd.DataFrame(stock_returns.to_numpy() @ weights.to_numpy(),
+                               index=stock_returns.index, columns=members)
+
+        # Headline metrics in one column-wise pass per risk-free rate
+        metrics = {}
+        for rate in {requests[i]['risk_free_rate'] for i in members}:
+            columns = [i for i in members if requests[i]['risk_free_rate'] == rate]
+            metrics.update(compare_metrics(returns[columns], None, rate, bars).to_dict(orient='index'))
+
+        # Drawdown and tail-risk sections are column-wise too: one pass each
+        # over every portfolio in the group plus the market
+        labels = {i: f"p{i}" for i in members}
+        frame = returns.rename(columns=labels).assign(Market=benchmark_returns)
+        drawdowns = analyze_drawdowns(frame)
+        tail = calculate_tail_risk_table(frame)
+
+        for i in members:
+            request = requests[i]
+            try:
+                portfolio = Portfolio(request['tickers'], request['weights'])
+                portfolio.benchmark_ticker = benchmark
+                portfolio.interval = interval
+                portfolio.risk_free_rate = request['risk_free_rate']
+                portfolio.alignment = 'strict'
+                own_prices = aligned[request['tickers']]
+                portfolio._cache.update({
+                    '_aligned_prices': (own_prices, aligned_benchmark),
+                    'price_matrix': own_prices,
+                    'stock_returns_df': stock_returns[request['tickers']],
+                    'benchmark_returns': benchmark_returns,
+                    'portfolio_returns': returns[i],
+                    'metrics': {k: metrics[i][k] for k in
+                                ('annual_return', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown')},
+                    'drawdown_report': _select_drawdowns(drawdowns, labels[i]),
+                    'tail_risk': tail[[labels[i], 'Market']].rename(columns={labels[i]: 'Portfolio'}),
+                })
+                results[i] = build_export_payload(portfolio)
+            except Exception as e:
+                results[i] = e
+    return results
+
+
+class AnalysisService:
+    """
+    Micro-batching analysis server.
+
+    Args:
+        loader: Callable with download_stock_data's signature (default: a
+            shared PriceStore)
+        batch_window: Seconds to wait for more requests after the first one
+        max_batch: Maximum requests per batch
+        max_pending: Queue capacity; further requests get 503
+        max_workers: Batches evaluated concurrently
+    """
+
+    def __init__(self, loader=None, batch_window=0.01, max_batch=64, max_pending=1000, max_workers=4):
+        if loader is None:
+            from price_store import PriceStore
+            loader = PriceStore().get
+
+        self.loader = loader
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_workers = max_workers
+        self.stats = {'requests': 0, 'rejected': 0, 'batches': 0, 'batched_requests': 0, 'errors': 0}
+
+        self._queue = None
+        self._executor = None
+        self._server = None
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        self._workers = asyncio.Semaphore(self.max_workers)
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        self._batcher.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def serve_forever(self, host='127.0.0.1', port=DEFAULT_PORT):
+        port = await self.start(host, port)
+        print(f"✓ Analysis service listening on http://{host}:{port} "
+              f"(workers={self.max_workers}, window={self.batch_window * 1000:.0f} ms)")
+        async with self._server:
+            await self._server.serve_forever()
+
+    # ------------------------------------------------------------------
+    # Batching
+    # ------------------------------------------------------------------
+
+    async def submit(self, request):
+        """Queue a parsed request and wait for its payload."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((request, future))  # raises QueueFull when saturated
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Do not take work off the queue while every worker is busy
+            await self._workers.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            groups = {}
+            for request, future in batch:
+                key = (request['benchmark'], request['period'], request['interval'])
+                groups.setdefault(key, []).append((request, future))
+
+            self.stats['batches'] += 1
+            self.stats['batched_requests'] += len(batch)
+            tasks = [self._run_group(group) for group in groups.values()]
+            asyncio.ensure_future(self._release_after(asyncio.gather(*tasks)))
+
+    async def _release_after(self, work):
+        try:
+            await work
+        finally:
+            self._workers.release()
+
+    async def _run_group(self, group):
+        loop = asyncio.get_running_loop()
+        requests = [request for request, _ in group]
+        try:
+            results = await loop.run_in_executor(self._executor, evaluate_batch, requests, self.loader)
+        except Exception as e:
+            results = [e] * len(group)
+        for (_, future), result in zip(group, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    # ------------------------------------------------------------------
+    # HTTP
+    # ------------------------------------------------------------------
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_BYTES:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Body too large'})
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload, extra = await self._route(method, path, body)
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, extra, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        path = path.split('?', 1)[0]
+        if method == 'GET' and path == '/health':
+            return HTTPStatus.OK, {'status': 'ok', 'pending': self._queue.qsize()}, None
+        if method == 'GET' and path == '/stats':
+            return HTTPStatus.OK, dict(self.stats, pending=self._queue.qsize()), None
+        if path != '/analyze':
+            return HTTPStatus.NOT_FOUND, {'error': f'No route {method} {path}'}, None
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Use POST'}, None
+
+        self.stats['requests'] += 1
+        try:
+            payload = await self.submit(parse_analysis_request(body))
+            return HTTPStatus.OK, payload, None
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': 'Server busy, retry later'}, {'Retry-After': '1'}
+        except RequestError as e:
+            return e.status, {'error': str(e)}, None
+        except Exception as e:
+            self.stats['errors'] += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}, None
+
+    async def _respond(self, writer, status, payload, extra_headers=None, keep_alive=False):
+        body = json.dumps(payload).encode('utf-8')
+        headers = {
+            'Content-Type': 'application/json',
+            'Content-Length': str(len(body)),
+            'Connection': 'keep-alive' if keep_alive else 'close',
+        }
+        headers.update(extra_headers or {})
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        head += ''.join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the portfolio analysis HTTP service.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch-window-ms', type=float, default=10)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-pending', type=int, default=1000)
+    args = parser.parse_args()
+
+    service = AnalysisService(
+        batch_window=args.batch_window_ms / 1000,
+        max_batch=args.max_batch,
+        max_pending=args.max_pending,
+        max_workers=args.workers
+    )
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nService stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Snapshot and fast restore of an analyzed Portfolio.
+
+A snapshot is a directory of plain .npy arrays plus a small JSON header:
+
+    meta.json                 schema version, definition, date metadata, metrics
+    dates.npy                 aligned dates (int64 ns, UTC)
+    prices.npy                aligned close prices (dates x tickers)
+    benchmark_prices.npy      aligned benchmark prices (optional)
+    return_dates.npy          dates of the return series
+    stock_returns.npy         returns matrix (return dates x tickers)
+    portfolio_returns.npy     weighted portfolio returns
+    benchmark_return_dates.npy / benchmark_returns.npy (optional)
+    alignment_filled.npy      carried-forward cells (dates x series)
+    dropped_dates.npy         calendar dates the alignment dropped
+    cell_*.npy                the alignment report's filled/dropped cells
+
+The alignment policy, max fill gap and the per-series alignment summary are
+kept in meta.json, so a restored portfolio carries its full
+alignment_report and is labelled with the settings that produced it.
+
+.npy files can be memory-mapped, so loading maps the arrays instead of
+reading them: restoring a multi-year, multi-hundred-name analysis costs a
+few milliseconds, and the OS page cache shares the data between a batch
+job and any number of dashboard sessions. meta.json is written last, so a
+directory without it is an incomplete snapshot.
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_SCHEMA_VERSION = 2
+META_FILE = 'meta.json'
+
+
+def _encode_dates(index):
+    index = pd.DatetimeIndex(index)
+    tz = str(index.tz) if index.tz is not None else None
+    utc = index.tz_convert('UTC').tz_localize(None) if tz else index
+    return utc.as_unit('ns').asi8, tz
+
+
+def _decode_dates(values, tz):
+    index = pd.DatetimeIndex(np.asarray(values).view('datetime64[ns]'))
+    if tz:
+        index = index.tz_localize('UTC').tz_convert(tz)
+    return index
+
+
+def _scalars(metrics):
+    """JSON-safe copy of the scalar entries of a metrics dictionary."""
+    if metrics is None:
+        return None
+    return {k: float(v) for k, v in metrics.items() if isinstance(v, (int, float, np.number))}
+
+
+def _alignment_arrays(report):
+    """Arrays of an alignment report, and its small JSON part."""
+    cells = report['cells']
+    series = list(report['filled'].columns)
+    arrays = {
+        'alignment_filled': report['filled'].to_numpy(dtype=bool),
+        'dropped_dates': _encode_dates(report['dropped_dates'])[0],
+        'cell_dates': _encode_dates(cells['date'])[0],
+        'cell_series': pd.Index(series).get_indexer(cells['series']).astype(np.int64),
+        'cell_dropped': (cells['action'] == 'dropped').to_numpy(),
+        'cell_source_dates': _encode_dates(cells['source_date'])[0],
+    }
+    summary = report['summary']
+    header = {
+        'series': series,
+        'calendar_size': int(report['calendar_size']),
+        'summary': {
+            'calendar': [str(c) for c in summary['calendar']],
+            'observed': [int(v) for v in summary['observed']],
+            'filled': [int(v) for v in summary['filled']],
+            'dropped': [int(v) for v in summary['dropped']],
+        },
+    }
+    return arrays, header
+
+
+def _alignment_report(meta, array, prices, benchmark_prices, tz):
+    """Rebuild alignment_report from a snapshot (same keys as align_prices)."""
+    header = meta['alignment_report']
+    series = header['series']
+    cell_series = np.asarray(series, dtype=object)[np.asarray(array('cell_series'))]
+    dropped = np.asarray(array('cell_dropped'))
+
+    cells = pd.DataFrame({
+        'date': _decode_dates(array('cell_dates'), tz),
+        'series': cell_series,
+        'action': np.where(dropped, 'dropped', 'filled').astype(object),
+        'source_date': _decode_dates(array('cell_source_dates'), tz),
+    })
+    summary = pd.DataFrame(header['summary'], index=pd.Index(series, name='series'))
+
+    return {
+        'prices': prices,
+        'benchmark': benchmark_prices,
+        'filled': pd.DataFrame(np.asarray(array('alignment_filled')), index=prices.index, columns=series),
+        'cells': cells,
+        'dropped_dates': _decode_dates(array('dropped_dates'), tz),
+        'summary': summary,
+        'calendar_size': header['calendar_size'],
+        'policy': meta['alignment'],
+        'max_gap': meta['max_fill_gap'],
+    }
+
+
+def save_snapshot(portfolio, path):
+    """
+    Write an analyzed portfolio's aligned data, returns and metrics.
+
+    Args:
+        portfolio: Portfolio with data loaded (returns are computed if needed)
+        path: Snapshot directory (created if missing, files overwritten)
+
+    Returns:
+        The snapshot path
+    """
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, META_FILE)
+    if os.path.exists(meta_path):
+        # Invalidate the old snapshot before its arrays are replaced
+        os.remove(meta_path)
+
+    prices = portfolio.price_matrix
+    stock_returns = portfolio.stock_returns_df
+    benchmark_prices = portfolio._aligned_prices[1]
+    benchmark_returns = portfolio.benchmark_returns
+
+    dates, tz = _encode_dates(prices.index)
+    arrays = {
+        'dates': dates,
+        'prices': prices.to_numpy(dtype=float),
+        'return_dates': _encode_dates(stock_returns.index)[0],
+        'stock_returns': stock_returns.to_numpy(dtype=float),
+        'portfolio_returns': portfolio.portfolio_returns.to_numpy(dtype=float),
+    }
+    if benchmark_prices is not None:
+        arrays['benchmark_prices'] = benchmark_prices.to_numpy(dtype=float)
+        arrays['benchmark_return_dates'] = _encode_dates(benchmark_returns.index)[0]
+        arrays['benchmark_returns'] = benchmark_returns.to_numpy(dtype=float)
+
+    alignment, alignment_header = _alignment_arrays(portfolio.alignment_report)
+    arrays.update(alignment)
+
+    for name, values in arrays.items():
+        np.save(os.path.join(path, name + '.npy'), np.ascontiguousarray(values))
+
+    market = portfolio.market_metrics
+    meta = {
+        'schema_version': SNAPSHOT_SCHEMA_VERSION,
+        'tickers': list(portfolio.tickers),
+        'weights': [float(w) for w in portfolio.weights],
+        'benchmark_ticker': portfolio.benchmark_ticker,
+        'interval': portfolio.interval,
+        'risk_free_rate': float(portfolio.risk_free_rate),
+        'alignment': portfolio.alignment,
+        'max_fill_gap': int(portfolio.max_fill_gap),
+        'alignment_report': alignment_header,
+        'timezone': tz,
+        'arrays': sorted(arrays),
+        'start': str(prices.index[0]),
+        'end': str(prices.index[-1]),
+        'metrics': _scalars(portfolio.metrics),
+        'market_metrics': _scalars(market),
+    }
+
+    # meta.json last: its presence marks a complete snapshot
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, meta_path)
+
+    print(f"✓ Saved snapshot of {len(meta['tickers'])} stocks × {len(dates)} bars to {path}")
+    return path
+
+
+def read_snapshot_meta(path):
+    """Header of a snapshot (definition, dates, stored metrics) without loading arrays."""
+    meta_path = os.path.join(path, META_FILE)
+    if not os.path.exists(meta_path):
+        raise FileNotFoundError(f"No complete snapshot at {path} (missing {META_FILE})")
+
+    with open(meta_path) as f:
+        meta = json.load(f)
+
+    version = meta.get('schema_version')
+    if version != SNAPSHOT_SCHEMA_VERSION:
+        raise ValueError(f"Unsupported snapshot schema {version} (expected {SNAPSHOT_SCHEMA_VERSION})")
+    return meta
+
+
+def load_snapshot(path, mmap=True):
+    """
+    Restore a Portfolio from a snapshot.
+
+    The aligned prices, returns and (for the saved risk-free rate) metrics
+    are placed directly in the portfolio's cache, so nothing is recomputed
+    and no data is downloaded. Changing weights or the risk-free rate
+    recomputes from the restored returns as usual. stock_data is left
+    empty; changing tickers requires download_data().
+
+    Args:
+        path: Snapshot directory
+        mmap: Memory-map the arrays (read-only) instead of reading them
+
+    Returns:
+        Portfolio
+    """
+    from portfolio import Portfolio
+
+    meta = read_snapshot_meta(path)
+    mode = 'r' if mmap else None
+
+    def array(name):
+        return np.load(os.path.join(path, name + '.npy'), mmap_mode=mode, allow_pickle=False)
+
+    tz = meta['timezone']
+    tickers = meta['tickers']
+
+    prices = pd.DataFrame(array('prices'), index=_decode_dates(array('dates'), tz),
+                          columns=tickers, copy=False)
+    return_dates = _decode_dates(array('return_dates'), tz)
+    stock_returns = pd.DataFrame(array('stock_returns'), index=return_dates, columns=tickers, copy=False)
+    portfolio_returns = pd.Series(array('portfolio_returns'), index=return_dates, copy=False)
+
+    benchmark_prices = benchmark_returns = None
+    if 'benchmark_prices' in meta['arrays']:
+        benchmark_prices = pd.Series(array('benchmark_prices'), index=prices.index, copy=False)
+        benchmark_returns = pd.Series(array('benchmark_returns'),
+                                      index=_decode_dates(array('benchmark_return_dates'), tz), copy=False)
+
+    portfolio = Portfolio(tickers, meta['weights'])
+    portfolio.benchmark_ticker = meta['benchmark_ticker']
+    portfolio.interval = meta['interval']
+    portfolio.risk_free_rate = meta['risk_free_rate']
+    portfolio.alignment = meta['alignment']
+    portfolio.max_fill_gap = meta['max_fill_gap']
+
+    # Inputs are set, so seeding the cache now is not undone by invalidation
+    portfolio._cache.update({
+        'alignment_report': _alignment_report(meta, array, prices, benchmark_prices, tz),
+        '_aligned_prices': (prices, benchmark_prices),
+        'price_matrix': prices,
+        'stock_returns_df': stock_returns,
+        'portfolio_returns': portfolio_returns,
+        'benchmark_returns': benchmark_returns,
+    })
+    if meta['metrics'] is not None:
+        portfolio._cache['metrics'] = dict(meta['metrics'])
+        portfolio._cache['_rate_free_metrics'] = {
+            k: meta['metrics'][k] for k in ('annual_return', 'volatility', 'max_drawdown')
+        }
+    return portfolio
@@ -0,0 +1,296 @@
+"""
+Out-of-core analysis via mergeable partial statistics.
+
+Instead of building the whole aligned price DataFrame, a generator pipeline
+walks the price history in date chunks:
+
+    price chunks -> aligned price chunks -> return chunks -> PartialStats
+                 -> merged -> metrics
+
+Prices are aligned under the same policy as Portfolio (alignment.py, with
+each series' fill state carried from chunk to chunk), so the streamed
+metrics describe the same dates and carried prices as the in-memory ones.
+
+Each chunk is reduced to a PartialStats: counts, means and sums of squared
+deviations (merged with the parallel-variance update, which is numerically
+stable), the co-moment with the benchmark, log-growth sums, gain/loss
+moments and the drawdown state (wealth, running peak, worst drawdown) at the
+chunk boundary. Merging all chunks and finalizing gives the same numbers as
+the in-memory Portfolio path (up to floating-point rounding), while peak
+memory is set by the chunk size alone.
+
+Moments are order-independent and can be merged in any order (e.g. from
+parallel workers). The drawdown state is path-dependent, so chunks are seeded
+with the running wealth and peak of everything before them - stream_metrics
+does this automatically by walking chunks in date order.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Columns tracked in every PartialStats: portfolio, benchmark and their difference
+SERIES = ('portfolio', 'benchmark', 'excess')
+
+
+def _merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Combine (count, mean, M2) pairs; works element-wise on arrays."""
+    n = n_a + n_b
+    with np.errstate(invalid='ignore', divide='ignore'):
+        delta = mean_b - mean_a
+        mean = np.where(n > 0, mean_a + delta * n_b / np.maximum(n, 1), 0.0)
+        m2 = m2_a + m2_b + np.where(n > 0, delta ** 2 * n_a * n_b / np.maximum(n, 1), 0.0)
+    return n, mean, m2
+
+
+def _masked_moments(values, mask):
+    """Count, mean and M2 of `values` where `mask` is True, column-wise."""
+    count = mask.sum(axis=0)
+    total = np.where(mask, values, 0.0).sum(axis=0)
+    mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+    m2 = np.where(mask, (values - mean) ** 2, 0.0).sum(axis=0)
+    return count.astype(float), mean, m2
+
+
+class PartialStats:
+    """
+    Sufficient statistics for portfolio/benchmark metrics over a date range.
+
+    Build one per chunk with from_chunk, combine with merge (in date order),
+    and turn into metrics with finalize.
+    """
+
+    def __init__(self):
+        zeros = np.zeros(len(SERIES))
+        self.count = 0.0
+        self.mean = zeros.copy()
+        self.m2 = zeros.copy()
+        self.log_growth = zeros.copy()
+        self.comoment = 0.0
+
+        self.gain_count = zeros.copy()
+        self.gain_sum = zeros.copy()
+        self.loss_count = zeros.copy()
+        self.loss_mean = zeros.copy()
+        self.loss_m2 = zeros.copy()
+
+        # Drawdown state for portfolio and benchmark at the end of the range
+        self.wealth = np.ones(2)
+        self.peak = np.zeros(2)
+        self.max_drawdown = np.zeros(2)
+
+    @classmethod
+    def from_chunk(cls, portfolio_returns, benchmark_returns, seed=None):
+        """
+        Statistics for one chunk of aligned returns.
+
+        Args:
+            portfolio_returns: Array/Series of portfolio returns for the chunk
+            benchmark_returns: Array/Series of benchmark returns, same dates
+            seed: PartialStats of everything before this chunk, whose wealth
+                and peak seed the drawdown state (None for the first chunk)
+        """
+        p = np.asarray(portfolio_returns, dtype=float)
+        b = np.asarray(benchmark_returns, dtype=float)
+        values = np.column_stack([p, b, p - b])
+
+        stats = cls()
+        stats.count = float(len(p))
+        if stats.count == 0:
+            if seed is not None:
+                stats.wealth, stats.peak = seed.wealth.copy(), seed.peak.copy()
+            return stats
+
+        stats.mean = values.mean(axis=0)
+        stats.m2 = ((values - stats.mean) ** 2).sum(axis=0)
+        stats.log_growth = np.log1p(values).sum(axis=0)
+        stats.comoment = float(((p - stats.mean[0]) * (b - stats.mean[1])).sum())
+
+        gains = values > 0
+        stats.gain_count = gains.sum(axis=0).astype(float)
+        stats.gain_sum = np.where(gains, values, 0.0).sum(axis=0)
+        stats.loss_count, stats.loss_mean, stats.loss_m2 = _masked_moments(values, values < 0)
+
+        # Drawdown: wealth path seeded from the previous chunk's boundary state
+        start_wealth = seed.wealth if seed is not None else np.ones(2)
+        start_peak = seed.peak if seed is not None else np.zeros(2)
+        wealth = start_wealth * np.cumprod(1 + values[:, :2], axis=0)
+        peak = np.maximum.accumulate(np.maximum(wealth, start_peak), axis=0)
+        stats.max_drawdown = (wealth / peak - 1).min(axis=0)
+        stats.wealth = wealth[-1]
+        stats.peak = peak[-1]
+        return stats
+
+    def merge(self, later):
+        """
+        Combine with the statistics of the date range immediately following.
+
+        Moment statistics merge exactly in any order; the drawdown state
+        assumes `later` was seeded from `self` (see from_chunk).
+        """
+        merged = PartialStats()
+        n_a, n_b = self.count, later.count
+
+        merged.count, merged.mean, merged.m2 = _merge_moments(
+            n_a, self.mean, self.m2, n_b, later.mean, later.m2
+        )
+        merged.log_growth = self.log_growth + later.log_growth
+
+        n = n_a + n_b
+        cross = 0.0
+        if n > 0:
+            cross = ((later.mean[0] - self.mean[0]) * (later.mean[1] - self.mean[1])
+                     * n_a * n_b / n)
+        merged.comoment = self.comoment + later.comoment + cross
+
+        merged.gain_count = self.gain_count + later.gain_count
+        merged.gain_sum = self.gain_sum + later.gain_sum
+        merged.loss_count, merged.loss_mean, merged.loss_m2 = _merge_moments(
+            self.loss_count, self.loss_mean, self.loss_m2,
+            later.loss_count, later.loss_mean, later.loss_m2
+        )
+
+        if n_b > 0:
+            merged.wealth = later.wealth
+            merged.peak = later.peak
+            merged.max_drawdown = np.minimum(self.max_drawdown, later.max_drawdown)
+        else:
+            merged.wealth, merged.peak, merged.max_drawdown = self.wealth, self.peak, self.max_drawdown
+        return merged
+
+    def finalize(self, risk_free_rate=0.065, trading_days=252):
+        """
+        Metrics matching Portfolio.metrics, market_metrics, risk_comparison
+        and behaviour.
+
+        Returns:
+            Dictionary of scalar metrics
+        """
+        n = self.count
+        if n < 2:
+            raise ValueError("Need at least two aligned returns to compute metrics")
+
+        annual = np.exp(self.log_growth * trading_days / n) - 1
+        volatility = np.sqrt(self.m2 / (n - 1)) * np.sqrt(trading_days)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            downside = np.sqrt(self.loss_m2 / (self.loss_count - 1)) * np.sqrt(trading_days)
+            avg_gain = np.where(self.gain_count > 0, self.gain_sum / self.gain_count, 0.0)
+            avg_loss = np.where(self.loss_count > 0, self.loss_mean, 0.0)
+            gain_loss_ratio = np.where(avg_loss != 0, np.abs(avg_gain / avg_loss), np.inf)
+
+        sharpe = (annual - risk_free_rate) / volatility
+        sortino = (annual - risk_free_rate) / downside
+        tracking = volatility[2]
+
+        return {
+            'observations': int(n),
+            'annual_return': annual[0],
+            'volatility': volatility[0],
+            'sharpe_ratio': sharpe[0],
+            'sortino_ratio': sortino[0],
+            'max_drawdown': self.max_drawdown[0],
+            'annualized_excess_return': annual[0] - annual[1],
+            'tracking_error': tracking,
+            'information_ratio': annual[2] / tracking,
+            'beta': self.comoment / self.m2[1],
+            'market_volatility': volatility[1],
+            'market_sharpe': sharpe[1],
+            'market_drawdown': self.max_drawdown[1],
+            'portfolio_downside': downside[0],
+            'market_downside': downside[1],
+            'win_rate': self.gain_count[0] / n,
+            'benchmark_win_rate': self.gain_count[1] / n,
+            'avg_gain': avg_gain[0],
+            'avg_loss': avg_loss[0],
+            'gain_loss_ratio': gain_loss_ratio[0],
+        }
+
+
+def iter_csv_price_chunks(filepath, chunksize=100_000, index_col=0):
+    """
+    Yield wide price chunks (dates x tickers) from a CSV price store.
+
+    Only `chunksize` rows are in memory at a time.
+    """
+    for chunk in pd.read_csv(filepath, index_col=index_col, parse_dates=True, chunksize=chunksize):
+        yield chunk
+
+
+def iter_frame_chunks(prices_df, chunksize=100_000):
+    """Yield row chunks of an in-memory price DataFrame (for testing/parity checks)."""
+    for start in range(0, len(prices_df), chunksize):
+        yield prices_df.iloc[start:start + chunksize]
+
+
+def iter_aligned_returns(price_chunks, tickers, weights, benchmark_column, alignment='exchange',
+                         max_fill_gap=5):
+    """
+    Turn wide price chunks into aligned (portfolio, benchmark) return chunks.
+
+    Dates are aligned under the same policy as the in-memory path
+    (alignment.iter_aligned_chunks, with each series' fill state carried
+    between chunks), and the last aligned price row is carried across chunk
+    boundaries so no return is lost at a seam.
+
+    Args:
+        price_chunks: Iterable of wide price DataFrames, in date order
+        tickers: Portfolio tickers (columns of the chunks)
+        weights: Portfolio weights, same order as tickers
+        benchmark_column: Column holding benchmark prices
+        alignment: 'strict', 'ffill' or 'exchange' (see alignment.py)
+        max_fill_gap: Longest gap filled by 'ffill' / 'exchange'
+
+    Yields:
+        Tuple of (portfolio_returns, benchmark_returns) arrays
+    """
+    from alignment import iter_aligned_chunks
+
+    weights = np.asarray(weights, dtype=float)
+    columns = list(tickers) + [benchmark_column]
+    last_row = None
+
+    for aligned in iter_aligned_chunks(price_chunks, columns, alignment, max_fill_gap):
+        prices = aligned.to_numpy(dtype=float)
+        if len(prices) == 0:
+            continue
+
+        if last_row is not None:
+            prices = np.vstack([last_row, prices])
+        last_row = prices[-1]
+
+        if len(prices) < 2:
+            continue
+
+        returns = prices[1:] / prices[:-1] - 1
+        yield returns[:, :-1] @ weights, returns[:, -1]
+
+
+def accumulate_stats(return_chunks):
+    """Fold (portfolio, benchmark) return chunks into a single PartialStats."""
+    total = PartialStats()
+    for portfolio_returns, benchmark_returns in return_chunks:
+        chunk_stats = PartialStats.from_chunk(portfolio_returns, benchmark_returns, seed=total)
+        total = total.merge(chunk_stats)
+    return total
+
+
+def stream_metrics(price_chunks, tickers, weights, benchmark_column,
+                   risk_free_rate=0.065, trading_days=252, alignment='exchange', max_fill_gap=5):
+    """
+    Full metric set from a chunked price history.
+
+    Args:
+        price_chunks: Iterable of wide price DataFrames (date-ordered), e.g.
+            iter_csv_price_chunks('prices.csv', chunksize=50_000)
+        tickers: Portfolio tickers (columns of the chunks)
+        weights: Portfolio weights, same order as tickers
+        benchmark_column: Column holding benchmark prices
+        risk_free_rate: Annual risk-free rate
+        trading_days: Bars per year
+        alignment: Alignment policy, as Portfolio.alignment
+        max_fill_gap: Longest filled gap, as Portfolio.max_fill_gap
+
+    Returns:
+        Dictionary of scalar metrics (see PartialStats.finalize)
+    """
+    returns = iter_aligned_returns(price_chunks, tickers, weights, benchmark_column, alignment, max_fill_gap)
+    return accumulate_stats(returns).finalize(risk_free_rate, trading_days)
@@ -0,0 +1,193 @@
+"""
+Parameter sweeps over one downloaded dataset.
+
+Changing the analysis period, the benchmark or the risk-free rate does not
+need new market data: every shorter period is a slice of the longest one,
+every benchmark can be fetched up front, and the risk-free rate only enters
+Sharpe and Sortino. A sweep therefore downloads the longest requested
+horizon for all tickers and every candidate benchmark once, then evaluates
+the (period, benchmark, risk_free_rate) grid in memory.
+
+Per (period, benchmark) cell a Portfolio is built on the sliced data; its
+memoized derived state means changing the risk-free rate only recomputes
+Sharpe and Sortino: alignment, returns, the rate-free headline metrics and
+the benchmark-relative metrics are reused across rates.
+"""
+
+import contextlib
+import io
+import itertools
+
+import pandas as pd
+
+from portfolio import Portfolio
+
+PERIOD_OFFSETS = {
+    '1mo': pd.DateOffset(months=1),
+    '3mo': pd.DateOffset(months=3),
+    '6mo': pd.DateOffset(months=6),
+    '1y': pd.DateOffset(years=1),
+    '2y': pd.DateOffset(years=2),
+    '5y': pd.DateOffset(years=5),
+    '10y': pd.DateOffset(years=10),
+}
+
+SWEEP_METRICS = [
+    'annual_return', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown',
+    'annualized_excess_return', 'tracking_error', 'information_ratio', 'beta'
+]
+
+
+def longest_period(periods):
+    """The period whose offset reaches furthest back."""
+    anchor = pd.Timestamp('2000-01-01')
+    return min(periods, key=lambda p: anchor - PERIOD_OFFSETS[p])
+
+
+def download_sweep_data(tickers, benchmarks, periods, interval='1d', loader=None, progress=None):
+    """
+    Download every ticker and benchmark once, for the longest period.
+
+    Args:
+        loader: Callable with download_stock_data's signature, e.g. a shared
+            PriceStore's get (default: download directly)
+        progress: Optional callable(done, total, ticker) called after each
+            ticker and benchmark; it may raise to abort the download
+
+    Returns:
+        Dictionary with 'stock_data' (ticker -> DataFrame), 'benchmark_data'
+        (benchmark -> DataFrame), 'period' and 'interval'
+    """
+    if loader is None:
+        from data_loader import download_stock_data as loader
+
+    period = longest_period(periods)
+    stock_data = {}
+    benchmark_data = {}
+
+    total = len(tickers) + len(benchmarks)
+    print(f"Downloading {period} of data for {len(tickers)} stocks and {len(benchmarks)} benchmarks...")
+    for i, ticker in enumerate(tickers, 1):
+        try:
+            stock_data[ticker] = loader(ticker, period=period, interval=interval)
+        except Exception as e:
+            print(f"✗ Failed to download {ticker}: {e}")
+        if progress is not None:
+            progress(i, total, ticker)
+
+    for i, benchmark in enumerate(benchmarks, len(tickers) + 1):
+        try:
+            benchmark_data[benchmark] = loader(benchmark, period=period, interval=interval)
+        except Exception as e:
+            print(f"✗ Failed to download benchmark {benchmark}: {e}")
+        if progress is not None:
+            progress(i, total, benchmark)
+
+    return {
+        'stock_data': stock_data,
+        'benchmark_data': benchmark_data,
+        'period': period,
+        'interval': interval
+    }
+
+
+def slice_period(df, period, end=None):
+    """Rows of `df` inside the trailing `period` ending at `end` (default: last row)."""
+    if df is None or df.empty:
+        return df
+    end = end if end is not None else df.index[-1]
+    return df.loc[end - PERIOD_OFFSETS[period]:end]
+
+
+def build_portfolio(tickers, weights, data, period, benchmark, risk_free_rate=0.065, alignment=None,
+                    max_fill_gap=None):
+    """
+    Portfolio for one (period, benchmark) cell, built from in-memory data.
+
+    All slices end on the same date (the latest bar in the dataset) so every
+    period is a trailing window of the same history. alignment and
+    max_fill_gap override the Portfolio defaults (see alignment.py).
+    """
+    if not data['stock_data']:
+        raise ValueError("No stock data downloaded")
+    end = max(df.index[-1] for df in data['stock_data'].values())
+
+    portfolio = Portfolio(tickers, weights)
+    portfolio.interval = data.get('interval', '1d')
+    portfolio.risk_free_rate = risk_free_rate
+    portfolio.benchmark_ticker = benchmark
+    if alignment is not None:
+        portfolio.alignment = alignment
+    if max_fill_gap is not None:
+        portfolio.max_fill_gap = max_fill_gap
+    portfolio.stock_data = {
+        ticker: slice_period(df, period, end) for ticker, df in data['stock_data'].items()
+    }
+    portfolio.benchmark_data = slice_period(data['benchmark_data'].get(benchmark), period, end)
+    return portfolio
+
+
+def _cell_metrics(portfolio):
+    metrics = dict(portfolio.metrics)
+    market = portfolio.market_metrics or {}
+    for key in SWEEP_METRICS[5:]:
+        metrics[key] = market.get(key, float('nan'))
+    metrics['observations'] = len(portfolio.portfolio_returns)
+    return metrics
+
+
+def run_sweep(tickers, weights, data, periods, benchmarks, risk_free_rates, quiet=True, alignment=None,
+              max_fill_gap=None):
+    """
+    Evaluate the Cartesian grid of (period, benchmark, risk_free_rate).
+
+    Args:
+        tickers, weights: Portfolio definition
+        data: Output of download_sweep_data
+        periods: Iterable of period labels ('1mo' ... '10y')
+        benchmarks: Iterable of benchmark tickers present in `data`
+        risk_free_rates: Iterable of annual risk-free rates
+        quiet: Suppress the per-cell alignment report
+        alignment, max_fill_gap: Alignment settings for every cell (see
+            build_portfolio)
+
+    Returns:
+        Result cube: DataFrame indexed by (period, benchmark, risk_free_rate)
+        with one column per metric. Cells whose slice has too little data
+        are omitted.
+    """
+    rows = {}
+    output = io.StringIO() if quiet else None
+
+    for period, benchmark in itertools.product(periods, benchmarks):
+        portfolio = build_portfolio(tickers, weights, data, period, benchmark, alignment=alignment,
+                                    max_fill_gap=max_fill_gap)
+        try:
+            with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+                portfolio.portfolio_returns
+        except (ValueError, KeyError):
+            # Slice too short to align, or a ticker missing from the dataset
+            continue
+
+        for rate in risk_free_rates:
+            # Only Sharpe and Sortino are recomputed; everything else is memoized
+            portfolio.risk_free_rate = rate
+            rows[(period, benchmark, rate)] = _cell_metrics(portfolio)
+
+    cube = pd.DataFrame.from_dict(rows, orient='index')
+    if not cube.empty:
+        cube.index = pd.MultiIndex.from_tuples(cube.index, names=['period', 'benchmark', 'risk_free_rate'])
+    return cube
+
+
+def pivot_cube(cube, metric, rows='period', columns='benchmark', **fixed):
+    """
+    Two-dimensional view of one metric, with the remaining axes fixed.
+
+    Example:
+        pivot_cube(cube, 'sharpe_ratio', risk_free_rate=0.065)
+    """
+    view = cube[metric]
+    for level, value in fixed.items():
+        view = view.xs(value, level=level)
+    return view.unstack(columns).reindex(index=view.index.unique(rows))
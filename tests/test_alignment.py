@@ -0,0 +1,114 @@
+"""Alignment policies, bounded fill gaps and streaming parity with the in-memory path."""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alignment import ALIGNMENT_POLICIES, align_prices, iter_aligned_chunks  # noqa: E402
+from portfolio import Portfolio  # noqa: E402
+from streaming import iter_frame_chunks  # noqa: E402
+
+TICKERS = ['A.NS', 'B.NS', 'SPY']
+WEIGHTS = [0.5, 0.3, 0.2]
+BENCHMARK = '^NSEI'
+
+PARITY_METRICS = [
+    'annual_return', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown',
+    'annualized_excess_return', 'tracking_error', 'information_ratio', 'beta'
+]
+
+
+def gappy_prices(bars=800, seed=7):
+    """
+    Wide prices on two market calendars with every kind of gap.
+
+    Indian holidays (A.NS, B.NS and ^NSEI all missing), US holidays (SPY
+    missing), single missing bars, a short and a long run of missing bars,
+    and a late listing.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range('2018-01-01', periods=bars, name='Date')
+    columns = TICKERS + [BENCHMARK]
+    prices = pd.DataFrame(100 * np.cumprod(1 + rng.normal(0.0004, 0.012, (bars, len(columns))), axis=0),
+                          index=index, columns=columns)
+
+    holidays = rng.choice(np.arange(60, bars), size=(2, 15), replace=False)
+    prices.iloc[holidays[0], [0, 1, 3]] = np.nan
+    prices.iloc[holidays[1], 2] = np.nan
+    prices.iloc[rng.choice(np.arange(60, bars), 10, replace=False), 0] = np.nan
+    prices.iloc[300:303, 1] = np.nan
+    prices.iloc[500:508, 0] = np.nan
+    prices.iloc[:50, 1] = np.nan
+    return prices
+
+
+def build(prices, policy, max_fill_gap=5):
+    portfolio = Portfolio(TICKERS, WEIGHTS)
+    portfolio.alignment = policy
+    portfolio.max_fill_gap = max_fill_gap
+    portfolio.benchmark_ticker = BENCHMARK
+    portfolio.stock_data = {t: prices[[t]].dropna().set_axis(['Close'], axis=1) for t in TICKERS}
+    portfolio.benchmark_data = prices[[BENCHMARK]].dropna().set_axis(['Close'], axis=1)
+    return portfolio
+
+
+@pytest.mark.parametrize('chunksize', [7, 97, 5000])
+@pytest.mark.parametrize('policy', ALIGNMENT_POLICIES)
+def test_chunked_alignment_matches_align_prices(policy, chunksize):
+    prices = gappy_prices()
+    columns = TICKERS + [BENCHMARK]
+    whole = align_prices({c: prices[c] for c in columns}, policy=policy)['prices']
+
+    chunked = pd.concat(iter_aligned_chunks(iter_frame_chunks(prices, chunksize), columns, policy))
+
+    pd.testing.assert_frame_equal(chunked, whole, check_names=False, check_freq=False)
+
+
+@pytest.mark.parametrize('chunksize', [7, 97, 5000])
+@pytest.mark.parametrize('policy', ALIGNMENT_POLICIES)
+def test_stream_metrics_match_in_memory(policy, chunksize, capsys):
+    prices = gappy_prices()
+    portfolio = build(prices, policy)
+    expected = {**portfolio.metrics, **portfolio.market_metrics}
+
+    streamed = portfolio.stream_metrics(iter_frame_chunks(prices, chunksize))
+
+    assert streamed['observations'] == len(portfolio.portfolio_returns)
+    for key in PARITY_METRICS:
+        assert streamed[key] == pytest.approx(expected[key], rel=1e-10, abs=1e-12), key
+
+
+def small_frame():
+    """Ten days: A.NS misses three open days, SPY alone on its calendar misses three."""
+    index = pd.bdate_range('2024-01-01', periods=10)
+    a = [1, 2, np.nan, np.nan, np.nan, 6, 7, 8, 9, 10]
+    b = list(range(11, 21))
+    c = [21, 22, 23, 24, 25, 26, np.nan, np.nan, np.nan, 30]
+    return pd.DataFrame({'A.NS': a, 'B.NS': b, 'SPY': c}, index=index, dtype=float)
+
+
+@pytest.mark.parametrize('policy, kept, a, c', [
+    ('strict', [0, 1, 5, 9], [1, 2, 6, 10], [21, 22, 26, 30]),
+    # Only the first max_gap bars of a longer gap are carried; the rest are dropped
+    ('ffill', [0, 1, 2, 3, 5, 6, 7, 9], [1, 2, 2, 2, 6, 7, 8, 10], [21, 22, 23, 24, 26, 26, 26, 30]),
+    # SPY's market is closed while it has no bar, so its gap is a holiday of any length
+    ('exchange', [0, 1, 2, 3, 5, 6, 7, 8, 9], [1, 2, 2, 2, 6, 7, 8, 9, 10], [21, 22, 23, 24, 26, 26, 26, 26, 30]),
+])
+def test_bounded_fill_gap(policy, kept, a, c):
+    frame = small_frame()
+    report = align_prices({t: frame[t] for t in frame.columns}, policy=policy, max_gap=2)
+    aligned = report['prices']
+
+    assert list(aligned.index) == list(frame.index[kept])
+    assert aligned['A.NS'].tolist() == a
+    assert aligned['SPY'].tolist() == c
+    assert report['summary']['filled'].sum() == report['filled'].to_numpy().sum()
+
+    # The same gaps split across chunk boundaries
+    chunked = pd.concat(iter_aligned_chunks(iter_frame_chunks(frame, 2), list(frame.columns), policy, 2))
+    pd.testing.assert_frame_equal(chunked, aligned, check_names=False, check_freq=False)
@@ -0,0 +1,179 @@
+"""Regression tests for PriceStore coverage, incremental fetches and coalescing."""
+
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_loader import NoDataError  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+
+
+class StubLoader:
+    """Deterministic daily bars for any ticker, recording every request."""
+
+    def __init__(self, first='2005-01-03'):
+        self.first = pd.Timestamp(first)
+        self.calls = []
+        self.error = None
+        self.gate = None
+
+    def __call__(self, ticker, start_date=None, end_date=None, period='1y', interval='1d'):
+        self.calls.append((start_date, end_date))
+        if self.gate is not None:
+            self.gate.wait(timeout=10)
+        if self.error is not None:
+            raise self.error
+        index = pd.bdate_range(max(pd.Timestamp(start_date), self.first),
+                               pd.Timestamp(end_date) - pd.Timedelta(days=1), name='Date')
+        if len(index) == 0:
+            raise NoDataError(f"No data downloaded check ticker for {ticker}")
+        close = 100 + (index - self.first).days.to_numpy() * 0.01
+        return pd.DataFrame({'Close': close, 'Volume': 1.0}, index=index)
+
+
+@pytest.fixture
+def store(tmp_path):
+    loader = StubLoader()
+    return PriceStore(path=str(tmp_path / 'prices.sqlite'), loader=loader), loader
+
+
+def test_closed_range_then_open_period_fetches_the_tail(store):
+    store, loader = store
+    store.get('X.NS', start_date='2020-01-01', end_date='2020-06-01')
+    df = store.get('X.NS', period='1y')
+
+    assert len(loader.calls) == 2
+    # The tail starts on the last stored bar's day (Friday 2020-05-29)
+    assert loader.calls[1][0] == '2020-05-29'
+    assert df.index[-1] >= pd.Timestamp.now().normalize() - pd.Timedelta(days=4)
+
+
+def test_refresh_fetches_only_the_tail(store):
+    store, loader = store
+    store.get('X.NS', start_date='2008-01-01', end_date='2022-01-01')
+    store.get('X.NS', period='1y')
+    store.invalidate('X.NS')
+    store.get('X.NS', period='1y')
+
+    last_day = pd.Timestamp.now().normalize()
+    for start, _ in loader.calls[1:]:
+        assert pd.Timestamp(start) >= pd.Timestamp('2021-12-31')
+    assert pd.Timestamp(loader.calls[-1][0]) >= last_day - pd.Timedelta(days=4)
+
+
+def test_earlier_start_fetches_only_the_head(store):
+    store, loader = store
+    store.get('X.NS', period='1y')
+    df = store.get('X.NS', start_date='2015-01-01', end_date='2016-01-01')
+
+    assert len(loader.calls) == 2
+    assert pd.Timestamp(loader.calls[1][1]) <= pd.Timestamp.now() - pd.DateOffset(years=1) + pd.Timedelta(days=7)
+    assert df.index[0] == pd.Timestamp('2015-01-01')
+    assert store.get('X.NS', start_date='2015-06-01', end_date='2015-07-01').index[0] == pd.Timestamp('2015-06-01')
+    assert len(loader.calls) == 2
+
+
+def test_head_before_listing_is_covered(store):
+    store, loader = store
+    store.get('X.NS', start_date='2004-01-01', end_date='2006-01-01')
+    store.get('X.NS', start_date='2000-01-01', end_date='2006-01-01')
+    df = store.get('X.NS', start_date='2001-01-01', end_date='2006-01-01')
+
+    assert len(loader.calls) == 2
+    assert df.index[0] == pd.Timestamp('2005-01-03')
+
+
+def test_failed_tail_refresh_stays_stale(store):
+    store, loader = store
+    store.get('X.NS', period='1y')
+    store.invalidate('X.NS')
+    loader.error = NoDataError("No data downloaded check ticker for X.NS")
+
+    with pytest.raises(NoDataError):
+        store.get('X.NS', period='1y')
+    assert store._coverage('X.NS', '1d')[2] == 0
+    with pytest.raises(NoDataError):
+        store.get('X.NS', period='1y')
+    assert store.stats['hits'] == 0
+
+    loader.error = None
+    store.get('X.NS', period='1y')
+    assert store.stats['hits'] == 0
+    store.get('X.NS', period='1y')
+    assert store.stats['hits'] == 1
+
+
+def test_failed_head_fetch_keeps_the_start(store):
+    store, loader = store
+    store.get('X.NS', period='1y')
+    stored_start = store._coverage('X.NS', '1d')[0]
+    loader.error = ConnectionError("provider unavailable")
+
+    with pytest.raises(ConnectionError):
+        store.get('X.NS', start_date='2015-01-01', end_date='2016-01-01')
+    assert store._coverage('X.NS', '1d')[0] == stored_start
+
+    loader.error = None
+    df = store.get('X.NS', start_date='2015-01-01', end_date='2016-01-01')
+    assert df.index[0] == pd.Timestamp('2015-01-01')
+
+
+def test_failed_head_keeps_the_start_and_stores_the_tail(store):
+    store, loader = store
+    store.get('X.NS', period='1y')
+    store.invalidate('X.NS')
+    stored_start = store._coverage('X.NS', '1d')[0]
+    head_error = ConnectionError("provider unavailable")
+
+    def flaky(ticker, start_date=None, end_date=None, period='1y', interval='1d'):
+        if pd.Timestamp(start_date).value < stored_start:
+            raise head_error
+        return StubLoader()(ticker, start_date, end_date, period, interval)
+
+    store.loader = flaky
+    with pytest.raises(ConnectionError):
+        store.get('X.NS', period='5y')
+    start_ts, end_ts, fetched_at, _ = store._coverage('X.NS', '1d')
+    assert start_ts == stored_start
+    assert end_ts is None and fetched_at > 0
+
+
+def test_range_ending_today_is_stored_open(store):
+    store, loader = store
+    tomorrow = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+    store.get('X.NS', start_date='2024-01-01', end_date=tomorrow.strftime('%Y-%m-%d'))
+
+    assert store._coverage('X.NS', '1d')[1] is None
+
+
+def test_concurrent_requests_share_one_fetch(store):
+    store, loader = store
+    loader.gate = threading.Event()
+    results, errors = [], []
+
+    def request():
+        try:
+            results.append(store.get('X.NS', period='1y'))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=request) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    deadline = time.time() + 10
+    while store.stats['coalesced'] < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    loader.gate.set()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert len(loader.calls) == 1
+    assert store.stats['coalesced'] == 3
+    assert all(df.equals(results[0]) for df in results)
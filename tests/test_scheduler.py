@@ -0,0 +1,56 @@
+"""Regression tests for the nightly refresh scheduler's failure handling."""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_loader import NoDataError  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+from scheduler import RefreshScheduler  # noqa: E402
+
+
+class NoisyLoader:
+    """Random-walk daily bars per ticker; raises `error` once set."""
+
+    def __init__(self):
+        self.error = None
+
+    def __call__(self, ticker, start_date=None, end_date=None, period='1y', interval='1d'):
+        if self.error is not None:
+            raise self.error
+        index = pd.bdate_range(start_date, pd.Timestamp(end_date) - pd.Timedelta(days=1), name='Date')
+        rng = np.random.default_rng(sum(map(ord, ticker)))
+        returns = rng.normal(0.0004, 0.012, len(pd.bdate_range('2000-01-03', index[-1])))
+        close = 100 * np.cumprod(1 + returns)[-len(index):]
+        return pd.DataFrame({'Close': close, 'Volume': 1.0}, index=index)
+
+
+@pytest.fixture
+def scheduler(tmp_path):
+    loader = NoisyLoader()
+    store = PriceStore(path=str(tmp_path / 'prices.sqlite'), loader=loader)
+    scheduler = RefreshScheduler(
+        {'core': (['A.NS', 'B.NS'], [0.5, 0.5])}, benchmark='^NSEI', store=store,
+        state_path=str(tmp_path / 'state.json'), snapshot_dir=str(tmp_path / 'snapshots'),
+        report_path=str(tmp_path / 'summary.csv'), max_workers=2
+    )
+    return scheduler, loader
+
+
+def test_failed_download_blocks_dependent_portfolios(scheduler):
+    scheduler, loader = scheduler
+    first = scheduler.run()
+    assert first.loc['portfolio:core', 'status'] == 'recomputed'
+
+    loader.error = NoDataError("No data downloaded check ticker for A.NS")
+    report = scheduler.run()
+
+    assert report.loc['ticker:A.NS', 'status'] == 'failed'
+    assert report.loc['portfolio:core', 'status'] == 'blocked'
+    assert report.loc['report:summary', 'status'] == 'partial'
+    assert not scheduler.state['run']['finished']
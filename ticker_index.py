@@ -0,0 +1,328 @@
+"""
+Precomputed per-ticker statistics for fast portfolio approximations.
+
+The same tickers show up in hundreds of portfolios, yet every analysis
+recomputes their statistics from raw daily series. A TickerStatsIndex is
+built once (e.g. nightly) and stored as a single compressed .npz file:
+
+    per ticker          count, mean, variance, downside variance
+    per benchmark       mean and variance
+    ticker x benchmark  covariance and beta
+    co-held blocks      full covariance matrix of groups of names that are
+                        frequently held together
+
+Portfolio expected return and beta are then weighted sums over the index
+(O(k) for k holdings). Volatility and tracking error use the stored
+covariance block when one covers every holding (O(k^2)), and otherwise the
+single-index model built from the benchmark betas (O(k)). None of this
+touches a time series; the full Portfolio path is only needed for exact or
+path-dependent metrics such as drawdown.
+
+Usage (nightly build):
+    python ticker_index.py portfolio.csv model.csv --benchmarks ^NSEI ^GSPC --period 5y
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_VERSION = 1
+DEFAULT_INDEX_PATH = 'ticker_index.npz'
+
+
+def _masked_covariance(x, y):
+    """
+    Column-wise covariance of x (T x N) with a series y (T), pairwise complete.
+
+    Returns:
+        Tuple of (count, covariance, variance of y on the same dates), each of length N
+    """
+    mask = ~np.isnan(x) & ~np.isnan(y)[:, None]
+    count = mask.sum(axis=0).astype(float)
+    xz = np.where(mask, x, 0.0)
+    yz = np.where(mask, y[:, None], 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_mean = xz.sum(axis=0) / count
+        y_mean = yz.sum(axis=0) / count
+        xc = np.where(mask, x - x_mean, 0.0)
+        yc = np.where(mask, y[:, None] - y_mean, 0.0)
+        covariance = (xc * yc).sum(axis=0) / (count - 1)
+        y_variance = (yc ** 2).sum(axis=0) / (count - 1)
+    return count, covariance, y_variance
+
+
+def co_held_groups(definitions, min_portfolios=2):
+    """
+    Groups of names that are frequently held together.
+
+    For each portfolio, the holdings that appear in at least
+    `min_portfolios` portfolios form one group; groups contained in a larger
+    group are dropped.
+
+    Args:
+        definitions: Dictionary name -> (tickers, weights)
+        min_portfolios: How many portfolios must hold a ticker
+
+    Returns:
+        List of ticker lists
+    """
+    counts = pd.Series([t for tickers, _ in definitions.values() for t in set(tickers)]).value_counts()
+    frequent = set(counts[counts >= min_portfolios].index)
+
+    groups = {frozenset(t for t in tickers if t in frequent) for tickers, _ in definitions.values()}
+    groups = [g for g in groups if len(g) > 1]
+    groups = [g for g in groups if not any(g < other for other in groups)]
+    return [sorted(g) for g in sorted(groups, key=len, reverse=True)]
+
+
+class TickerStatsIndex:
+    """
+    Per-ticker statistics with O(k) / O(k^2) portfolio estimates.
+
+    Build with TickerStatsIndex.build (or the command line), persist with
+    save, and reopen with TickerStatsIndex.load.
+    """
+
+    def __init__(self, arrays):
+        self.arrays = arrays
+        self.tickers = [str(t) for t in arrays['tickers']]
+        self.benchmarks = [str(b) for b in arrays['benchmarks']]
+        self.trading_days = float(arrays['trading_days'])
+        self._position = {t: i for i, t in enumerate(self.tickers)}
+        self._benchmark_position = {b: i for i, b in enumerate(self.benchmarks)}
+
+        # Co-held blocks: member positions and flattened covariance values
+        offsets = arrays['block_offsets']
+        value_offsets = np.concatenate([[0], np.cumsum(np.diff(offsets) ** 2)])
+        self._blocks = []
+        for g in range(len(offsets) - 1):
+            members = arrays['block_members'][offsets[g]:offsets[g + 1]]
+            size = len(members)
+            values = arrays['block_values'][value_offsets[g]:value_offsets[g + 1]].reshape(size, size)
+            self._blocks.append(({int(m): j for j, m in enumerate(members)}, values))
+
+    @classmethod
+    def build(cls, stock_returns, benchmark_returns, groups=None, trading_days=252):
+        """
+        Compute the index from return histories.
+
+        Args:
+            stock_returns: DataFrame of returns (dates x tickers); NaN where
+                a ticker did not trade. Each statistic uses all dates available
+                for that ticker (pairwise complete for covariances)
+            benchmark_returns: DataFrame of benchmark returns (dates x benchmarks)
+            groups: Ticker lists whose full covariance block is stored
+                (see co_held_groups)
+            trading_days: Bars per year of the returns
+
+        Returns:
+            TickerStatsIndex
+        """
+        dates = stock_returns.index.union(benchmark_returns.index)
+        stock_returns = stock_returns.reindex(dates)
+        benchmark_returns = benchmark_returns.reindex(dates)
+
+        x = stock_returns.to_numpy(dtype=float)
+        count = (~np.isnan(x)).sum(axis=0)
+        negative = np.where(x < 0, x, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nanmean(x, axis=0)
+            variance = np.nanvar(x, axis=0, ddof=1)
+            downside_variance = np.nanvar(negative, axis=0, ddof=1)
+
+        n_tickers, n_benchmarks = x.shape[1], benchmark_returns.shape[1]
+        benchmark_cov = np.empty((n_tickers, n_benchmarks))
+        beta = np.empty((n_tickers, n_benchmarks))
+        for j, column in enumerate(benchmark_returns.columns):
+            _, covariance, b_variance = _masked_covariance(x, benchmark_returns[column].to_numpy(dtype=float))
+            benchmark_cov[:, j] = covariance
+            with np.errstate(invalid='ignore', divide='ignore'):
+                beta[:, j] = covariance / b_variance
+
+        position = {t: i for i, t in enumerate(stock_returns.columns)}
+        members, values, offsets = [], [], [0]
+        for group in groups or []:
+            group = [t for t in group if t in position]
+            if len(group) < 2:
+                continue
+            # Dates on which the whole group traded keep the block positive semi-definite
+            block = stock_returns[group].dropna()
+            if len(block) < 2:
+                continue
+            members.extend(position[t] for t in group)
+            values.append(np.cov(block.to_numpy(dtype=float), rowvar=False).ravel())
+            offsets.append(len(members))
+
+        arrays = {
+            'schema_version': np.array(SCHEMA_VERSION),
+            'trading_days': np.array(float(trading_days)),
+            'tickers': np.array([str(t) for t in stock_returns.columns]),
+            'benchmarks': np.array([str(b) for b in benchmark_returns.columns]),
+            'count': count,
+            'mean': mean,
+            'variance': variance,
+            'downside_variance': downside_variance,
+            'benchmark_mean': benchmark_returns.mean().to_numpy(dtype=float),
+            'benchmark_variance': benchmark_returns.var().to_numpy(dtype=float),
+            'benchmark_cov': benchmark_cov,
+            'beta': beta,
+            'block_members': np.array(members, dtype=np.int64),
+            'block_offsets': np.array(offsets, dtype=np.int64),
+            'block_values': np.concatenate(values) if values else np.empty(0),
+        }
+        return cls(arrays)
+
+    def save(self, path=DEFAULT_INDEX_PATH):
+        np.savez_compressed(path, **self.arrays)
+        print(f"✓ Saved statistics for {len(self.tickers)} tickers and "
+              f"{len(self._blocks)} co-held blocks to {path}")
+
+    @classmethod
+    def load(cls, path=DEFAULT_INDEX_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in data.files}
+        version = int(arrays.get('schema_version', -1))
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported ticker index schema {version} (expected {SCHEMA_VERSION}); rebuild the index")
+        return cls(arrays)
+
+    def ticker_stats(self, tickers=None):
+        """Per-ticker statistics as a DataFrame (annualized where it makes sense)."""
+        tickers = tickers if tickers is not None else self.tickers
+        positions = self._positions(tickers)
+        a = self.arrays
+        table = pd.DataFrame({
+            'observations': a['count'][positions],
+            'annual_mean': a['mean'][positions] * self.trading_days,
+            'volatility': np.sqrt(a['variance'][positions] * self.trading_days),
+            'downside_deviation': np.sqrt(a['downside_variance'][positions] * self.trading_days),
+        }, index=pd.Index(tickers, name='ticker'))
+        for j, benchmark in enumerate(self.benchmarks):
+            table[f'beta_{benchmark}'] = a['beta'][positions, j]
+        return table
+
+    def _positions(self, tickers):
+        missing = [t for t in tickers if t not in self._position]
+        if missing:
+            raise KeyError(f"Not in ticker index: {', '.join(missing)}")
+        return np.array([self._position[t] for t in tickers], dtype=np.int64)
+
+    def _covariance_block(self, positions):
+        """Stored covariance among `positions`, or None if no block covers them all."""
+        for members, values in self._blocks:
+            if all(int(p) in members for p in positions):
+                local = [members[int(p)] for p in positions]
+                return values[np.ix_(local, local)]
+        return None
+
+    def estimate(self, tickers, weights, benchmark, risk_free_rate=0.065):
+        """
+        Approximate portfolio statistics from the index alone.
+
+        Args:
+            tickers: Portfolio tickers
+            weights: Portfolio weights, same order
+            benchmark: Benchmark ticker stored in the index
+            risk_free_rate: Annual risk-free rate
+
+        Returns:
+            Dictionary with 'expected_return' (annualized arithmetic mean),
+            'volatility', 'sharpe_ratio', 'beta', 'tracking_error' and
+            'method' ('covariance_block' or 'single_index')
+        """
+        if benchmark not in self._benchmark_position:
+            raise KeyError(f"Benchmark {benchmark} not in ticker index")
+
+        a = self.arrays
+        w = np.asarray(weights, dtype=float)
+        positions = self._positions(tickers)
+        j = self._benchmark_position[benchmark]
+
+        beta = a['beta'][positions, j]
+        market_variance = a['benchmark_variance'][j]
+        portfolio_beta = float(w @ beta)
+
+        block = self._covariance_block(positions)
+        if block is not None:
+            variance = float(w @ block @ w)
+            method = 'covariance_block'
+        else:
+            # Single-index model: common part through beta, plus idiosyncratic variances
+            residual = np.clip(a['variance'][positions] - beta ** 2 * market_variance, 0.0, None)
+            variance = portfolio_beta ** 2 * market_variance + float((w ** 2) @ residual)
+            method = 'single_index'
+
+        covariance_with_market = float(w @ a['benchmark_cov'][positions, j])
+        active_variance = max(variance - 2 * covariance_with_market + market_variance, 0.0)
+
+        expected_return = float(w @ a['mean'][positions]) * self.trading_days
+        volatility = float(np.sqrt(variance * self.trading_days))
+        return {
+            'expected_return': expected_return,
+            'volatility': volatility,
+            'sharpe_ratio': (expected_return - risk_free_rate) / volatility,
+            'beta': portfolio_beta,
+            'tracking_error': float(np.sqrt(active_variance * self.trading_days)),
+            'method': method
+        }
+
+
+def build_index_from_download(definitions, benchmarks, period='5y', interval='1d', min_portfolios=2):
+    """
+    Download every ticker and benchmark once and build the index.
+
+    Args:
+        definitions: Dictionary name -> (tickers, weights) of the portfolios
+            the index should serve (used for the co-held blocks)
+        benchmarks: Benchmark tickers
+        period: History to download
+        interval: Bar interval
+        min_portfolios: See co_held_groups
+
+    Returns:
+        TickerStatsIndex
+    """
+    from comparison import union_tickers
+    from frequency import periods_per_year
+    from sweep import download_sweep_data
+
+    data = download_sweep_data(union_tickers(definitions), benchmarks, [period], interval)
+
+    def returns_frame(frames):
+        closes = {}
+        for ticker, df in frames.items():
+            close = df['Close']
+            closes[ticker] = close.squeeze(axis=1) if isinstance(close, pd.DataFrame) else close
+        # Returns per ticker on its own dates, so gaps in one name do not drop others
+        return pd.DataFrame({t: c.pct_change().dropna() for t, c in closes.items()})
+
+    return TickerStatsIndex.build(
+        returns_frame(data['stock_data']),
+        returns_frame(data['benchmark_data']),
+        groups=co_held_groups(definitions, min_portfolios),
+        trading_days=periods_per_year(interval)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-ticker statistics index.")
+    parser.add_argument('portfolios', nargs='+', help="Portfolio CSV files (Ticker, Amount)")
+    parser.add_argument('--benchmarks', nargs='+', default=['^NSEI'])
+    parser.add_argument('--period', default='5y')
+    parser.add_argument('--interval', default='1d')
+    parser.add_argument('--min-portfolios', type=int, default=2)
+    parser.add_argument('--output', default=DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+
+    from comparison import definitions_from_csv
+
+    index = build_index_from_download(
+        definitions_from_csv(args.portfolios), args.benchmarks,
+        period=args.period, interval=args.interval, min_portfolios=args.min_portfolios
+    )
+    index.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Walk-forward evaluation over rolling analysis windows.
+
+Instead of one fixed period, the strategy is evaluated on many overlapping
+windows - e.g. a 1-year lookback re-evaluated at every month end over 15
+years - and the result is a window x metric table.
+
+The aligned returns are sliced once into prefix-sum arrays (log growth,
+centered sums and squares, benchmark cross-products, downside moments), so
+every additive metric for every window comes from two array lookups: each
+window is derived from the running totals shared with its predecessor rather
+than recomputed. Max drawdown is path-dependent and cannot be differenced;
+it is computed per window from the log-wealth prefix and, for large
+workloads, fanned out across a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+METRIC_COLUMNS = [
+    'annual_return', 'volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown',
+    'annualized_excess_return', 'tracking_error', 'information_ratio', 'beta'
+]
+
+
+def _prefix(values):
+    """Prefix sums with a leading zero so sum(values[s:e]) = p[e] - p[s]."""
+    out = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=out[1:])
+    return out
+
+
+def _window_ends(index, lookback, step):
+    """End positions (exclusive) of every window with a full lookback."""
+    n = len(index)
+    if isinstance(step, (int, np.integer)):
+        ends = np.arange(lookback, n + 1, step)
+    else:
+        positions = pd.Series(np.arange(n), index=index)
+        last_in_period = positions.groupby(index.to_period(step)).max().to_numpy()
+        ends = last_in_period + 1
+    return ends[ends >= lookback]
+
+
+def _max_drawdowns(log_wealth, starts, ends):
+    """
+    Max drawdown of each window from a log-wealth prefix array.
+
+    Follows calculate_max_drawdown: the first return of the window sets the
+    initial peak.
+    """
+    out = np.empty(len(starts))
+    for i, (s, e) in enumerate(zip(starts, ends)):
+        path = log_wealth[s + 1:e + 1]
+        out[i] = np.expm1((path - np.maximum.accumulate(path)).min())
+    return out
+
+
+def _max_drawdowns_task(args):
+    """Process-pool entry point: (log-wealth slice, relative starts, relative ends)."""
+    return _max_drawdowns(*args)
+
+
+def _parallel_max_drawdowns(log_wealth, starts, ends, max_workers, batch_size=256):
+    if max_workers is None or max_workers <= 1 or len(starts) <= batch_size:
+        return _max_drawdowns(log_wealth, starts, ends)
+
+    tasks = []
+    for b in range(0, len(starts), batch_size):
+        s, e = starts[b:b + batch_size], ends[b:b + batch_size]
+        lo, hi = s.min(), e.max()
+        # Ship only the slice of the path these windows need
+        tasks.append((log_wealth[lo:hi + 1], s - lo, e - lo))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        return np.concatenate(list(pool.map(_max_drawdowns_task, tasks)))
+
+
+def walk_forward(portfolio_returns, benchmark_returns=None, lookback=252, step='M',
+                 risk_free_rate=0.065, trading_days=252, max_workers=None):
+    """
+    Evaluate get_metrics plus the market metrics on every rolling window.
+
+    Args:
+        portfolio_returns: Series of aligned portfolio returns
+        benchmark_returns: Series of benchmark returns on the same dates (optional)
+        lookback: Window length in bars (252 = 1 year of daily bars)
+        step: Either a number of bars between windows, or a pandas period
+            alias ('M' month, 'Q' quarter, 'W' week, 'Y' year); windows then
+            end on the last bar of each period
+        risk_free_rate: Annual risk-free rate
+        trading_days: Bars per year
+        max_workers: Process-pool size for the drawdown pass (None/1 = serial)
+
+    Returns:
+        DataFrame indexed by window end date with a window_start column and
+        one column per metric
+    """
+    p = portfolio_returns.to_numpy(dtype=float)
+    has_benchmark = benchmark_returns is not None
+    b = benchmark_returns.reindex(portfolio_returns.index).to_numpy(dtype=float) if has_benchmark else np.zeros_like(p)
+
+    ends = _window_ends(portfolio_returns.index, lookback, step)
+    if len(ends) == 0:
+        raise ValueError(f"Need at least {lookback} returns for one walk-forward window")
+    starts = ends - lookback
+    n = lookback
+
+    # Center before squaring so prefix-sum variances do not lose precision
+    series = np.column_stack([p, b, p - b])
+    centered = series - series.mean(axis=0)
+
+    log_growth = _prefix(np.log1p(series))
+    sums = _prefix(centered)
+    squares = _prefix(centered ** 2)
+    cross = _prefix(centered[:, 0] * centered[:, 1])
+
+    negative = series < 0
+    neg_count = _prefix(negative.astype(float))
+    neg_sums = _prefix(np.where(negative, centered, 0.0))
+    neg_squares = _prefix(np.where(negative, centered ** 2, 0.0))
+
+    def window(prefix):
+        return prefix[ends] - prefix[starts]
+
+    annual = np.expm1(window(log_growth) * trading_days / n)
+    s1, s2 = window(sums), window(squares)
+    variance = (s2 - s1 ** 2 / n) / (n - 1)
+    volatility = np.sqrt(variance * trading_days)
+
+    k = window(neg_count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ks1, ks2 = window(neg_sums), window(neg_squares)
+        downside = np.sqrt((ks2 - ks1 ** 2 / k) / (k - 1) * trading_days)
+        covariance = (window(cross) - s1[:, 0] * s1[:, 1] / n) / (n - 1)
+
+        table = pd.DataFrame({
+            'window_start': portfolio_returns.index[starts],
+            'annual_return': annual[:, 0],
+            'volatility': volatility[:, 0],
+            'sharpe_ratio': (annual[:, 0] - risk_free_rate) / volatility[:, 0],
+            'sortino_ratio': (annual[:, 0] - risk_free_rate) / downside[:, 0],
+            'max_drawdown': _parallel_max_drawdowns(log_growth[:, 0], starts, ends, max_workers),
+            'annualized_excess_return': annual[:, 0] - annual[:, 1],
+            'tracking_error': volatility[:, 2],
+            'information_ratio': annual[:, 2] / volatility[:, 2],
+            'beta': covariance / variance[:, 1],
+        }, index=portfolio_returns.index[ends - 1])
+
+    table.index.name = 'window_end'
+    if not has_benchmark:
+        table[['annualized_excess_return', 'tracking_error', 'information_ratio', 'beta']] = np.nan
+    return table
+
+
+def walk_forward_portfolio(portfolio, lookback=None, step='M', max_workers=None):
+    """
+    walk_forward on an analyzed Portfolio's aligned returns.
+
+    The lookback defaults to one year of bars at the portfolio's interval.
+    """
+    if lookback is None:
+        lookback = int(round(portfolio.periods_per_year))
+    return walk_forward(
+        portfolio.portfolio_returns,
+        portfolio.benchmark_returns,
+        lookback=lookback,
+        step=step,
+        risk_free_rate=portfolio.risk_free_rate,
+        trading_days=portfolio.periods_per_year,
+        max_workers=max_workers
+    )
+
+
+def to_long(table):
+    """Reshape a walk-forward table to tidy (window_end, metric, value) rows."""
+    return (table.drop(columns='window_start')
+                 .reset_index()
+                 .melt(id_vars='window_end', var_name='metric', value_name='value'))